@@ -0,0 +1,113 @@
+import atexit
+import glob
+import gzip
+import os
+import queue
+import threading
+import zlib
+import logging
+import codec
+
+logger = logging.getLogger('InstaReview')
+
+# Artifact policy: off (default), sampled or full
+ARTIFACT_POLICIES = ('off', 'sampled', 'full')
+
+# Artifacts waiting for the writer; a full queue blocks save_artifact, then drops the artifact
+ARTIFACT_QUEUE_SIZE = 8
+
+_write_queue = queue.Queue(ARTIFACT_QUEUE_SIZE)
+_writer_thread = None
+_writer_lock = threading.Lock()
+
+def get_artifact_policy():
+    """Return the configured artifact policy from ARTIFACT_POLICY"""
+    policy = os.getenv('ARTIFACT_POLICY', 'off').strip().lower()
+    if policy not in ARTIFACT_POLICIES:
+        logger.warning(f"Unknown ARTIFACT_POLICY '{policy}', falling back to 'off'")
+        return 'off'
+    return policy
+
+def should_save_artifacts(company_id, run_id):
+    """Decide whether artifacts are kept for this company and run"""
+    policy = get_artifact_policy()
+    if policy == 'full':
+        return True
+    if policy == 'off':
+        return False
+    # Sampled: deterministic per company and run so all artifacts of one run stay together
+    rate = float(os.getenv('ARTIFACT_SAMPLE_RATE', '0.1'))
+    bucket = zlib.crc32(f"{company_id}:{run_id}".encode()) % 10000
+    return bucket < rate * 10000
+
+def artifact_path(kind, company_id, run_id):
+    """Build the per-company artifact path: data/<company_id>/<kind>_<run_id>.jsonl.gz"""
+    company_dir = os.path.join(os.getenv('ARTIFACTS_DIR', 'data'), str(company_id or 'unknown'))
+    return os.path.join(company_dir, f"{kind}_{run_id}.jsonl.gz")
+
+def _write_artifact(path, records):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wb", compresslevel=5) as f:
+        for record in records:
+            f.write(codec.dumps_bytes(record))
+            f.write(b"\n")
+    os.replace(tmp_path, path)
+
+def _writer_loop():
+    while True:
+        path, records = _write_queue.get()
+        try:
+            _write_artifact(path, records)
+            logger.info(f"Saved artifact {path}")
+        except Exception as e:
+            logger.error(f"Failed to write artifact {path}: {e}")
+        finally:
+            _write_queue.task_done()
+
+def _ensure_writer():
+    global _writer_thread
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_writer_loop, name="artifact-writer", daemon=True)
+            _writer_thread.start()
+
+def save_artifact(kind, records, company_id, run_id):
+    """Queue records for a background write according to the artifact policy.
+
+    Lists are written one element per line, anything else as a single line.
+    Returns the target path, or None when the policy skips this artifact or
+    the writer is still ARTIFACT_QUEUE_SIZE artifacts behind after
+    ARTIFACT_QUEUE_TIMEOUT seconds.
+    """
+    if not should_save_artifacts(company_id, run_id):
+        return None
+    if not isinstance(records, list):
+        records = [records]
+    path = artifact_path(kind, company_id, run_id)
+    _ensure_writer()
+    try:
+        _write_queue.put((path, records), timeout=float(os.getenv('ARTIFACT_QUEUE_TIMEOUT', '30')))
+    except queue.Full:
+        logger.warning(f"Artifact writer is behind, dropping {path}")
+        return None
+    return path
+
+def flush_artifacts():
+    """Block until every queued artifact has been written"""
+    if _writer_thread is not None:
+        _write_queue.join()
+
+def load_artifact(kind, company_id=None):
+    """Load the most recent artifact of a kind, optionally for one company"""
+    company_dir = str(company_id) if company_id else '*'
+    files = glob.glob(os.path.join(os.getenv('ARTIFACTS_DIR', 'data'), company_dir, f"{kind}_*.jsonl.gz"))
+    if not files:
+        return None
+    latest_file = max(files, key=os.path.getmtime)
+    with gzip.open(latest_file, "rb") as f:
+        records = [codec.loads(line) for line in f if line.strip()]
+    logger.info(f"Loaded {len(records)} records from {latest_file}")
+    return records
+
+atexit.register(flush_artifacts)
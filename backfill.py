@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Regenerate historical weekly reports.
+
+Each company's reviews for the whole range are fetched once, partitioned by
+ISO week, and every week is rendered through one shared browser pool. Each
+week is uploaded to its historical YYYY/MM/W#.pdf key. No emails are sent.
+
+Usage:
+    python backfill.py --from 2025-01-01 --to 2025-03-31 [--company ID ...]
+"""
+import argparse
+import asyncio
+import datetime
+from dotenv import load_dotenv
+from logger import setup_logger, set_log_context, reset_log_context
+from fetch_companies_dynamodb import get_all_companies
+from fetch_customer_data import process_customer_data
+from create_pdf_report import generate_period_pdfs
+from periods import weekly_periods
+from render_scheduler import RenderScheduler, default_concurrency
+from instrumentation import write_run_summary
+
+# Load environment variables
+load_dotenv()
+
+# Setup logging
+logger, timestamp = setup_logger()
+
+async def backfill_company(company_id, periods, scheduler):
+    """Fetch a company's reviews for all periods once and upload one report per week; returns the S3 keys"""
+    log_token = set_log_context(company_id=company_id)
+    try:
+        data = process_customer_data(periods[0].start, periods[-1].end, company_id)
+        if not data:
+            logger.info(f"No data for company {company_id} between {periods[0].start} and {periods[-1].end}")
+            return {}
+        logger.info(f"Backfilling {len(periods)} weeks from {len(data)} reviews")
+        s3_keys = await generate_period_pdfs(periods, data, company_id, scheduler)
+        logger.info(f"Backfilled {len(s3_keys)}/{len(periods)} weeks")
+        return s3_keys
+    except Exception as e:
+        logger.error(f"Backfill failed for company {company_id}: {e}")
+        return {}
+    finally:
+        reset_log_context(log_token)
+
+async def main(start_date, end_date, company_ids=None):
+    periods = weekly_periods(start_date, end_date)
+    if company_ids:
+        companies = [{"id": company_id} for company_id in company_ids]
+    else:
+        companies = get_all_companies() or []
+    logger.info(f"Backfilling {len(periods)} weeks ({periods[0].start} to {periods[-1].end}) for {len(companies)} companies")
+
+    uploaded = 0
+    async with RenderScheduler(default_concurrency()) as scheduler:
+        for company in companies:
+            company_id = company.get('id')
+            if not company_id:
+                logger.warning("Company missing ID, skipping")
+                continue
+            uploaded += len(await backfill_company(company_id, periods, scheduler))
+
+    write_run_summary()
+    logger.info(f"Backfill completed: {uploaded} weekly reports uploaded")
+    return uploaded
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate historical weekly reports from one fetch per company")
+    parser.add_argument("--from", dest="start", required=True, type=datetime.date.fromisoformat, help="First day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", required=True, type=datetime.date.fromisoformat, help="Last day (YYYY-MM-DD)")
+    parser.add_argument("--company", action="append", help="Company ID to backfill (repeatable; default: all companies)")
+    args = parser.parse_args()
+    if args.end < args.start:
+        parser.error("--to is before --from")
+    asyncio.run(main(args.start, args.end, args.company))
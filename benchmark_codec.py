@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark JSON codecs on a synthetic reviews payload.
+
+Usage: python benchmark_codec.py [--reviews 100000] [--repeat 3] [--output results.json]
+"""
+import argparse
+import json
+import time
+import codec
+from synthetic_data import generate_reviews
+
+def time_best(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run_benchmark(count, repeat):
+    payload = json.dumps(generate_reviews(count)).encode('utf-8')
+    results = {"reviews": count, "payload_bytes": len(payload), "codecs": {}}
+    for name in codec.available_codecs():
+        c = codec.get_codec(name)
+        decoded = c.decode_reviews(payload)
+        results["codecs"][name] = {
+            "decode_reviews_s": round(time_best(lambda: c.decode_reviews(payload), repeat), 4),
+            "encode_compact_s": round(time_best(lambda: c.dumps(decoded), repeat), 4),
+            "encoded_bytes": len(c.dumps(decoded)),
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON codecs on synthetic review payloads")
+    parser.add_argument("--reviews", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.reviews, args.repeat)
+    print(f"Payload: {results['reviews']} reviews, {results['payload_bytes'] / 1e6:.1f} MB")
+    print(f"{'codec':<10}{'decode (s)':>12}{'encode (s)':>12}{'encoded MB':>12}")
+    for name, r in results["codecs"].items():
+        print(f"{name:<10}{r['decode_reviews_s']:>12}{r['encode_compact_s']:>12}{r['encoded_bytes'] / 1e6:>12.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Compare the Playwright (Chromium) and native (matplotlib) PDF backends.
+
+Each backend runs in its own worker process on the same synthetic report so
+peak memory is measured in isolation. Reported per backend: time to the
+first PDF (including browser launch), p50/p95 per report afterwards, peak
+RSS of the worker and its child processes, and output size.
+
+Usage:
+    python benchmark_pdf_backends.py [--reports 20] [--reviews 200] [--backends playwright native]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from instrumentation import percentile
+
+COMPANY_ID = "bench-company"
+
+def _self_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def _run_worker(backend, reports, reviews):
+    os.environ.update({"ARTIFACT_POLICY": "off", "METRICS_ENABLED": "false", "HTTP_CACHE": "off", "COMPANY_ID": COMPANY_ID})
+    import logging
+    logging.getLogger('InstaReview').setLevel(logging.WARNING)
+    from synthetic_data import generate_reviews
+    from render_scheduler import RenderScheduler
+    import create_pdf_report as report
+
+    charts = report.prepare_report(generate_reviews(reviews, COMPANY_ID, seed=1), COMPANY_ID)
+    generated_on = report.client_data['date_generated'].strftime('%B %d, %Y')
+    times, sizes, child_rss = [], [], 0.0
+
+    started = time.perf_counter()
+    if backend == "native":
+        from native_pdf import render_native_pdf
+        for _ in range(reports):
+            start = time.perf_counter()
+            pdf_bytes = render_native_pdf(report.client_data, report.report_data, charts, generated_on)
+            times.append(time.perf_counter() - start)
+            sizes.append(len(pdf_bytes))
+        first_pdf_s = times[0] if times else 0.0
+    else:
+        html = report.generate_html_content(*charts)
+        header, footer = report.generate_header_template(), report.generate_footer_template()
+        async with RenderScheduler(concurrency=1) as scheduler:
+            first_pdf_s = None
+            for _ in range(reports):
+                start = time.perf_counter()
+                pdf_bytes = await scheduler.render(html, header, footer, COMPANY_ID)
+                times.append(time.perf_counter() - start)
+                sizes.append(len(pdf_bytes))
+                if first_pdf_s is None:
+                    first_pdf_s = time.perf_counter() - started
+            child_rss = scheduler.peak_rss_mb
+
+    warm = times[1:] or times
+    return {
+        "backend": backend,
+        "reports": reports,
+        "first_pdf_s": round(first_pdf_s, 4),
+        "p50_s": round(percentile(warm, 50), 4),
+        "p95_s": round(percentile(warm, 95), 4),
+        "reports_per_s": round(len(warm) / sum(warm), 2) if sum(warm) else 0.0,
+        "peak_rss_mb": round(_self_rss_mb() + child_rss, 1),
+        "mean_bytes": round(sum(sizes) / len(sizes)) if sizes else 0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Playwright and native PDF backends")
+    parser.add_argument("--reports", type=int, default=20, help="PDFs rendered per backend")
+    parser.add_argument("--reviews", type=int, default=200, help="Synthetic reviews in the report")
+    parser.add_argument("--backends", nargs="+", default=["playwright", "native"], choices=["playwright", "native"])
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--worker", choices=["playwright", "native"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(_run_worker(args.worker, args.reports, args.reviews))))
+        return
+
+    results = []
+    for backend in args.backends:
+        print(f"Running {backend} x {args.reports} reports...")
+        output = subprocess.run(
+            [sys.executable, __file__, "--worker", backend, "--reports", str(args.reports), "--reviews", str(args.reviews)],
+            capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"\n{'backend':<12}{'first PDF':>12}{'p50':>10}{'p95':>10}{'reports/s':>11}{'peak RSS':>11}{'size':>10}")
+    for r in results:
+        print(f"{r['backend']:<12}{r['first_pdf_s'] * 1000:>10.0f}ms{r['p50_s'] * 1000:>8.0f}ms{r['p95_s'] * 1000:>8.0f}ms"
+              f"{r['reports_per_s']:>11}{r['peak_rss_mb']:>9.0f}MB{r['mean_bytes'] / 1024:>8.0f}KB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
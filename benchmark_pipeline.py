@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the report pipeline against local stand-ins.
+
+Synthetic companies and reviews are served from a local HTTP stub for
+REVIEWS_URL/COMPANY_DETAILS_URL, S3/DynamoDB are replaced by moto (or an
+in-process fake) and emails go to a local SMTP sink. Each stage is timed per
+company through the pipeline's own spans around the real generate_report
+path, and results are written as JSON for comparison between commits.
+
+Usage:
+    python benchmark_pipeline.py [--scales 1 100 1000] [--reviews 50] [--no-print] [--pdf-output memory]
+    python benchmark_pipeline.py --compare bench_results/old.json bench_results/new.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from synthetic_data import generate_companies
+from local_stubs import StubApiServer, SmtpSink, install_aws_stubs
+from instrumentation import percentile, add_span_listener, remove_span_listener
+
+STAGES = ("fetch", "aggregate", "chart", "html", "print", "optimize", "upload", "time_to_upload", "email")
+BENCH_BUCKET = "instareview-bench"
+BENCH_TABLE = "bench-companies"
+WEEK_START = datetime.datetime(2025, 9, 1)
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "total_s": round(sum(values), 6),
+        "mean_s": round(sum(values) / len(values), 6) if values else 0.0,
+        "p50_s": round(percentile(values, 50), 6),
+        "p95_s": round(percentile(values, 95), 6),
+        "max_s": round(max(values), 6) if values else 0.0,
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+def configure_environment(api, sink):
+    """Point the pipeline at the local stand-ins"""
+    os.environ.update({
+        "REVIEWS_URL": f"{api.base_url}/reviews",
+        "COMPANY_DETAILS_URL": f"{api.base_url}/company-details",
+        "X_API_KEY_COMPANY_DETAILS_URL": "bench",
+        "REPORT_FROM_DATE": WEEK_START.date().isoformat(),
+        "REPORT_TO_DATE": (WEEK_START + datetime.timedelta(days=6)).date().isoformat(),
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(sink.port),
+        "SMTP_USE_SSL": "false",
+        "SMTP_USERNAME": "bench",
+        "SMTP_PASSWORD": "bench",
+        "AWS_S3_BUCKET": BENCH_BUCKET,
+        "AWS_REGION": "us-east-1",
+        "DYNAMODB_COMPANIES_TABLE": BENCH_TABLE,
+        "ARTIFACT_POLICY": "off",
+        "METRICS_ENABLED": "false",
+        "HTTP_CACHE": "off",
+    })
+
+async def run_scale(company_count, reviews_per_company, print_pdf, work_dir, pdf_output="disk"):
+    companies = generate_companies(company_count)
+    api = StubApiServer(companies, reviews_per_company, WEEK_START, WEEK_START + datetime.timedelta(days=7)).start()
+    sink = SmtpSink().start()
+    restore_aws = install_aws_stubs(companies, BENCH_BUCKET, BENCH_TABLE)
+    configure_environment(api, sink)
+    os.environ["PDF_OUTPUT"] = pdf_output
+
+    # Imported after the environment is configured
+    import create_pdf_report as report
+    from fetch_customer_data import process_customer_data
+    from fetch_companies_dynamodb import get_all_companies
+    from send_email import send_report_email
+    from render_scheduler import RenderScheduler
+
+    # Reports are written to the scratch directory and dated by the benchmark week
+    report.folders["reports"] = work_dir
+    report.current_time = WEEK_START + datetime.timedelta(days=6)
+
+    # Stage timings come from the pipeline's own spans, so the real report path is what is measured
+    timings = defaultdict(list)
+    records = []
+    listener = records.append
+    add_span_listener(listener)
+
+    @contextmanager
+    def timed(stage):
+        start = time.perf_counter()
+        yield
+        timings[stage].append(time.perf_counter() - start)
+
+    scheduler = None
+    try:
+        with timed("companies"):
+            companies = get_all_companies()
+
+        if print_pdf:
+            scheduler = RenderScheduler(concurrency=1)
+            with timed("browser_launch"):
+                await scheduler.start()
+
+        run_start = time.perf_counter()
+        for company in companies:
+            company_id = company["id"]
+            os.environ["COMPANY_ID"] = company_id
+            data = process_customer_data()
+            with timed("report"):
+                pdf_path, s3_keys = await report.generate_report(data, company_id, scheduler,
+                                                                  "pdf" if print_pdf else "html")
+            send_report_email(company, s3_keys, company["email"])
+            if pdf_path and os.path.dirname(pdf_path) == work_dir:
+                os.remove(pdf_path)
+        wall = time.perf_counter() - run_start
+    finally:
+        remove_span_listener(listener)
+        if scheduler:
+            await scheduler.close()
+        api.stop()
+        sink.stop()
+        restore_aws()
+
+    # One sample per company and stage; fetch covers both the reviews and the company details request
+    by_company = defaultdict(lambda: defaultdict(float))
+    sizes = []
+    for record in records:
+        by_company[record["company_id"]][record["stage"]] += record["wall_s"]
+        if record["stage"] == "upload":
+            sizes.append(record["bytes_out"])
+    for stages in by_company.values():
+        for stage, wall in stages.items():
+            timings[stage].append(wall)
+        # Print, post-processing and upload, as logged by generate_pdf
+        if "upload" in stages:
+            timings["time_to_upload"].append(stages["print"] + stages["optimize"] + stages["upload"])
+
+    return {
+        "companies": company_count,
+        "reviews_per_company": reviews_per_company,
+        "wall_s": round(wall, 4),
+        "reports_per_s": round(company_count / wall, 3) if wall else 0.0,
+        "pdf_output": pdf_output,
+        "mean_report_bytes": round(sum(sizes) / len(sizes)) if sizes else 0,
+        "api_requests": api.requests,
+        "emails_delivered": sink.messages,
+        "stages": {stage: summarize(values) for stage, values in timings.items()},
+    }
+
+def compare(base_file, new_file):
+    with open(base_file) as f:
+        base = json.load(f)
+    with open(new_file) as f:
+        new = json.load(f)
+    print(f"{base['commit']} -> {new['commit']}")
+    for scale, new_result in new["scales"].items():
+        base_result = base["scales"].get(scale)
+        if not base_result:
+            continue
+        print(f"\n{scale} companies: {base_result['reports_per_s']} -> {new_result['reports_per_s']} reports/s")
+        for stage, stats in new_result["stages"].items():
+            old = base_result["stages"].get(stage)
+            if not old or not old["p50_s"]:
+                continue
+            change = (stats["p50_s"] - old["p50_s"]) / old["p50_s"] * 100
+            print(f"  {stage:<15} p50 {old['p50_s'] * 1000:9.2f} ms -> {stats['p50_s'] * 1000:9.2f} ms ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the report pipeline against local stand-ins")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100, 1000], help="Company counts to run")
+    parser.add_argument("--reviews", type=int, default=50, help="Reviews per company")
+    parser.add_argument("--no-print", action="store_true", help="Deliver the HTML format instead of printing with Chromium")
+    parser.add_argument("--pdf-output", choices=("disk", "memory"), default="disk",
+                        help="Print to a file and upload it, or upload the bytes from page.pdf() directly")
+    parser.add_argument("--output", help="Results file (default: bench_results/pipeline_<commit>_<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two results files")
+    parser.add_argument("--verbose", action="store_true", help="Keep pipeline INFO logging")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for scale in args.scales:
+            if not args.verbose:
+                logging.getLogger('InstaReview').setLevel(logging.WARNING)
+            print(f"Running {scale} companies x {args.reviews} reviews...")
+            result = asyncio.run(run_scale(scale, args.reviews, not args.no_print, work_dir, args.pdf_output))
+            results["scales"][str(scale)] = result
+            print(f"  {result['reports_per_s']} reports/s over {result['wall_s']} s, {result['mean_report_bytes']} bytes/report")
+            for stage in STAGES:
+                if stage in result["stages"]:
+                    stats = result["stages"][stage]
+                    print(f"  {stage:<10} p50 {stats['p50_s'] * 1000:9.2f} ms  p95 {stats['p95_s'] * 1000:9.2f} ms")
+
+    output = args.output or os.path.join("bench_results", f"pipeline_{results['commit']}_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark quote selection: the previous list-scan deduplication against QuoteSelector.
+
+Usage: python benchmark_quotes.py [--indicators 50000] [--distinct 0.5] [--repeat 3] [--output results.json]
+"""
+import argparse
+import json
+import random
+import time
+from quotes import QuoteSelector
+from review_records import FeedbackAnalysis
+
+WORDS = ("friendly", "staff", "slow", "service", "great", "coffee", "cold", "food", "clean", "tables",
+         "long", "wait", "tasty", "dessert", "noisy", "music", "fresh", "bread", "rude", "waiter")
+
+def make_analyses(indicators, distinct_ratio, seed=7):
+    """Analyses carrying `indicators` phrases in total, drawn from indicators * distinct_ratio distinct ones"""
+    rng = random.Random(seed)
+    pool = [" ".join(rng.choices(WORDS, k=rng.randint(2, 6))) + f" {i}" for i in range(max(1, int(indicators * distinct_ratio)))]
+    analyses = []
+    remaining = indicators
+    while remaining > 0:
+        size = min(remaining, rng.randint(1, 6))
+        phrases = tuple(rng.choice(pool) for _ in range(size))
+        split = rng.randint(0, size)
+        analyses.append(FeedbackAnalysis(rng.choice(("Positive", "Neutral", "Negative")), "", phrases[:split],
+                                         phrases[split:], False, (), "Low"))
+        remaining -= size
+    return analyses
+
+def legacy_select(analyses):
+    transcripts = []
+    for analysis in analyses:
+        for indicator in analysis.positive_indicators + analysis.negative_indicators:
+            if indicator and len(indicator) > 3 and indicator not in ['neutral', 'okay', 'uh']:
+                quote = f"Customer mentioned: {indicator}"
+                if quote not in transcripts:
+                    transcripts.append(quote)
+    return transcripts[:3]
+
+def indexed_select(analyses):
+    selector = QuoteSelector(limit=3)
+    for analysis in analyses:
+        selector.add_analysis(analysis)
+    return selector.select()
+
+def time_best(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run_benchmark(indicators, distinct_ratio, repeat):
+    analyses = make_analyses(indicators, distinct_ratio)
+    return {
+        "indicators": indicators,
+        "reviews": len(analyses),
+        "distinct_ratio": distinct_ratio,
+        "legacy_scan_s": round(time_best(lambda: legacy_select(analyses), repeat), 4),
+        "quote_selector_s": round(time_best(lambda: indexed_select(analyses), repeat), 4),
+        "selected": indexed_select(analyses),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark customer quote selection")
+    parser.add_argument("--indicators", type=int, default=50000)
+    parser.add_argument("--distinct", type=float, default=0.5, help="Fraction of indicators that are distinct phrases")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.indicators, args.distinct, args.repeat)
+    print(f"{results['indicators']} indicators across {results['reviews']} reviews ({args.distinct:.0%} distinct)")
+    print(f"{'legacy list scan':<20}{results['legacy_scan_s']:>10.4f}s")
+    print(f"{'QuoteSelector':<20}{results['quote_selector_s']:>10.4f}s")
+    for quote in results["selected"]:
+        print(f"  {quote}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
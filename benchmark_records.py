@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark review records: decoded dicts (the previous representation) against the slotted records.
+
+Measures memory per review with tracemalloc and the time of one aggregation
+pass that reads the fields the report uses.
+
+Usage: python benchmark_records.py [--reviews 50000] [--repeat 3] [--output results.json]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+import codec
+from review_records import decode_reviews
+from synthetic_data import generate_reviews
+
+def decode_dicts(items):
+    """The previous representation: each item with its metaData string decoded into nested dicts"""
+    return [dict(item, metaData=codec.loads(item["metaData"])) for item in items]
+
+def allocated_bytes(build):
+    """Bytes still allocated by the value build() returns"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        value = build()
+        return tracemalloc.get_traced_memory()[0] - before, value
+    finally:
+        tracemalloc.stop()
+
+def aggregate_dicts(items):
+    sentiment, duration, answers = {}, 0.0, 0.0
+    for item in items:
+        meta = item["metaData"]
+        key = meta["feedbackAnalysis"]["overallSentiment"]
+        sentiment[key] = sentiment.get(key, 0) + 1
+        duration += meta["audioDurationSec"]
+        for answer in item["quess"]:
+            answers += answer["answer"]
+    return sentiment, duration, answers
+
+def aggregate_records(reviews):
+    sentiment, duration, answers = {}, 0.0, 0.0
+    for review in reviews:
+        key = review.analysis.overall_sentiment
+        sentiment[key] = sentiment.get(key, 0) + 1
+        duration += review.audio_duration_sec
+        for answer in review.answers:
+            answers += answer.answer
+    return sentiment, duration, answers
+
+def time_best(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run_benchmark(count, repeat):
+    items = generate_reviews(count, seed=3)
+    dict_bytes, dicts = allocated_bytes(lambda: decode_dicts(items))
+    record_bytes, (reviews, _) = allocated_bytes(lambda: decode_reviews(items))
+    assert aggregate_dicts(dicts) == aggregate_records(reviews)
+    return {
+        "reviews": count,
+        "dict_bytes_per_review": round(dict_bytes / count),
+        "record_bytes_per_review": round(record_bytes / count),
+        "dict_aggregate_s": round(time_best(lambda: aggregate_dicts(dicts), repeat), 4),
+        "record_aggregate_s": round(time_best(lambda: aggregate_records(reviews), repeat), 4),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark slotted review records against decoded dicts")
+    parser.add_argument("--reviews", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.reviews, args.repeat)
+    print(f"{results['reviews']} reviews")
+    print(f"{'':<16}{'bytes/review':>14}{'aggregate':>12}")
+    print(f"{'decoded dicts':<16}{results['dict_bytes_per_review']:>14}{results['dict_aggregate_s']:>11.4f}s")
+    print(f"{'slotted records':<16}{results['record_bytes_per_review']:>14}{results['record_aggregate_s']:>11.4f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
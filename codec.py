@@ -0,0 +1,123 @@
+import json
+import os
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger('InstaReview')
+
+# A codec is a name plus loads/dumps callables; dumps always returns compact UTF-8 bytes
+Codec = namedtuple('Codec', ['name', 'loads', 'dumps', 'decode_reviews'])
+
+CODEC_PREFERENCE = ('orjson', 'msgspec', 'json')
+
+def _parse_meta_data(items, loads):
+    """Parse metaData JSON strings in place, dropping items whose metaData is not valid JSON"""
+    parsed = []
+    for item in items:
+        meta_data = item.get("metaData") if isinstance(item, dict) else None
+        if isinstance(meta_data, (str, bytes)):
+            try:
+                item["metaData"] = loads(meta_data)
+            except Exception:
+                continue
+        parsed.append(item)
+    return parsed
+
+# --- stdlib json ---
+def _json_loads(data):
+    return json.loads(data)
+
+def _json_dumps(obj):
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+
+def _build_json_codec():
+    def decode_reviews(payload):
+        data = _json_loads(payload) if isinstance(payload, (str, bytes)) else payload
+        return _parse_meta_data(data or [], _json_loads)
+    return Codec('json', _json_loads, _json_dumps, decode_reviews)
+
+# --- orjson ---
+def _build_orjson_codec():
+    import orjson
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj):
+        return orjson.dumps(obj, default=str, option=options)
+
+    def decode_reviews(payload):
+        data = orjson.loads(payload) if isinstance(payload, (str, bytes)) else payload
+        return _parse_meta_data(data or [], orjson.loads)
+    return Codec('orjson', orjson.loads, dumps, decode_reviews)
+
+# --- msgspec ---
+def _build_msgspec_codec():
+    import msgspec
+
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder(enc_hook=str)
+
+    def decode_reviews(payload):
+        data = decoder.decode(payload) if isinstance(payload, (str, bytes)) else payload
+        return _parse_meta_data(data or [], decoder.decode)
+    return Codec('msgspec', decoder.decode, encoder.encode, decode_reviews)
+
+_BUILDERS = {
+    'orjson': _build_orjson_codec,
+    'msgspec': _build_msgspec_codec,
+    'json': _build_json_codec,
+}
+
+def available_codecs():
+    """Return the names of codecs whose backing library is installed"""
+    names = []
+    for name in CODEC_PREFERENCE:
+        try:
+            _BUILDERS[name]()
+            names.append(name)
+        except ImportError:
+            continue
+    return names
+
+def get_codec(name=None):
+    """Build a codec by name; 'auto' picks the fastest installed backend"""
+    name = (name or os.getenv('JSON_CODEC', 'auto')).strip().lower()
+    candidates = CODEC_PREFERENCE if name == 'auto' else (name,)
+    for candidate in candidates:
+        if candidate not in _BUILDERS:
+            logger.warning(f"Unknown JSON_CODEC '{candidate}', using stdlib json")
+            break
+        try:
+            return _BUILDERS[candidate]()
+        except ImportError:
+            if name != 'auto':
+                logger.warning(f"JSON codec '{candidate}' is not installed, using stdlib json")
+    return _build_json_codec()
+
+_codec = None
+
+def _active_codec():
+    # Resolved lazily so JSON_CODEC from .env is honoured
+    global _codec
+    if _codec is None:
+        _codec = get_codec()
+        logger.info(f"Using '{_codec.name}' JSON codec")
+    return _codec
+
+def codec_name():
+    return _active_codec().name
+
+def loads(data):
+    """Parse JSON from str or bytes"""
+    return _active_codec().loads(data)
+
+def dumps(obj):
+    """Serialize to a compact JSON string"""
+    return _active_codec().dumps(obj).decode('utf-8')
+
+def dumps_bytes(obj):
+    """Serialize to compact UTF-8 JSON bytes"""
+    return _active_codec().dumps(obj)
+
+def decode_reviews(payload):
+    """Decode a reviews API payload, parsing each metaData string with the same codec"""
+    return _active_codec().decode_reviews(payload)
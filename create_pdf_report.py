@@ -1,19 +1,34 @@
+import argparse
 import asyncio
-from playwright.async_api import async_playwright
 import datetime
 import matplotlib.pyplot as plt
 import numpy as np
 import base64
+import hashlib
+import time
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 import math
+import re
 import PyPDF2
 import os
 import requests
-import json
 import boto3
 from dotenv import load_dotenv
 from logger import setup_logger, create_categorical_folders
 from fetch_customer_data import fetch_company_details, process_customer_data
+from artifacts import save_artifact
+from review_records import decode_reviews
+from themes import ThemeCounter
+from quotes import QuoteSelector
+from feedback_stats import FeedbackStats, format_duration, star_distribution
+from industry_index import current_index, company_metrics, benchmark_summary
+from periods import Period, get_report_period, parse_periods, union_bounds, bucket_by_period, week_period
+from instrumentation import span, record_bytes_out, write_run_summary
+from profiling import profile_stage, add_profile_arguments, configure_profiling
+from render_scheduler import RenderScheduler
+from native_pdf import render_native_pdf
+from pdf_optimizer import encode_chart, optimize_pdf, pdf_quality
 
 # Load environment variables
 load_dotenv()
@@ -25,127 +40,193 @@ folders = create_categorical_folders()
 # Get company ID from environment
 COMPANY_ID = os.getenv('COMPANY_ID')
 
-def upload_to_s3(file_path, company_id, week_num):
-    """Upload file to S3 using boto3 profile with YYYY/MM/W#.pdf format"""
+def build_s3_key(company_id, week_num, when=None, extension="pdf"):
+    """S3 key for a weekly report: instareview-reports/<company>/YYYY/MM/W#.pdf (or .html).
+
+    when dates the folder; by default the current week's, so live runs, period
+    runs and backfills file a week under the same key (the month of its Thursday).
+    """
+    when = when or week_period(current_time.date()).key_date
+    return f"instareview-reports/{company_id}/{when.year:04d}/{when.month:02d}/{week_num}.{extension}"
+
+def _s3_client():
+    session = boto3.Session(profile_name=os.getenv('AWS_PROFILE', 'default'))
+    return session.client('s3', region_name=os.getenv('AWS_REGION'))
+
+def content_sha256(body):
+    return hashlib.sha256(body).hexdigest()
+
+def _unchanged_in_s3(s3_client, bucket, s3_key, digest):
+    """True when the object at s3_key already has this content hash, so the PUT can be skipped (S3_SKIP_UNCHANGED)"""
+    if os.getenv('S3_SKIP_UNCHANGED', 'on').strip().lower() in ('off', 'false', '0'):
+        return False
+    try:
+        head = s3_client.head_object(Bucket=bucket, Key=s3_key)
+    except Exception:
+        return False
+    if head.get('Metadata', {}).get('sha256') != digest:
+        return False
+    logger.info(f"s3://{bucket}/{s3_key} is unchanged (sha256 {digest[:12]}), skipping upload")
+    return True
+
+def upload_to_s3(file_path, company_id, week_num, when=None):
+    """Upload file to S3 using boto3 profile with YYYY/MM/W#.pdf format; returns the S3 key"""
     try:
-        session = boto3.Session(profile_name=os.getenv('AWS_PROFILE', 'default'))
-        s3_client = session.client('s3', region_name=os.getenv('AWS_REGION'))
+        s3_client = _s3_client()
         bucket = os.getenv('AWS_S3_BUCKET')
+        s3_key = build_s3_key(company_id, week_num, when)
+        with open(file_path, 'rb') as f:
+            digest = content_sha256(f.read())
+        if _unchanged_in_s3(s3_client, bucket, s3_key, digest):
+            return s3_key
         
-        # Generate S3 path as YYYY/MM/W#.pdf
-        year = current_time.year
-        month = current_time.month
-        s3_key = f"instareview-reports/{company_id}/{year:04d}/{month:02d}/{week_num}.pdf"
-        
-        s3_client.upload_file(file_path, bucket, s3_key)
+        with span("upload", company_id):
+            s3_client.upload_file(file_path, bucket, s3_key, ExtraArgs={"Metadata": {"sha256": digest}})
+            record_bytes_out(os.path.getsize(file_path))
         logger.info(f"Uploaded {file_path} to s3://{bucket}/{s3_key}")
-        return True
+        return s3_key
     except Exception as e:
         logger.error(f"S3 upload failed: {e}")
-        return False
+        return None
+
+def upload_bytes_to_s3(pdf_bytes, company_id, week_num, when=None):
+    """Upload an in-memory PDF to S3 without touching disk; returns the S3 key"""
+    try:
+        s3_client = _s3_client()
+        bucket = os.getenv('AWS_S3_BUCKET')
+        s3_key = build_s3_key(company_id, week_num, when)
+        digest = content_sha256(pdf_bytes)
+        if _unchanged_in_s3(s3_client, bucket, s3_key, digest):
+            return s3_key
+        
+        with span("upload", company_id):
+            s3_client.put_object(Bucket=bucket, Key=s3_key, Body=pdf_bytes, ContentType="application/pdf",
+                                 Metadata={"sha256": digest})
+            record_bytes_out(len(pdf_bytes))
+        logger.info(f"Uploaded {len(pdf_bytes)} bytes to s3://{bucket}/{s3_key}")
+        return s3_key
+    except Exception as e:
+        logger.error(f"S3 upload failed: {e}")
+        return None
+
+def upload_html_to_s3(html_content, company_id, week_num, when=None):
+    """Upload the web version of a report as a static page; returns the S3 key"""
+    try:
+        s3_client = _s3_client()
+        bucket = os.getenv('AWS_S3_BUCKET')
+        s3_key = build_s3_key(company_id, week_num, when, extension="html")
+        body = html_content.encode('utf-8')
+        digest = content_sha256(body)
+        if _unchanged_in_s3(s3_client, bucket, s3_key, digest):
+            return s3_key
+        
+        with span("upload", company_id):
+            s3_client.put_object(Bucket=bucket, Key=s3_key, Body=body, Metadata={"sha256": digest},
+                                 ContentType="text/html; charset=utf-8", CacheControl="private, max-age=3600")
+            record_bytes_out(len(body))
+        logger.info(f"Uploaded web report ({len(body)} bytes) to s3://{bucket}/{s3_key}")
+        return s3_key
+    except Exception as e:
+        logger.error(f"S3 upload failed: {e}")
+        return None
+
+REPORT_FORMATS = ('pdf', 'html', 'both')
+
+def get_report_format(company=None):
+    """Delivery preference: the company's reportFormat field, else REPORT_FORMAT (default pdf)"""
+    report_format = str((company or {}).get('reportFormat') or os.getenv('REPORT_FORMAT', 'pdf')).strip().lower()
+    if report_format not in REPORT_FORMATS:
+        logger.warning(f"Unknown report format '{report_format}', falling back to 'pdf'")
+        return 'pdf'
+    return report_format
+
+def get_pdf_output_mode():
+    """PDF_OUTPUT: disk (write reports/*.pdf, default) or memory (upload bytes directly)"""
+    mode = os.getenv('PDF_OUTPUT', 'disk').strip().lower()
+    if mode not in ('disk', 'memory'):
+        logger.warning(f"Unknown PDF_OUTPUT '{mode}', falling back to 'disk'")
+        return 'disk'
+    return mode
+
+# Single background writer for optional local copies of in-memory PDFs; joined at interpreter exit
+_archive_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-archive")
+
+def _write_archive(path, pdf_bytes):
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, path)
+        logger.info(f"Archived report to {path}")
+    except OSError as e:
+        logger.error(f"Failed to archive report {path}: {e}")
+
+def archive_pdf(pdf_bytes, filename):
+    """Queue a local copy of an in-memory PDF under PDF_ARCHIVE_DIR; returns the path or None"""
+    archive_dir = os.getenv('PDF_ARCHIVE_DIR')
+    if not archive_dir:
+        return None
+    path = os.path.join(archive_dir, filename)
+    _archive_executor.submit(_write_archive, path, pdf_bytes)
+    return path
 
 # --- Get Current Time for Timestamps ---
 current_time = datetime.datetime.now()
 logger.info("Starting automated company weekly analytics report generation")
 
-def generate_report_data(filtered_data):
+def generate_report_data(filtered_data, company_id=None):
     logger.info("Generating customer feedback analytics...")
     
-    # Process to structured format
-    survey_data = []
-    audio_feedback_data = []
-    
-    for item in filtered_data:
-        if item.get("quess"):
-            for survey_item in item["quess"]:
-                formatted_survey = {
-                    "M": {
-                        "question": {"S": survey_item["question"]},
-                        "answer": {"N": str(survey_item["answer"])},
-                        "questionId": {"S": survey_item["questionId"]}
-                    }
-                }
-                survey_data.append(formatted_survey)
-        
-        if item.get("metaData"):
-            meta_data = item["metaData"]
-            if isinstance(meta_data, str):
-                try:
-                    meta_data = json.loads(meta_data)
-                except:
-                    continue
-            
-
-            
-            formatted_audio = {
-                "audioId": meta_data["audioId"],
-                "detectedLanguage": meta_data["detectedLanguage"],
-                "audioDurationSec": str(meta_data["audioDurationSec"]),
-                "companyName": item["companyId"],
-                "transcript": meta_data.get("transcript", ""),
-                "feedbackAnalysis": {
-                    "overallSentiment": meta_data["feedbackAnalysis"]["overallSentiment"],
-                    "tonePrimary": meta_data["feedbackAnalysis"]["tonePrimary"],
-                    "positiveIndicators": meta_data["feedbackAnalysis"]["positiveIndicators"],
-                    "negativeIndicators": meta_data["feedbackAnalysis"]["negativeIndicators"],
-                    "complaintsDetected": str(meta_data["feedbackAnalysis"]["complaintsDetected"]).lower(),
-                    "recommendations": meta_data["feedbackAnalysis"]["recommendations"],
-                    "retentionRisk": meta_data["feedbackAnalysis"]["retentionRisk"]
-                }
-            }
-            audio_feedback_data.append(formatted_audio)
+    # Decode to typed records in one validating pass; malformed items are skipped
+    reviews, skipped = decode_reviews(filtered_data)
     
     # Calculate metrics
-    survey_metrics = {"total_responses": len(survey_data), "question_averages": {}}
+    survey_metrics = {"total_responses": 0, "question_averages": {}}
     question_totals = {}
     question_counts = {}
+    feedback_stats = FeedbackStats()
     
-    for item in survey_data:
-        question = item["M"]["question"]["S"]
-        answer = float(item["M"]["answer"]["N"])
-        if question not in question_totals:
-            question_totals[question] = 0
-            question_counts[question] = 0
-        question_totals[question] += answer
-        question_counts[question] += 1
+    for review in reviews:
+        feedback_stats.add_review(review)
+        for answer in review.answers:
+            question = answer.question
+            if question not in question_totals:
+                question_totals[question] = 0
+                question_counts[question] = 0
+            question_totals[question] += answer.answer
+            question_counts[question] += 1
+            survey_metrics["total_responses"] += 1
     
     for question in question_totals:
         survey_metrics["question_averages"][question] = round(question_totals[question] / question_counts[question], 1)
     
     # Audio metrics
+    audio_feedback_data = [review.analysis for review in reviews if review.analysis is not None]
     sentiment_counts = {"Positive": 0, "Neutral": 0, "Negative": 0}
-    positive_themes = set()
-    negative_themes = set()
-    recommendations = []
-    transcripts = []
-    
-    for item in audio_feedback_data:
-        sentiment = item["feedbackAnalysis"]["overallSentiment"]
-        sentiment_counts[sentiment] += 1
-        positive_themes.update(item["feedbackAnalysis"]["positiveIndicators"])
-        negative_themes.update(item["feedbackAnalysis"]["negativeIndicators"])
-        recommendations.extend(item["feedbackAnalysis"]["recommendations"])
-        # Use positive and negative indicators as customer quotes
-        feedback_analysis = meta_data.get("feedbackAnalysis", {})
-        positive_indicators = feedback_analysis.get("positiveIndicators", [])
-        negative_indicators = feedback_analysis.get("negativeIndicators", [])
-        
-        # Combine positive and negative indicators as quotes
-        all_indicators = positive_indicators + negative_indicators
-        for indicator in all_indicators:
-            if indicator and len(indicator) > 3 and indicator not in ['neutral', 'okay', 'uh']:  # Filter out generic words
-                quote = f"Customer mentioned: {indicator}"
-                if quote not in transcripts:  # Avoid duplicates
-                    transcripts.append(quote)
+    positive_themes = ThemeCounter()
+    negative_themes = ThemeCounter()
+    recommendations = ThemeCounter()
+    quotes = QuoteSelector(limit=3)
+    
+    for analysis in audio_feedback_data:
+        sentiment_counts[analysis.overall_sentiment] += 1
+        positive_themes.update(analysis.positive_indicators)
+        negative_themes.update(analysis.negative_indicators)
+        recommendations.update(analysis.recommendations)
+        quotes.add_analysis(analysis)
     
     total_audio = len(audio_feedback_data)
+    top_positive = positive_themes.top(5, with_error=True)
+    top_negative = negative_themes.top(5, with_error=True)
     audio_metrics = {
         "total_feedback": total_audio,
         "sentiment_distribution": sentiment_counts,
-        "positive_themes": list(positive_themes)[:5],
-        "negative_themes": list(negative_themes)[:5],
-        "recommendations": recommendations[:3],
-        "sample_transcripts": transcripts[:3] if transcripts else ["No transcript available"]
+        "positive_themes": [theme for theme, _, _ in top_positive],
+        "negative_themes": [theme for theme, _, _ in top_negative],
+        "theme_counts": {"positive": top_positive, "negative": top_negative},
+        "recommendations": [recommendation for recommendation, _ in recommendations.top(3)],
+        "sample_transcripts": quotes.select() or ["No transcript available"]
     }
     
     # Overall stats
@@ -164,14 +245,15 @@ def generate_report_data(filtered_data):
     report_data = {
         "survey_metrics": survey_metrics,
         "audio_metrics": audio_metrics,
-        "overall_stats": overall_stats
+        "overall_stats": overall_stats,
+        "feedback_stats": feedback_stats.summary(),
+        "skipped_records": skipped
     }
     
-    # Save analytics summary
-    analytics_file = os.path.join(folders['data'], f"analytics_summary_{timestamp}.json")
-    with open(analytics_file, "w") as f:
-        json.dump(report_data, f, indent=2)
-    logger.info(f"Saved customer feedback analytics to {analytics_file}")
+    # Keep analytics summary according to the artifact policy
+    analytics_file = save_artifact("analytics_summary", report_data, company_id or os.getenv('COMPANY_ID'), timestamp)
+    if analytics_file:
+        logger.info(f"Queued customer feedback analytics for {analytics_file}")
     
     return report_data
 
@@ -190,19 +272,36 @@ filtered_data = None
 report_data = None
 client_data = None
 
-def initialize_report_data():
-    """Initialize report data for current company"""
+# Aggregates of the configured week computed earlier in this run, by company id; used once instead of the reviews
+_aggregates = {}
+
+def use_aggregates(aggregates):
+    """Hand over {company_id: report_data} computed earlier in this run (by the batch run's phase one)"""
+    _aggregates.update(aggregates)
+
+def has_aggregate(company_id, period=None):
+    """Whether a handed-over aggregate covers this company's report for period (None is the configured week)"""
+    return company_id in _aggregates and period in (None, Period("week", *get_report_period(current_time)))
+
+def initialize_report_data(data=None, period=None, company_details=None, company_id=None):
+    """Initialize report data for current company, for period or the configured week"""
     global filtered_data, report_data, client_data
     
+    # A handed-over aggregate replaces fetching and aggregating the reviews again
+    if data is None and has_aggregate(company_id, period):
+        filtered_data = []
+        report_data = _aggregates.pop(company_id)
+        logger.info(f"Using the aggregate computed earlier in this run: {report_data['overall_stats']['total_feedback']} responses")
+        initialize_client_data(period, company_details)
+        return True
+    
     logger.info("Processing real customer feedback data from API...")
-    # Check if filtered data exists from API call
-    if os.path.exists('output_data/customer_feedback.json'):
-        with open('output_data/customer_feedback.json', 'r') as f:
-            filtered_data = json.load(f)
+    # Use data already fetched by the caller, otherwise fetch it now
+    if data is not None:
+        filtered_data = data
         logger.info(f"Using filtered data from API: {len(filtered_data)} records")
     else:
-        # Fallback to process_customer_data if no filtered data
-        filtered_data = process_customer_data()
+        filtered_data = process_customer_data(company_id=company_id)
         logger.info(f"Using all data from process_customer_data: {len(filtered_data)} records")
 
     if not filtered_data:
@@ -210,19 +309,24 @@ def initialize_report_data():
         return False
 
     logger.info("Generating customer feedback report analytics...")
-    report_data = generate_report_data(filtered_data)
+    report_data = generate_report_data(filtered_data, company_id)
     logger.info("Customer feedback analytics generated successfully")
     
     # Initialize client data
-    initialize_client_data()
+    initialize_client_data(period, company_details)
     return True
 
-def initialize_client_data():
-    """Initialize client data for current company"""
+def nps_score(overall_stats):
+    """NPS shown in the report, estimated from the sentiment split"""
+    return max(10, min(100, 50 + (overall_stats["positive_percentage"] - overall_stats["negative_percentage"])))
+
+def initialize_client_data(period=None, company_details=None):
+    """Initialize client data for current company; company details are fetched unless passed in"""
     global client_data, filtered_data, report_data
     
     # Fetch company details
-    company_details = fetch_company_details()
+    if company_details is None:
+        company_details = fetch_company_details()
     company_name = "Unknown Company"
     company_city = "Unknown"
     company_industry = "Unknown"
@@ -239,17 +343,16 @@ def initialize_client_data():
         logger.warning("Using fallback company name from companyId")
 
     # Calculate report period from form dates or current date
-    from_date_env = os.getenv('REPORT_FROM_DATE')
-    to_date_env = os.getenv('REPORT_TO_DATE')
-
-    if from_date_env and to_date_env:
-        from datetime import datetime as dt
-        week_start = dt.fromisoformat(from_date_env.replace('Z', '')).date()
-        week_end = dt.fromisoformat(to_date_env.replace('Z', '')).date()
-    else:
-        today = current_time.date()
-        week_start = today - datetime.timedelta(days=today.weekday())
-        week_end = week_start + datetime.timedelta(days=6)
+    if period is None:
+        period = Period("week", *get_report_period(current_time))
+    week_start, week_end = period.start, period.end
+    
+    duration_stats = report_data["feedback_stats"]["audio_duration_sec"]
+    
+    # Percentile ranks against the batch's industry index, when benchmarks are on
+    index = current_index()
+    comparison = index.compare(company_industry, company_city, company_metrics(report_data, nps_score(report_data["overall_stats"]))) if index else None
+    rating_stats = report_data["feedback_stats"]["ratings"]
 
     client_data = {
         "company_name": company_name,
@@ -257,14 +360,19 @@ def initialize_client_data():
         "company_industry": company_industry,
         "report_period_start": week_start,
         "report_period_end": week_end,
-        "date_generated": current_time.date(),
-        "generation_timestamp": current_time.strftime('%B %d, %Y at %I:%M:%S %p'),
+        "report_period_label": period.label,
+        "report_cadence": period.cadence,
+        # The period's last day, not the run's, so the PDF doesn't change with the day it is run
+        "date_generated": week_end,
         "total_reviews": report_data["overall_stats"]["total_feedback"],
         "positive_reviews": int(report_data["overall_stats"]["total_feedback"] * report_data["overall_stats"]["positive_percentage"] / 100),
         "neutral_reviews": int(report_data["overall_stats"]["total_feedback"] * report_data["overall_stats"]["neutral_percentage"] / 100),
         "negative_reviews": int(report_data["overall_stats"]["total_feedback"] * report_data["overall_stats"]["negative_percentage"] / 100),
-        "avg_feedback_duration": "1.8 min",
-        "nps_score": max(10, min(100, 50 + (report_data["overall_stats"]["positive_percentage"] - report_data["overall_stats"]["negative_percentage"]))),
+        "avg_feedback_duration": format_duration(duration_stats["mean"]),
+        "median_feedback_duration": format_duration(duration_stats["median"]),
+        "p90_feedback_duration": format_duration(duration_stats["p90"]),
+        "nps_score": nps_score(report_data["overall_stats"]),
+        "benchmark_summary": benchmark_summary(comparison),
         "top_questions": list(report_data["survey_metrics"]["question_averages"].items()),
         "channels": {
             "Survey": round((report_data["survey_metrics"]["total_responses"] / report_data["overall_stats"]["total_feedback"]) * 100) if report_data["overall_stats"]["total_feedback"] > 0 else 0,
@@ -286,14 +394,17 @@ def initialize_client_data():
         },
         "star_ratings_data": {
             "labels": ["5 ★", "4 ★", "3 ★", "2 ★", "1 ★"],
-            "values": [
+            # Actual survey answers; without any, estimated from sentiment as before
+            "values": star_distribution(rating_stats) or [
                 report_data["overall_stats"]["positive_percentage"],
                 max(0, 100 - report_data["overall_stats"]["positive_percentage"] - report_data["overall_stats"]["neutral_percentage"] - report_data["overall_stats"]["negative_percentage"]),
                 report_data["overall_stats"]["neutral_percentage"],
                 max(0, report_data["overall_stats"]["negative_percentage"] // 2),
                 max(0, report_data["overall_stats"]["negative_percentage"] - (report_data["overall_stats"]["negative_percentage"] // 2))
             ],
-            "average": round(sum([avg for _, avg in report_data["survey_metrics"]["question_averages"].items()]) / len(report_data["survey_metrics"]["question_averages"]), 1) if report_data["survey_metrics"]["question_averages"] else 0
+            "average": round(rating_stats["mean"], 1) if rating_stats["count"] else 0,
+            "median": rating_stats["median"],
+            "p90": rating_stats["p90"]
         }
     }
 
@@ -323,8 +434,7 @@ def create_sentiment_trend_chart():
     ax.set_ylabel('Sentiment %', fontsize=8); ax.tick_params(axis='both', labelsize=7)
     ax.legend(loc='upper right', fontsize=6); ax.set_ylim(0, 100)
     ax.spines['top'].set_visible(False); ax.spines['right'].set_visible(False)
-    buf = BytesIO(); plt.savefig(buf, format='png', bbox_inches='tight', dpi=150, facecolor='white'); buf.seek(0)
-    img_b64 = base64.b64encode(buf.read()).decode(); plt.close(); return img_b64
+    img_b64 = encode_chart(fig); plt.close(); return img_b64
 
 def create_star_ratings_chart():
     fig, ax = plt.subplots(figsize=(3, 2.5), facecolor='white')
@@ -334,8 +444,7 @@ def create_star_ratings_chart():
     ax.set_ylabel('Reviews (%)', fontsize=8); ax.tick_params(axis='both', labelsize=8)
     for bar, value in zip(bars, values): ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 1, f'{value}%', ha='center', va='bottom', fontsize=7, fontweight='bold')
     ax.spines['top'].set_visible(False); ax.spines['right'].set_visible(False); ax.grid(True, alpha=0.3, axis='y')
-    buf = BytesIO(); plt.savefig(buf, format='png', bbox_inches='tight', dpi=150, facecolor='white'); buf.seek(0)
-    img_b64 = base64.b64encode(buf.read()).decode(); plt.close(); return img_b64
+    img_b64 = encode_chart(fig); plt.close(); return img_b64
 
 def create_channel_pie_chart():
     fig, ax = plt.subplots(figsize=(3, 2.5), facecolor='white')
@@ -344,8 +453,7 @@ def create_channel_pie_chart():
     wedges, texts, autotexts = ax.pie(values, labels=channels, colors=colors, autopct='%1.1f%%', startangle=90, textprops={'fontsize': 8})
     for autotext in autotexts: autotext.set_color('white'); autotext.set_fontweight('bold')
     ax.set_title('Channel Distribution', fontsize=10, fontweight='bold', pad=10)
-    buf = BytesIO(); plt.savefig(buf, format='png', bbox_inches='tight', dpi=150, facecolor='white'); buf.seek(0)
-    img_b64 = base64.b64encode(buf.read()).decode(); plt.close(); return img_b64
+    img_b64 = encode_chart(fig); plt.close(); return img_b64
 
 def create_nps_trend_chart():
     fig, ax = plt.subplots(figsize=(3, 2.5), facecolor='white')
@@ -357,8 +465,7 @@ def create_nps_trend_chart():
     ax.set_ylabel('NPS Score', fontsize=8); ax.tick_params(axis='both', labelsize=8)
     ax.set_ylim(60, 70); ax.grid(True, alpha=0.3, linestyle='--')
     ax.spines['top'].set_visible(False); ax.spines['right'].set_visible(False)
-    buf = BytesIO(); plt.savefig(buf, format='png', bbox_inches='tight', dpi=150, facecolor='white'); buf.seek(0)
-    img_b64 = base64.b64encode(buf.read()).decode(); plt.close(); return img_b64
+    img_b64 = encode_chart(fig); plt.close(); return img_b64
 
 def generate_charts():
     """Generate all charts for the report"""
@@ -378,14 +485,14 @@ def generate_header_template():
         <div style="display: flex; align-items: center; gap: 12px;">
             <div style="width: 32px; height: 32px; background: linear-gradient(135deg, #1e40af, #3b82f6); border-radius: 8px; display: flex; align-items: center; justify-content: center; color: white; font-weight: 800; font-size: 14px;">TC</div>
             <div>
-                <div style="font-size: 14px; font-weight: 700; color: #1e293b; margin: 0;">{client_data['company_name']} Weekly Analytics Report</div>
+                <div style="font-size: 14px; font-weight: 700; color: #1e293b; margin: 0;">{client_data['company_name']} {client_data['report_cadence']} Analytics Report</div>
                 <div style="font-size: 9px; color: #64748b; margin: 0;">{client_data['company_city']} | {client_data['company_industry']} Industry</div>
                 <div style="font-size: 10px; color: #64748b; margin: 0; display: flex; align-items: center; gap: 8px;">Powered by <div style="width: 16px; height: 16px; background: linear-gradient(135deg, #3b82f6, #8b5cf6); border-radius: 4px; display: flex; align-items: center; justify-content: center; color: white; font-weight: 800; font-size: 8px;">IR</div> InstaReview.ai</div>
             </div>
         </div>
         <div style="text-align: right;">
-            <div style="font-size: 11px; font-weight: 600; color: #3b82f6;">Week of {client_data['report_period_start'].strftime('%b %d')} – {client_data['report_period_end'].strftime('%b %d, %Y')}</div>
-            <div style="font-size: 9px; color: #64748b;">Generated on {current_time.strftime('%B %d, %Y')}</div>
+            <div style="font-size: 11px; font-weight: 600; color: #3b82f6;">{client_data['report_period_label']}</div>
+            <div style="font-size: 9px; color: #64748b;">Data through {client_data['date_generated'].strftime('%B %d, %Y')}</div>
         </div>
     </div>
 </div>
@@ -398,7 +505,7 @@ def generate_footer_template():
 <div style="width: 100%; font-family: 'Inter', sans-serif; background: linear-gradient(135deg, #1e293b 0%, #334155 100%); color: white; padding: 12px 20mm; box-sizing: border-box; border-top: 3px solid #3b82f6;">
     <div style="display: flex; justify-content: space-between; align-items: center;">
         <div style="display: flex; align-items: center; gap: 8px;">
-            <div style="font-size: 10px; font-weight: 500;">{client_data['company_name']} | Weekly Analytics Report</div>
+            <div style="font-size: 10px; font-weight: 500;">{client_data['company_name']} | {client_data['report_cadence']} Analytics Report</div>
             <div style="font-size: 8px; color: #94a3b8; margin-top: 2px;">*Analysis based on AI processing of transcript metadata, not human review</div>
         </div>
         <div style="display: flex; align-items: center; gap: 12px;">
@@ -412,12 +519,15 @@ def generate_footer_template():
 def generate_html_content(trend_chart, star_chart, channel_chart, nps_chart):
     """Generate HTML content for the report"""
     global client_data, report_data
+    benchmark_line = ""
+    if client_data.get('benchmark_summary'):
+        benchmark_line = f'<div style="font-size: 10px; color: #3b82f6; margin-top: 4px;">{client_data["benchmark_summary"]}</div>'
     return f"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
-    <title>{client_data['company_name']} Weekly Analytics Report - InstaReview.ai</title>
+    <title>{client_data['company_name']} {client_data['report_cadence']} Analytics Report - InstaReview.ai</title>
     <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
     <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
     <style>
@@ -542,6 +652,7 @@ def generate_html_content(trend_chart, star_chart, channel_chart, nps_chart):
                         <div class="mb-1">Survey Responses: {report_data['survey_metrics']['total_responses']}</div>
                         <div class="mb-1">Audio Feedback: {report_data['audio_metrics']['total_feedback']}</div>
                         <div class="mb-1">Total Feedback: {report_data['overall_stats']['total_feedback']}</div>
+                        <div class="mb-1">Audio Length: {client_data['avg_feedback_duration']} avg, {client_data['median_feedback_duration']} median, {client_data['p90_feedback_duration']} p90</div>
                         <div class="mb-1">Complaints Detected: {sum(1 for item in report_data['audio_metrics'].get('sample_transcripts', []) if 'disappointing' in item.lower() or 'bad' in item.lower())}/{report_data['audio_metrics']['total_feedback']}</div>
                     </div>
                 </div>
@@ -580,6 +691,7 @@ def generate_html_content(trend_chart, star_chart, channel_chart, nps_chart):
                         <div class="col-8">
                             <div class="mb-2"><i class="fas fa-lightbulb text-warning"></i> <strong>Next Steps</strong></div>
                             <div style="font-size: 11px; color: #64748b;">Focus on product quality improvements based on feedback</div>
+                            {benchmark_line}
                         </div>
                         <div class="col-4 text-end">
                             <div class="mb-1"><span class="badge bg-primary">NPS Score: {client_data['nps_score']}</span></div>
@@ -605,93 +717,335 @@ def generate_html_content(trend_chart, star_chart, channel_chart, nps_chart):
 </html>
 """
 
-def remove_blank_pages(input_path):
-    """Remove blank pages from PDF."""
-    name, ext = os.path.splitext(input_path)
+def _drop_blank_pages(source, destination):
+    reader = PyPDF2.PdfReader(source)
+    writer = PyPDF2.PdfWriter()
+    
+    for i, page in enumerate(reader.pages):
+        text = page.extract_text().strip()
+        # Check if page has substantial content (not just header/footer)
+        if len(text) >= 50 and ('Total Reviews' in text or 'Weekly Report' in text or 'Sentiment Trend' in text):
+            writer.add_page(page)
+    
+    writer.write(destination)
+
+def remove_blank_pages(pdf):
+    """Remove blank pages from PDF. Accepts a file path (returns the new path) or PDF bytes (returns bytes)."""
+    if isinstance(pdf, (bytes, bytearray)):
+        output = BytesIO()
+        _drop_blank_pages(BytesIO(pdf), output)
+        return output.getvalue()
+    
+    name, ext = os.path.splitext(pdf)
     output_path = f"{name}_final{ext}"
     
-    with open(input_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        writer = PyPDF2.PdfWriter()
-        
-        for i, page in enumerate(reader.pages):
-            text = page.extract_text().strip()
-            # Check if page has substantial content (not just header/footer)
-            if len(text) >= 50 and ('Total Reviews' in text or 'Weekly Report' in text or 'Sentiment Trend' in text):
-                writer.add_page(page)
-        
+    with open(pdf, 'rb') as file:
         with open(output_path, 'wb') as output_file:
-            writer.write(output_file)
+            _drop_blank_pages(file, output_file)
     
-    os.remove(input_path)
+    os.remove(pdf)
     return output_path
 
-async def generate_pdf():
-    global client_data, report_data
+# Document info of every deterministic PDF; the printed title is kept, dates are dropped
+STABLE_METADATA = {"/Producer": "InstaReview.ai", "/Creator": "InstaReview.ai"}
+
+def deterministic_pdf():
+    """DETERMINISTIC_PDF: on (default) rewrites printed PDFs with fixed metadata and no random file ID"""
+    return os.getenv('DETERMINISTIC_PDF', 'on').strip().lower() not in ('off', 'false', '0')
+
+def stabilize_pdf(pdf_bytes):
+    """Rewrite a printed PDF so identical content gives identical bytes (DETERMINISTIC_PDF, on by default).
+
+    Chromium and matplotlib stamp the creation time into the document info and
+    Chromium adds a random file ID; the copy keeps the pages and title only.
+    """
+    if not deterministic_pdf():
+        return pdf_bytes
+    try:
+        reader = PyPDF2.PdfReader(BytesIO(pdf_bytes))
+        writer = PyPDF2.PdfWriter()
+        for page in reader.pages:
+            writer.add_page(page)
+        metadata = dict(STABLE_METADATA)
+        if reader.metadata and reader.metadata.title:
+            metadata["/Title"] = reader.metadata.title
+        writer.add_metadata(metadata)
+        output = BytesIO()
+        writer.write(output)
+        return output.getvalue()
+    except Exception as e:
+        logger.warning(f"Could not normalize PDF metadata, keeping the printed bytes: {e}")
+        return pdf_bytes
+
+def finish_pdf(pdf_bytes, company_id=None):
+    """Post-process a printed PDF in one rewrite: stable metadata and the PDF_QUALITY optimization.
+
+    CPU-bound, so async callers run it with asyncio.to_thread.
+    """
+    if pdf_quality() == 'off':
+        return stabilize_pdf(pdf_bytes)
+    return optimize_pdf(pdf_bytes, company_id, STABLE_METADATA if deterministic_pdf() else None)
+
+def get_pdf_backend():
+    """PDF_BACKEND: playwright (Chromium print of the HTML, default) or native (matplotlib drawing)"""
+    backend = os.getenv('PDF_BACKEND', 'playwright').strip().lower()
+    if backend not in ('playwright', 'native'):
+        logger.warning(f"Unknown PDF_BACKEND '{backend}', falling back to 'playwright'")
+        return 'playwright'
+    return backend
+
+def prepare_report(data=None, company_id=None, period=None, company_details=None):
+    """Aggregate and chart one company's report; returns the four base64 PNG charts.
+
+    Reviews and company details are fetched unless passed in.
+    """
+    company_id = company_id or os.getenv('COMPANY_ID', 'unknown')
+    
+    # Fetch before aggregating so API time is only counted in the fetch stage
+    if data is None and not has_aggregate(company_id, period):
+        data = process_customer_data(*((period.start, period.end) if period else (None, None)), company_id)
+    if company_details is None:
+        with span("fetch", company_id):
+            company_details = fetch_company_details(company_id) or {}
     
     # Initialize data if not already done
-    if not initialize_report_data():
-        raise Exception("Failed to initialize report data")
+    with span("aggregate", company_id), profile_stage("aggregate", company_id, trace_memory=True):
+        if not initialize_report_data(data, period, company_details, company_id):
+            raise Exception("Failed to initialize report data")
     
-    # Generate charts and HTML content
-    trend_chart = create_sentiment_trend_chart()
-    star_chart = create_star_ratings_chart()
-    channel_chart = create_channel_pie_chart()
-    nps_chart = create_nps_trend_chart()
+    # Generate charts
+    with span("chart", company_id), profile_stage("chart", company_id, trace_memory=True):
+        trend_chart = create_sentiment_trend_chart()
+        star_chart = create_star_ratings_chart()
+        channel_chart = create_channel_pie_chart()
+        nps_chart = create_nps_trend_chart()
+    
+    return trend_chart, star_chart, channel_chart, nps_chart
+
+def build_report_html(data=None, company_id=None, period=None, company_details=None):
+    """Aggregate, chart and lay out one company's report; returns (html, header, footer).
+
+    Runs without awaiting, so the module-level report state is never shared
+    between companies whose PDFs are printing concurrently.
+    """
+    company_id = company_id or os.getenv('COMPANY_ID', 'unknown')
+    trend_chart, star_chart, channel_chart, nps_chart = prepare_report(data, company_id, period, company_details)
     
     # Generate templates
-    header_template = generate_header_template()
-    footer_template = generate_footer_template()
-    html_content = generate_html_content(trend_chart, star_chart, channel_chart, nps_chart)
+    with span("html", company_id) as html_span, profile_stage("html", company_id):
+        header_template = generate_header_template()
+        footer_template = generate_footer_template()
+        html_content = generate_html_content(trend_chart, star_chart, channel_chart, nps_chart)
+        html_span.add_bytes_out(len(html_content))
+    
+    return html_content, header_template, footer_template
+
+def build_web_page(html_content, header_template, footer_template):
+    """Standalone web version of the report: the print header and footer become page sections"""
+    footer = re.sub(r'<div[^>]*>Page <span class="pageNumber"></span> of <span class="totalPages"></span></div>', '', footer_template)
+    web_style = '<style>.page { min-height: auto; padding: 8mm 15mm; margin: 0 auto; }</style>'
+    html_content = html_content.replace('</head>', f'{web_style}\n</head>', 1)
+    html_content = html_content.replace('<body>', f'<body>\n{header_template}', 1)
+    return html_content.replace('</body>', f'{footer}\n</body>', 1)
+
+def render_native_bytes(data=None, company_id=None, period=None, company_details=None):
+    """Aggregate, chart and draw one report with matplotlib; returns the PDF bytes before finish_pdf"""
+    company_id = company_id or os.getenv('COMPANY_ID', 'unknown')
+    charts = prepare_report(data, company_id, period, company_details)
+    logger.info("Drawing customer feedback PDF report natively...")
+    with span("print", company_id) as print_span, profile_stage("print", company_id):
+        pdf_bytes = render_native_pdf(client_data, report_data, charts, client_data['date_generated'].strftime('%B %d, %Y'))
+        print_span.add_bytes_out(len(pdf_bytes))
+    return pdf_bytes
+
+async def render_pdf_bytes(data=None, company_id=None, scheduler=None, document=None, period=None,
+                           company_details=None):
+    """Build and print one report without saving or uploading it; returns (pdf_bytes, print_started).
+
+    Pass a started RenderScheduler to share one browser between reports,
+    otherwise a single-page browser is launched for this report. With
+    PDF_BACKEND=native the report is drawn by matplotlib and no browser is used.
+    document is an (html, header, footer) tuple already built for this company.
+    period is the Period to report on; by default the configured week.
+    company_details is the company record, fetched when not passed in.
+    """
+    company_id = company_id or os.getenv('COMPANY_ID', 'unknown')
+    if get_pdf_backend() == 'native':
+        print_started = time.perf_counter()
+        pdf_bytes = render_native_bytes(data, company_id, period, company_details)
+        return await asyncio.to_thread(finish_pdf, pdf_bytes, company_id), print_started
     
+    html_content, header_template, footer_template = document or build_report_html(data, company_id, period, company_details)
     logger.info("Starting customer feedback PDF report generation...")
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page()
-        await page.set_content(html_content, wait_until="networkidle")
-        logger.info("HTML content loaded successfully")
+    print_started = time.perf_counter()
+    with profile_stage("print", company_id):
+        if scheduler is not None:
+            pdf_bytes = await scheduler.render(html_content, header_template, footer_template, company_id)
+        else:
+            async with RenderScheduler(concurrency=1) as own_scheduler:
+                pdf_bytes = await own_scheduler.render(html_content, header_template, footer_template, company_id)
+    return await asyncio.to_thread(finish_pdf, pdf_bytes, company_id), print_started
 
+def store_pdf(pdf_bytes, company_id, pdf_filename, week_num, when=None):
+    """Save a printed report per PDF_OUTPUT and upload it under YYYY/MM/<week_num>.pdf; returns (pdf_path, s3_key)"""
+    output_mode = get_pdf_output_mode()
+    pdf_path = None
+    
+    if output_mode == 'disk':
         # Save to timestamped reports folder with company ID
-        company_id = os.getenv('COMPANY_ID', 'unknown')
-        pdf_filename = f"Company_Weekly_Analytics_{company_id}_{timestamp}.pdf"
         pdf_path = os.path.join(folders['reports'], pdf_filename)
+        with open(pdf_path, 'wb') as f:
+            f.write(pdf_bytes)
+    logger.info(f"Company analytics report generated: {pdf_path or 'in memory'}")
+    
+    # Upload to S3
+    if output_mode == 'memory':
+        pdf_path = archive_pdf(pdf_bytes, pdf_filename)
+        s3_key = upload_bytes_to_s3(pdf_bytes, company_id, week_num, when)
+    else:
+        s3_key = upload_to_s3(pdf_path, company_id, week_num, when)
+    return pdf_path, s3_key
 
-        await page.pdf(
-            path=pdf_path,
-            format="A4",
-            print_background=True,
-            display_header_footer=True,
-            header_template=header_template,
-            footer_template=footer_template,
-            margin={"top": "25mm", "bottom": "22mm", "left": "15mm", "right": "15mm"}
-        )
-        await browser.close()
-        logger.info(f"Company weekly analytics report generated: {pdf_path}")
-        
-        # Upload to S3
-        week_num = current_time.isocalendar()[1]  # Get ISO week number
-        if upload_to_s3(pdf_path, company_id, week_num):
-            print(f"Report uploaded to S3 successfully!")
-        else:
-            print(f"S3 upload failed, but PDF saved locally")
-        
-        print(f"Company Weekly Analytics Report generated successfully!")
+async def generate_pdf(data=None, company_id=None, scheduler=None, document=None):
+    """Build, print and upload one report; returns (pdf_path, s3_key).
+
+    scheduler and document are passed to render_pdf_bytes.
+    """
+    company_id = company_id or os.getenv('COMPANY_ID', 'unknown')
+    pdf_filename = f"Company_Weekly_Analytics_{company_id}_{timestamp}.pdf"
+    
+    pdf_bytes, print_started = await render_pdf_bytes(data, company_id, scheduler, document)
+    pdf_size = len(pdf_bytes)
+    
+    week_num = current_time.isocalendar()[1]  # Get ISO week number
+    pdf_path, s3_key = store_pdf(pdf_bytes, company_id, pdf_filename, week_num)
+    time_to_upload = time.perf_counter() - print_started
+    
+    if s3_key:
+        logger.info(f"Report uploaded to S3: {pdf_size} bytes, {time_to_upload:.2f}s from print to upload",
+                    extra={"pdf_bytes": pdf_size, "time_to_upload_s": round(time_to_upload, 3), "pdf_output": get_pdf_output_mode()})
+        print(f"Report uploaded to S3 successfully!")
+    elif pdf_path:
+        print(f"S3 upload failed, but PDF saved locally")
+    else:
+        print(f"S3 upload failed")
+    
+    print(f"Company Weekly Analytics Report generated successfully!")
+    if pdf_path:
         print(f"Report saved to: {pdf_path}")
+    
+    return pdf_path, s3_key
+
+async def generate_period_pdfs(periods, data=None, company_id=None, scheduler=None):
+    """Print and upload one PDF per Period from a single fetch; returns {period: s3_key}.
+
+    Reviews for the union of the periods are fetched once (unless data is
+    given) and bucketed in one pass, and the company details once for all
+    periods. Layouts are built one after another and printed concurrently on
+    the shared scheduler, with at most twice its concurrency laid out and
+    waiting, so a long backfill does not hold every period's document in
+    memory. Each period is uploaded as soon as it prints, and a period that
+    fails is logged without dropping the others. Weeks are
+    uploaded to YYYY/MM/W#.pdf, months to YYYY/MM/month.pdf and custom ranges
+    to YYYY/MM/<start>-<end>.pdf, all dated by the period rather than today.
+    """
+    company_id = company_id or os.getenv('COMPANY_ID', 'unknown')
+    if data is None:
+        data = process_customer_data(*union_bounds(periods), company_id)
+    buckets = bucket_by_period(data or [], periods)
+    with span("fetch", company_id):
+        company_details = fetch_company_details(company_id) or {}
+    native = get_pdf_backend() == 'native'
+    
+    async def render_and_store(period, document):
+        pdf_bytes, _ = await render_pdf_bytes(buckets[period], company_id, scheduler, document, period, company_details)
+        pdf_filename = f"Company_{period.cadence.replace(' ', '_')}_Analytics_{company_id}_{period.key_name}_{timestamp}.pdf"
+        pdf_path, s3_key = store_pdf(pdf_bytes, company_id, pdf_filename, period.key_name, period.key_date)
+        logger.info(f"{period.cadence} report for {period.label}: {len(pdf_bytes)} bytes, "
+                    f"{'uploaded to ' + s3_key if s3_key else 'upload failed'}")
+        return s3_key
+    
+    own_scheduler = None
+    if scheduler is None and not native:
+        own_scheduler = scheduler = RenderScheduler(concurrency=min(len(periods), 4))
+        await own_scheduler.__aenter__()
+    try:
+        renders = {}
+        limit = 2 * (scheduler.concurrency if scheduler is not None else 1)
+        for period in periods:
+            if not buckets[period]:
+                logger.info(f"No feedback for {period.label}, skipping that report")
+                continue
+            # Bound the layouts held in memory while waiting for a page
+            in_progress = [task for task in renders.values() if not task.done()]
+            if len(in_progress) >= limit:
+                await asyncio.wait(in_progress, return_when=asyncio.FIRST_COMPLETED)
+            # Layout reads the module-level report state, so build it now; only the print runs concurrently
+            document = None if native else build_report_html(buckets[period], company_id, period, company_details)
+            renders[period] = asyncio.create_task(render_and_store(period, document))
         
-        return pdf_path
+        s3_keys = {}
+        results = await asyncio.gather(*renders.values(), return_exceptions=True)
+        for period, result in zip(renders, results):
+            if isinstance(result, BaseException):
+                logger.error(f"{period.cadence} report for {period.label} failed: {result}")
+            elif result:
+                s3_keys[period] = result
+        return s3_keys
+    finally:
+        if own_scheduler is not None:
+            await own_scheduler.__aexit__(None, None, None)
+
+async def generate_report(data=None, company_id=None, scheduler=None, report_format='pdf'):
+    """Produce a report in the delivery format: pdf, html (no Chromium) or both.
+
+    Returns (pdf_path, s3_keys) with s3_keys mapping each uploaded format to its key.
+    """
+    company_id = company_id or os.getenv('COMPANY_ID', 'unknown')
+    if report_format == 'pdf':
+        pdf_path, s3_key = await generate_pdf(data, company_id, scheduler)
+        return pdf_path, {"pdf": s3_key} if s3_key else {}
+    
+    document = build_report_html(data, company_id)
+    week_num = current_time.isocalendar()[1]
+    s3_keys = {}
+    html_key = upload_html_to_s3(build_web_page(*document), company_id, week_num)
+    if html_key:
+        s3_keys["html"] = html_key
+    
+    pdf_path = None
+    if report_format == 'both':
+        pdf_path, pdf_key = await generate_pdf(data, company_id, scheduler, document)
+        if pdf_key:
+            s3_keys["pdf"] = pdf_key
+    return pdf_path, s3_keys
 
-async def main():
-    """Main function for automated report generation"""
+async def main(profile=False, profile_every=1, periods=None):
+    """Main function for automated report generation; periods is a REPORT_PERIODS-style spec"""
     try:
         logger.info("Starting automated company weekly analytics report generation")
+        configure_profiling(profile, profile_every)
         
         # Set a default company ID if not set
         if not os.getenv('COMPANY_ID'):
             os.environ['COMPANY_ID'] = 'default'
+        
+        # Several periods (e.g. week,month) share one fetch and one browser
+        periods = periods or os.getenv('REPORT_PERIODS')
+        if periods:
+            s3_keys = await generate_period_pdfs(parse_periods(periods, current_time.date()))
+            write_run_summary()
+            if not s3_keys:
+                raise Exception("No period report was uploaded")
+            for period, s3_key in s3_keys.items():
+                print(f"SUCCESS: {period.cadence} report for {period.label} uploaded to {s3_key}")
+            return True
             
-        pdf_path = await generate_pdf()
-        logger.info(f"Company weekly analytics report generation completed successfully: {pdf_path}")
-        print(f"SUCCESS: Company Weekly Analytics Report generated at {pdf_path}")
+        pdf_path, s3_keys = await generate_report(report_format=get_report_format())
+        write_run_summary()
+        location = pdf_path or ", ".join(s3_keys.values())
+        logger.info(f"Company weekly analytics report generation completed successfully: {location}")
+        print(f"SUCCESS: Company Weekly Analytics Report generated at {location}")
         return True
     except Exception as e:
         logger.error(f"Company weekly analytics report generation failed: {e}")
@@ -699,6 +1053,11 @@ async def main():
         return False
 
 if __name__ == "__main__":
-    success = asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Generate the weekly analytics report for COMPANY_ID")
+    add_profile_arguments(parser)
+    parser.add_argument("--periods", help="Comma-separated periods from one fetch: week, last-week, month, "
+                                          "last-month or YYYY-MM-DD:YYYY-MM-DD (default: REPORT_PERIODS, else the week)")
+    args = parser.parse_args()
+    success = asyncio.run(main(args.profile, args.profile_every, args.periods))
     exit(0 if success else 1)
 
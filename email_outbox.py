@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Durable outbox for report emails.
+
+Reports are enqueued as they are uploaded, one row per company and period
+(the idempotency key), in a local SQLite table. A delivery worker drains due
+rows in batches over one SMTP session, retries failures with exponential
+backoff and records the final status, so a crashed or repeated run neither
+skips nor re-emails customers.
+
+Usage:
+    python email_outbox.py deliver [--loop] [--batch-size 50]
+    python email_outbox.py status
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+import logging
+from dotenv import load_dotenv
+from metrics_exporter import EMAILS
+
+load_dotenv()
+
+logger = logging.getLogger('InstaReview')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    idempotency_key TEXT PRIMARY KEY,
+    company_id TEXT NOT NULL,
+    recipient TEXT,
+    company TEXT NOT NULL,
+    s3_keys TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    lease_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+# Company fields the email needs; the rest of the DynamoDB record is not stored
+COMPANY_FIELDS = ('id', 'companyName', 'email', 'locations')
+
+def outbox_mode():
+    """EMAIL_DELIVERY=inline drains the outbox at the end of a batch run; deferred leaves it to the worker"""
+    mode = os.getenv('EMAIL_DELIVERY', 'inline').strip().lower()
+    if mode not in ('inline', 'deferred'):
+        logger.warning(f"Unknown EMAIL_DELIVERY '{mode}', falling back to 'inline'")
+        return 'inline'
+    return mode
+
+def _outbox_path():
+    return os.getenv('EMAIL_OUTBOX_PATH', os.path.join('data', 'email_outbox.sqlite3'))
+
+def connect(path=None):
+    path = path or _outbox_path()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    return connection
+
+def idempotency_key(company_id, period_start, period_end):
+    return f"{company_id}:{period_start.isoformat()}:{period_end.isoformat()}"
+
+def enqueue(connection, company_data, s3_keys, period_start, period_end):
+    """Record a report email to send once per company and period; returns the idempotency key.
+
+    Re-enqueueing an unsent email refreshes its report keys; an email already
+    sent is left untouched.
+    """
+    company = {field: company_data[field] for field in COMPANY_FIELDS if company_data.get(field) is not None}
+    key = idempotency_key(company.get('id', 'unknown'), period_start, period_end)
+    now = time.time()
+    status = 'pending' if company.get('email') else 'no_email'
+    connection.execute(
+        """INSERT INTO outbox (idempotency_key, company_id, recipient, company, s3_keys, status,
+                               next_attempt_at, created_at, updated_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT (idempotency_key) DO UPDATE SET
+               recipient = excluded.recipient, company = excluded.company, s3_keys = excluded.s3_keys,
+               status = excluded.status, attempts = 0, next_attempt_at = excluded.next_attempt_at,
+               last_error = NULL, updated_at = excluded.updated_at
+           WHERE outbox.status NOT IN ('sent', 'sending')""",
+        (key, company.get('id', 'unknown'), company.get('email'), json.dumps(company), json.dumps(s3_keys),
+         status, now, now, now))
+    if status == 'no_email':
+        EMAILS.inc(status="no_email")
+        logger.warning(f"No email found for company {company.get('companyName', 'Unknown')} (ID: {company.get('id')})")
+    return key
+
+def _claim(connection, batch_size, lease_s):
+    """Mark up to batch_size due rows as sending; rows whose lease expired (a crashed worker) are due again"""
+    now = time.time()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        rows = connection.execute(
+            """SELECT * FROM outbox
+               WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND lease_until < ?)
+               ORDER BY next_attempt_at LIMIT ?""", (now, now, batch_size)).fetchall()
+        connection.executemany("UPDATE outbox SET status = 'sending', lease_until = ?, updated_at = ? WHERE idempotency_key = ?",
+                               [(now + lease_s, now, row['idempotency_key']) for row in rows])
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    return rows
+
+def _backoff_s(attempts):
+    base = float(os.getenv('EMAIL_RETRY_BASE_S', '60'))
+    delay = min(base * 2 ** (attempts - 1), float(os.getenv('EMAIL_RETRY_MAX_S', '3600')))
+    return delay * random.uniform(0.8, 1.2)
+
+def _record_sent(connection, key):
+    now = time.time()
+    connection.execute("""UPDATE outbox SET status = 'sent', attempts = attempts + 1, sent_at = ?, updated_at = ?,
+                                            lease_until = NULL, last_error = NULL WHERE idempotency_key = ?""",
+                       (now, now, key))
+
+def _record_failure(connection, row, error, max_attempts):
+    attempts = row['attempts'] + 1
+    final = attempts >= max_attempts
+    now = time.time()
+    connection.execute("""UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?,
+                                            updated_at = ?, lease_until = NULL WHERE idempotency_key = ?""",
+                       ('failed' if final else 'pending', attempts, now + (0 if final else _backoff_s(attempts)),
+                        str(error)[:500], now, row['idempotency_key']))
+    return final
+
+def deliver(connection=None, batch_size=None, max_attempts=None):
+    """Send every due email in batches over one SMTP session per batch; returns (sent, failed) counts.
+
+    failed counts emails that used up EMAIL_MAX_ATTEMPTS; others are rescheduled.
+    """
+    from send_email import open_smtp_connection, send_report_email, _close_smtp
+
+    connection = connection or connect()
+    batch_size = batch_size or int(os.getenv('EMAIL_BATCH_SIZE', '50'))
+    max_attempts = max_attempts or int(os.getenv('EMAIL_MAX_ATTEMPTS', '5'))
+    lease_s = float(os.getenv('EMAIL_LEASE_S', '300'))
+    sent = failed = 0
+
+    while True:
+        rows = _claim(connection, batch_size, lease_s)
+        if not rows:
+            break
+        logger.info(f"Delivering batch of {len(rows)} report emails")
+        smtp_server = None
+        for row in rows:
+            company = json.loads(row['company'])
+            if smtp_server is None:
+                try:
+                    smtp_server = open_smtp_connection()
+                except Exception as e:
+                    logger.error(f"Could not open SMTP session: {e}")
+            if send_report_email(company, json.loads(row['s3_keys']), row['recipient'], smtp_server):
+                _record_sent(connection, row['idempotency_key'])
+                EMAILS.inc(status="sent")
+                sent += 1
+                continue
+            smtp_server = _close_smtp(smtp_server)
+            if _record_failure(connection, row, "send failed", max_attempts):
+                EMAILS.inc(status="failed")
+                failed += 1
+                logger.error(f"Giving up on report email to {row['recipient']} after {max_attempts} attempts")
+            else:
+                EMAILS.inc(status="retry")
+        _close_smtp(smtp_server)
+
+    logger.info(f"EMAIL DELIVERY SUMMARY: {sent} sent, {failed} failed permanently, {pending_count(connection)} awaiting retry")
+    return sent, failed
+
+def sent_count(connection, keys, since):
+    """How many of the idempotency keys were sent at or after since (a time.time() value)"""
+    keys = list(keys)
+    if not keys:
+        return 0
+    return connection.execute(
+        f"SELECT COUNT(*) FROM outbox WHERE status = 'sent' AND sent_at >= ? AND idempotency_key IN ({','.join('?' * len(keys))})",
+        (since, *keys)).fetchone()[0]
+
+def pending_count(connection):
+    return connection.execute("SELECT COUNT(*) FROM outbox WHERE status IN ('pending', 'sending')").fetchone()[0]
+
+def status_counts(connection=None):
+    connection = connection or connect()
+    return {row['status']: row['count'] for row in
+            connection.execute("SELECT status, COUNT(*) AS count FROM outbox GROUP BY status")}
+
+def main():
+    parser = argparse.ArgumentParser(description="Deliver report emails from the outbox")
+    parser.add_argument("command", choices=["deliver", "status"])
+    parser.add_argument("--loop", action="store_true", help="Keep delivering as retries come due")
+    parser.add_argument("--interval", type=float, default=30, help="Seconds between passes with --loop")
+    parser.add_argument("--batch-size", type=int, help="Emails per SMTP session (EMAIL_BATCH_SIZE)")
+    args = parser.parse_args()
+
+    from logger import setup_logger
+    setup_logger()
+    connection = connect()
+    if args.command == "status":
+        print(json.dumps(status_counts(connection), indent=2))
+        return
+    while True:
+        deliver(connection, args.batch_size)
+        if not args.loop:
+            break
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
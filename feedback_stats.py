@@ -0,0 +1,208 @@
+import math
+import os
+import logging
+from bisect import bisect_right
+
+logger = logging.getLogger('InstaReview')
+
+# Histogram lower edges: audio duration in seconds, survey answers centred on whole stars
+DURATION_EDGES = (0, 15, 30, 60, 120, 300)
+RATING_EDGES = (-math.inf, 1.5, 2.5, 3.5, 4.5)
+
+def _compression():
+    return int(os.getenv('STATS_COMPRESSION', '100'))
+
+class TDigest:
+    """Merging t-digest: approximate quantiles in bounded memory, mergeable across days or shards.
+
+    Centroids are kept sorted and sized by the k1 scale function, so the tails
+    (p90, p99) stay accurate while the middle is summarized more coarsely.
+    """
+
+    def __init__(self, compression=None):
+        self.compression = compression or _compression()
+        self.centroids = []     # [mean, weight], sorted by mean
+        self._buffer = []
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1):
+        self._buffer.append([value, weight])
+        self.count += weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def _k_limit(self, q):
+        """Upper quantile bound of a centroid starting at q (one unit of the k1 scale further)"""
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(self.centroids + self._buffer, key=lambda c: c[0])
+        self._buffer = []
+        total = self.count
+        merged = []
+        mean, weight = points[0]
+        weight_before = 0
+        limit = total * self._k_limit(0.0)
+        for point_mean, point_weight in points[1:]:
+            if weight_before + weight + point_weight <= limit:
+                weight += point_weight
+                mean += (point_mean - mean) * point_weight / weight
+            else:
+                merged.append([mean, weight])
+                weight_before += weight
+                limit = total * self._k_limit(weight_before / total)
+                mean, weight = point_mean, point_weight
+        merged.append([mean, weight])
+        self.centroids = merged
+
+    def quantile(self, q):
+        """Estimated value at quantile q (0..1), or None when empty"""
+        self._compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1 or self.min == self.max:
+            return self.centroids[0][0]
+        target = q * self.count
+        cumulative = 0
+        previous_center, previous_mean = 0, self.min
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                fraction = (target - previous_center) / span if span else 0
+                return previous_mean + (mean - previous_mean) * fraction
+            previous_center, previous_mean = center, mean
+            cumulative += weight
+        span = self.count - previous_center
+        fraction = (target - previous_center) / span if span else 1
+        return previous_mean + (self.max - previous_mean) * min(1, fraction)
+
+    def merge(self, other):
+        other._compress()
+        self._compress()
+        self._buffer = [list(c) for c in other.centroids]
+        self.count += other.count
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        self._compress()
+        return self
+
+    def to_dict(self):
+        self._compress()
+        return {"compression": self.compression, "count": self.count, "centroids": self.centroids,
+                "min": self.min if self.count else None, "max": self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        digest = cls(data.get("compression"))
+        digest.centroids = [list(c) for c in data.get("centroids", [])]
+        digest.count = data.get("count", 0)
+        if digest.count:
+            digest.min, digest.max = data["min"], data["max"]
+        return digest
+
+class StreamingStats:
+    """One-pass count, mean, min/max, fixed-edge histogram and t-digest quantiles of a value stream"""
+
+    def __init__(self, edges, compression=None):
+        self.edges = tuple(edges)
+        self.histogram = [0] * len(self.edges)
+        self.digest = TDigest(compression)
+        self.count = 0
+        self.mean = 0.0
+
+    def add(self, value):
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        self.histogram[max(0, bisect_right(self.edges, value) - 1)] += 1
+        self.digest.add(value)
+
+    def merge(self, other):
+        total = self.count + other.count
+        if total:
+            self.mean = (self.mean * self.count + other.mean * other.count) / total
+        self.count = total
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        self.digest.merge(other.digest)
+        return self
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0, "mean": None, "median": None, "p90": None, "min": None, "max": None,
+                    "histogram": list(self.histogram)}
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 2),
+            "median": round(self.digest.quantile(0.5), 2),
+            "p90": round(self.digest.quantile(0.9), 2),
+            "min": self.digest.min,
+            "max": self.digest.max,
+            "histogram": list(self.histogram),
+        }
+
+    def to_dict(self):
+        return {"edges": [e if math.isfinite(e) else None for e in self.edges], "count": self.count,
+                "mean": self.mean, "histogram": self.histogram, "digest": self.digest.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls([-math.inf if e is None else e for e in data["edges"]])
+        stats.count, stats.mean = data["count"], data["mean"]
+        stats.histogram = list(data["histogram"])
+        stats.digest = TDigest.from_dict(data["digest"])
+        return stats
+
+class FeedbackStats:
+    """Audio duration and survey answer statistics for one company, collected in one pass over reviews"""
+
+    def __init__(self, compression=None):
+        self.durations = StreamingStats(DURATION_EDGES, compression)
+        self.ratings = StreamingStats(RATING_EDGES, compression)
+
+    def add_review(self, review):
+        if review.audio_duration_sec is not None and review.audio_duration_sec >= 0:
+            self.durations.add(review.audio_duration_sec)
+        for answer in review.answers:
+            self.ratings.add(answer.answer)
+
+    def merge(self, other):
+        self.durations.merge(other.durations)
+        self.ratings.merge(other.ratings)
+        return self
+
+    def summary(self):
+        return {"audio_duration_sec": self.durations.summary(), "ratings": self.ratings.summary()}
+
+    def to_dict(self):
+        return {"durations": self.durations.to_dict(), "ratings": self.ratings.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.durations = StreamingStats.from_dict(data["durations"])
+        stats.ratings = StreamingStats.from_dict(data["ratings"])
+        return stats
+
+def format_duration(seconds):
+    """'45 sec' under a minute, else '1.8 min'; 'N/A' when there is no audio"""
+    if seconds is None:
+        return "N/A"
+    return f"{round(seconds)} sec" if seconds < 60 else f"{seconds / 60:.1f} min"
+
+def star_distribution(ratings_summary):
+    """Star-ratings chart data (5★ first) as whole percentages of survey answers, or None without answers"""
+    total = ratings_summary["count"]
+    if not total:
+        return None
+    counts = list(reversed(ratings_summary["histogram"]))
+    return [round(count / total * 100) for count in counts]
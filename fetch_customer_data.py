@@ -1,8 +1,13 @@
-import requests
-import json
 import os
+import codec
 from dotenv import load_dotenv
 from logger import setup_logger, create_categorical_folders
+from artifacts import save_artifact, flush_artifacts
+from periods import get_report_period, filter_by_period, review_timestamp
+from http_cache import cached_get
+from instrumentation import span, record_bytes_in
+from metrics_exporter import API_ERRORS
+from profiling import profile_stage
 
 # Load environment variables
 load_dotenv()
@@ -21,49 +26,103 @@ else:
         os.makedirs(folder, exist_ok=True)
 
 # --- Data Fetching Functions ---
-def fetch_company_details():
+def fetch_company_details(company_id=None):
     try:
-        company_id = os.getenv('COMPANY_ID')
+        company_id = company_id or os.getenv('COMPANY_ID')
         api_key = os.getenv('X_API_KEY_COMPANY_DETAILS_URL')
         base_url = os.getenv('COMPANY_DETAILS_URL')
-        url = f"{base_url}?companyId={company_id}"
         headers = {"x-api-key": api_key}
-        response = requests.get(url, headers=headers)
+        response = cached_get(base_url, params={"companyId": company_id}, headers=headers)
+        record_bytes_in(len(response.content))
         if response.status_code == 200:
-            data = response.json()
+            data = codec.loads(response.content)
             logger.info(f"Company details fetched successfully")
             return data
         print(f"Company details API request failed with status {response.status_code}")
+        API_ERRORS.inc(endpoint="company_details")
     except Exception as e:
         print(f"Error fetching company details: {e}")
+        API_ERRORS.inc(endpoint="company_details")
     return None
 
-def fetch_api_data():
+def _page_items(data):
+    """Split one reviews API page into (items, next_cursor); plain lists are a single page"""
+    if isinstance(data, list):
+        return data, None
+    if not isinstance(data, dict):
+        return [], None
+    items = next((data[key] for key in ("items", "Items", "reviews", "data") if isinstance(data.get(key), list)), [])
+    cursor = next((data[key] for key in ("nextToken", "nextCursor", "cursor", "LastEvaluatedKey") if data.get(key)), None)
+    return items, cursor
+
+def fetch_api_data(start_date=None, end_date=None, company_id=None):
     try:
         logger.info("Fetching customer feedback data from API...")
-        company_id = os.getenv('COMPANY_ID')
+        company_id = company_id or os.getenv('COMPANY_ID')
         base_url = os.getenv('REVIEWS_URL')
-        url = f"{base_url}?companyId={company_id}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            logger.info(f"API returned {len(data)} customer feedback items")
-            return data
+        if start_date is None or end_date is None:
+            start_date, end_date = get_report_period()
+        
+        # Ask the server for the report window only; parameter names are configurable per deployment
+        params = {
+            "companyId": company_id,
+            os.getenv('REVIEWS_FROM_PARAM', 'fromDate'): start_date.isoformat(),
+            os.getenv('REVIEWS_TO_PARAM', 'toDate'): end_date.isoformat(),
+        }
+        page_size = os.getenv('REVIEWS_PAGE_SIZE')
+        if page_size:
+            params["limit"] = page_size
+        cursor_param = os.getenv('REVIEWS_CURSOR_PARAM', 'nextToken')
+        max_pages = max(1, int(os.getenv('REVIEWS_MAX_PAGES', '1000')))
+        
+        data = []
+        pages = 0
+        seen_cursors = set()
+        for _ in range(max_pages):
+            pages += 1
+            response = cached_get(base_url, params=params)
+            record_bytes_in(len(response.content))
+            if response.status_code != 200:
+                logger.error(f"API request failed with status {response.status_code}")
+                API_ERRORS.inc(endpoint="reviews")
+                return []
+            items, cursor = _page_items(codec.loads(response.content))
+            data.extend(codec.decode_reviews(items))
+            if not cursor:
+                break
+            if not items:
+                logger.warning(f"Stopped paging reviews at an empty page with a cursor (page {pages})")
+                break
+            # A server that ignores or recycles the cursor would otherwise be paged until max_pages
+            cursor = cursor if isinstance(cursor, str) else codec.dumps(cursor)
+            if cursor in seen_cursors:
+                logger.warning(f"Stopped paging reviews at a repeated cursor (page {pages})")
+                break
+            seen_cursors.add(cursor)
+            params[cursor_param] = cursor
         else:
-            logger.error(f"API request failed with status {response.status_code}")
+            logger.warning(f"Stopped paging reviews after {max_pages} pages")
+        
+        logger.info(f"API returned {len(data)} customer feedback items in {pages} page(s)")
+        
+        # The server may ignore the date bounds, so enforce the window client-side as well
+        return filter_by_period(data, start_date, end_date)
     except Exception as e:
         logger.error(f"Error fetching customer feedback data: {e}")
+        API_ERRORS.inc(endpoint="reviews")
     return []
 
-def process_customer_data():
+def process_customer_data(start_date=None, end_date=None, company_id=None):
+    """Fetch and filter one company's reviews; company_id defaults to COMPANY_ID, the period to the report week"""
     logger.info("Starting customer feedback data processing...")
-    api_data = fetch_api_data()
+    company_id = company_id or os.getenv('COMPANY_ID')
+    with span("fetch", company_id), profile_stage("fetch", company_id):
+        api_data = fetch_api_data(start_date, end_date, company_id)
     
-    # Save raw API data
-    raw_data_file = os.path.join(folders['data'], f"api_response_{timestamp}.json")
-    with open(raw_data_file, "w") as f:
-        json.dump(api_data, f, indent=2)
-    logger.info(f"Saved raw customer feedback data to {raw_data_file}")
+    # Keep raw API data according to the artifact policy
+    raw_data_file = save_artifact("api_response", api_data, company_id, timestamp)
+    if raw_data_file:
+        logger.info(f"Queued raw customer feedback data for {raw_data_file}")
     
     # Process all data - keep items with valid metaData
     filtered = []
@@ -76,45 +135,40 @@ def process_customer_data():
         
         if isinstance(meta_data, str):
             try:
-                meta_data = json.loads(meta_data)
+                meta_data = codec.loads(meta_data)
             except:
                 continue
         
+        created = review_timestamp(dict(item, metaData=meta_data))
         filtered_item = {
             "companyId": item.get("companyId"),
             "quess": item.get("quess"),
             "userEmail": item.get("userEmail"),
+            "createdAt": created.isoformat() if created else None,
             "metaData": meta_data
         }
         filtered.append(filtered_item)
     
     logger.info(f"Processed {len(filtered)} customer feedback items with valid metaData")
     
-    # Save filtered data
-    filtered_data_file = os.path.join(folders['data'], f"customer_feedback_{timestamp}.json")
-    with open(filtered_data_file, "w") as f:
-        json.dump(filtered, f, indent=2)
-    logger.info(f"Saved filtered customer feedback to {filtered_data_file}")
-    
-    # Also save to output_data for compatibility
-    output_dir = "output_data"
-    os.makedirs(output_dir, exist_ok=True)
-    with open(os.path.join(output_dir, "customer_feedback.json"), "w") as f:
-        json.dump(filtered, f, indent=2)
-    logger.info(f"Saved customer feedback to {output_dir}/customer_feedback.json for compatibility")
+    # Keep filtered data according to the artifact policy
+    filtered_data_file = save_artifact("customer_feedback", filtered, company_id, timestamp)
+    if filtered_data_file:
+        logger.info(f"Queued filtered customer feedback for {filtered_data_file}")
     
     return filtered
 
 if __name__ == "__main__":
+    # Manual fetches are for inspection, so keep every artifact unless told otherwise
+    os.environ.setdefault('ARTIFACT_POLICY', 'full')
     logger.info("Starting data fetch and processing...")
     filtered_data = process_customer_data()
     
     # Fetch and save company details
     company_details = fetch_company_details()
     if company_details:
-        company_details_file = os.path.join(folders['data'], f"company_details_{timestamp}.json")
-        with open(company_details_file, "w") as f:
-            json.dump(company_details, f, indent=2)
-        logger.info(f"Saved company details to {company_details_file}")
+        company_details_file = save_artifact("company_details", company_details, os.getenv('COMPANY_ID'), timestamp)
+        logger.info(f"Queued company details for {company_details_file}")
     
+    flush_artifacts()
     logger.info("Data processing completed successfully")
\ No newline at end of file
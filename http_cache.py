@@ -0,0 +1,176 @@
+import hashlib
+import os
+import threading
+import time
+import logging
+from collections import namedtuple
+import requests
+import codec
+
+logger = logging.getLogger('InstaReview')
+
+CachedResponse = namedtuple('CachedResponse', ['status_code', 'content', 'headers', 'from_cache'])
+
+# Validators kept alongside cached bodies for conditional requests
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified', 'Content-Type')
+
+# Response fields holding customer contact details; bodies containing any are never written to disk
+REDACTED_FIELDS = frozenset(('userEmail', 'email', 'phone', 'phoneNumber'))
+
+# Seconds between sweeps of the on-disk store for expired and excess entries
+PRUNE_INTERVAL_S = 60
+
+_memory_cache = {}
+_memory_lock = threading.Lock()
+_last_prune = 0.0
+
+def cache_enabled():
+    """HTTP_CACHE=on caches API responses; off by default so reports always see current reviews"""
+    return os.getenv('HTTP_CACHE', 'off').strip().lower() in ('on', 'true', '1')
+
+def _cache_dir():
+    return os.getenv('HTTP_CACHE_DIR', os.path.join('cache', 'http'))
+
+def cache_key(url, params=None, headers=None):
+    """Stable key for a URL, its query parameters and request headers (hashed, so API keys are not stored)"""
+    raw = url + "?" + codec.dumps(sorted((params or {}).items())) + codec.dumps(sorted((headers or {}).items()))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _has_contact_fields(value):
+    if isinstance(value, dict):
+        return any(k in REDACTED_FIELDS or _has_contact_fields(v) for k, v in value.items())
+    if isinstance(value, list):
+        return any(_has_contact_fields(v) for v in value)
+    return False
+
+def _persistable(content):
+    """Whether a body may go to disk: JSON without REDACTED_FIELDS, or a non-JSON body (stylesheets)"""
+    try:
+        data = codec.loads(content)
+    except Exception:
+        return True
+    return not _has_contact_fields(data)
+
+def _load_from_disk(key):
+    meta_path = os.path.join(_cache_dir(), f"{key}.json")
+    body_path = os.path.join(_cache_dir(), f"{key}.body")
+    try:
+        with open(meta_path, "rb") as f:
+            entry = codec.loads(f.read())
+        with open(body_path, "rb") as f:
+            entry["content"] = f.read()
+        return entry
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _save_to_disk(key, entry):
+    cache_dir = _cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    meta = {k: v for k, v in entry.items() if k != "content"}
+    for suffix, data in (("body", entry["content"]), ("json", codec.dumps_bytes(meta))):
+        path = os.path.join(cache_dir, f"{key}.{suffix}")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+def _prune_disk():
+    """Delete entries older than HTTP_CACHE_MAX_AGE, then the oldest until under HTTP_CACHE_MAX_MB"""
+    global _last_prune
+    now = time.time()
+    if now - _last_prune < PRUNE_INTERVAL_S:
+        return
+    _last_prune = now
+    max_age = float(os.getenv('HTTP_CACHE_MAX_AGE', '86400'))
+    max_bytes = float(os.getenv('HTTP_CACHE_MAX_MB', '256')) * 1024 * 1024
+    cache_dir = _cache_dir()
+    entries = {}
+    for name in os.listdir(cache_dir):
+        key, _, suffix = name.partition(".")
+        if suffix not in ("body", "json"):
+            continue
+        stat = os.stat(os.path.join(cache_dir, name))
+        mtime, size = entries.get(key, (stat.st_mtime, 0))
+        entries[key] = (min(mtime, stat.st_mtime), size + stat.st_size)
+    total = sum(size for _, size in entries.values())
+    for key, (mtime, size) in sorted(entries.items(), key=lambda item: item[1][0]):
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        for suffix in ("body", "json"):
+            try:
+                os.remove(os.path.join(cache_dir, f"{key}.{suffix}"))
+            except FileNotFoundError:
+                pass
+        total -= size
+        with _memory_lock:
+            _memory_cache.pop(key, None)
+
+def _store(key, entry, persist=True):
+    """Keep an entry in memory and, unless it holds contact details, on disk; both layers serve the same body"""
+    with _memory_lock:
+        _memory_cache[key] = entry
+    if persist and _persistable(entry["content"]):
+        try:
+            _save_to_disk(key, entry)
+            _prune_disk()
+        except OSError as e:
+            logger.warning(f"Could not persist HTTP cache entry: {e}")
+
+def _response(entry, from_cache):
+    return CachedResponse(200, entry["content"], entry.get("headers", {}), from_cache)
+
+def cached_get(url, params=None, headers=None, ttl=None, cache=None):
+    """GET with an in-memory and on-disk response cache.
+
+    Fresh entries (younger than ttl seconds, HTTP_CACHE_TTL by default) are served
+    without a request. Stale entries are revalidated with If-None-Match /
+    If-Modified-Since when the server sent validators. Only 200 responses are cached.
+    cache=True caches regardless of HTTP_CACHE, for public assets such as stylesheets.
+    """
+    if not (cache_enabled() if cache is None else cache):
+        response = requests.get(url, params=params, headers=headers)
+        return CachedResponse(response.status_code, response.content, dict(response.headers), False)
+
+    ttl = float(os.getenv('HTTP_CACHE_TTL', '900')) if ttl is None else ttl
+    key = cache_key(url, params, headers)
+    now = time.time()
+
+    with _memory_lock:
+        entry = _memory_cache.get(key)
+    if entry is None:
+        entry = _load_from_disk(key)
+        if entry is not None:
+            _store(key, entry, persist=False)
+
+    if entry is not None and now - entry["fetched_at"] < ttl:
+        logger.info(f"HTTP cache hit for {url}")
+        return _response(entry, True)
+
+    request_headers = dict(headers or {})
+    if entry is not None:
+        if entry["headers"].get("ETag"):
+            request_headers["If-None-Match"] = entry["headers"]["ETag"]
+        if entry["headers"].get("Last-Modified"):
+            request_headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+    response = requests.get(url, params=params, headers=request_headers)
+    if response.status_code == 304 and entry is not None:
+        logger.info(f"HTTP cache revalidated for {url}")
+        entry["fetched_at"] = now
+        _store(key, entry)
+        return _response(entry, True)
+
+    if response.status_code == 200:
+        entry = {
+            "url": url,
+            "fetched_at": now,
+            "headers": {h: response.headers[h] for h in VALIDATOR_HEADERS if h in response.headers},
+            "content": response.content,
+        }
+        _store(key, entry)
+    return CachedResponse(response.status_code, response.content, dict(response.headers), False)
+
+def clear_memory_cache():
+    """Drop the in-memory layer (the on-disk store is kept)"""
+    with _memory_lock:
+        _memory_cache.clear()
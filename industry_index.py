@@ -0,0 +1,163 @@
+import datetime
+import json
+import os
+import logging
+from bisect import bisect_left, bisect_right
+
+logger = logging.getLogger('InstaReview')
+
+# Metrics shown in the report's benchmark line, in order, with their labels
+SUMMARY_METRICS = (("positive_pct", "positive feedback"), ("nps", "NPS"), ("avg_rating", "rating"),
+                   ("avg_duration_sec", "audio length"))
+
+_current_index = None
+
+def benchmarks_enabled():
+    """INDUSTRY_BENCHMARKS=on builds the peer index in batch runs and compares reports against it"""
+    return os.getenv('INDUSTRY_BENCHMARKS', 'off').strip().lower() in ('on', 'true', '1')
+
+def index_path():
+    return os.getenv('INDUSTRY_INDEX_PATH', os.path.join('data', 'industry_index.json'))
+
+def _min_peers():
+    return int(os.getenv('INDUSTRY_MIN_PEERS', '5'))
+
+def _scope_value(value):
+    value = str(value or '').strip().lower()
+    return value if value and value != 'unknown' else None
+
+def company_metrics(report_data, nps):
+    """Benchmarked metrics of one company's aggregate; metrics without data are left out"""
+    stats = report_data.get("feedback_stats", {})
+    ratings = stats.get("ratings", {})
+    durations = stats.get("audio_duration_sec", {})
+    metrics = {"positive_pct": report_data["overall_stats"]["positive_percentage"], "nps": nps}
+    if ratings.get("count"):
+        metrics["avg_rating"] = ratings["mean"]
+    if durations.get("count"):
+        metrics["avg_duration_sec"] = durations["mean"]
+    for question, average in report_data["survey_metrics"]["question_averages"].items():
+        metrics[f"question:{question}"] = average
+    return metrics
+
+class IndustryIndex:
+    """Sorted per-industry, per-city and overall distributions of company metrics.
+
+    Built in two phases: add() every company's metrics, then freeze() sorts each
+    distribution once. Percentile ranks are then a pair of bisects, O(log n).
+    """
+
+    def __init__(self, scopes=None, companies=0, built_at=None):
+        self.scopes = scopes or {}    # "industry:<name>" / "city:<name>" / "all" -> {metric: [values]}
+        self.companies = companies
+        self.built_at = built_at
+
+    def add(self, industry, city, metrics):
+        self.companies += 1
+        scopes = ["all"]
+        if _scope_value(industry):
+            scopes.append(f"industry:{_scope_value(industry)}")
+        if _scope_value(city):
+            scopes.append(f"city:{_scope_value(city)}")
+        for scope in scopes:
+            distributions = self.scopes.setdefault(scope, {})
+            for metric, value in metrics.items():
+                if value is not None:
+                    distributions.setdefault(metric, []).append(value)
+
+    def freeze(self):
+        for distributions in self.scopes.values():
+            for values in distributions.values():
+                values.sort()
+        self.built_at = datetime.datetime.now().isoformat(timespec='seconds')
+        return self
+
+    def percentile_rank(self, scope, metric, value):
+        """Share of the scope's companies below value (ties count half), 0-100; None if unknown"""
+        values = self.scopes.get(scope, {}).get(metric)
+        if not values:
+            return None
+        below, not_above = bisect_left(values, value), bisect_right(values, value)
+        return round((below + not_above) / 2 / len(values) * 100)
+
+    def peer_scope(self, industry, city, metric="positive_pct"):
+        """Narrowest scope with enough peers: the industry, then the city, then all companies"""
+        candidates = []
+        if _scope_value(industry):
+            candidates.append(f"industry:{_scope_value(industry)}")
+        if _scope_value(city):
+            candidates.append(f"city:{_scope_value(city)}")
+        for scope in candidates + ["all"]:
+            if len(self.scopes.get(scope, {}).get(metric, ())) >= _min_peers():
+                return scope
+        return None
+
+    def compare(self, industry, city, metrics):
+        """{metric: percentile} against the company's peer scope; returns (scope, peers, ranks) or None"""
+        scope = self.peer_scope(industry, city)
+        if scope is None:
+            return None
+        ranks = {}
+        for metric, value in metrics.items():
+            rank = self.percentile_rank(scope, metric, value)
+            if rank is not None:
+                ranks[metric] = rank
+        return scope, len(self.scopes[scope]["positive_pct"]), ranks
+
+    def save(self, path=None):
+        path = path or index_path()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"built_at": self.built_at, "companies": self.companies, "scopes": self.scopes}, f)
+        os.replace(tmp_path, path)
+        logger.info(f"Industry index for {self.companies} companies saved to {path}")
+        return path
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or index_path()
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Could not read industry index {path}: {e}")
+            return None
+        return cls(data.get("scopes"), data.get("companies", 0), data.get("built_at"))
+
+def use_index(index):
+    """Compare this process's reports against index (set by the batch run after phase one)"""
+    global _current_index
+    _current_index = index
+
+def current_index():
+    """The index set with use_index, else the last persisted one; None when benchmarks are off"""
+    global _current_index
+    if not benchmarks_enabled():
+        return None
+    if _current_index is None:
+        _current_index = IndustryIndex.load() or IndustryIndex()
+    return _current_index
+
+def _ordinal(n):
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+def benchmark_summary(comparison):
+    """One line for the report, e.g. 'Compared with 42 restaurant peers: positive feedback 78th percentile, ...'"""
+    if not comparison:
+        return None
+    scope, peers, ranks = comparison
+    parts = [f"{label} {_ordinal(ranks[metric])} percentile" for metric, label in SUMMARY_METRICS if metric in ranks]
+    if not parts:
+        return None
+    kind, _, name = scope.partition(":")
+    if kind == "industry":
+        group = f"{peers} {name.title()} peers"
+    elif kind == "city":
+        group = f"{peers} companies in {name.title()}"
+    else:
+        group = f"all {peers} companies"
+    return f"Compared with {group}: {', '.join(parts)}"
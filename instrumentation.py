@@ -0,0 +1,212 @@
+import atexit
+import contextvars
+import math
+import os
+import resource
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+import codec
+
+logger = logging.getLogger('InstaReview')
+
+RUN_ID = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+_current_span = contextvars.ContextVar('instareview_span', default=None)
+_records = []
+_unwritten = []
+_records_lock = threading.Lock()
+_summarized_count = 0
+_listeners = []
+
+class Span:
+    """Measurements for one pipeline stage of one company"""
+    __slots__ = ('stage', 'company_id', 'bytes_in', 'bytes_out')
+
+    def __init__(self, stage, company_id):
+        self.stage = stage
+        self.company_id = company_id
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def add_bytes_in(self, count):
+        self.bytes_in += count
+
+    def add_bytes_out(self, count):
+        self.bytes_out += count
+
+def metrics_enabled():
+    return os.getenv('METRICS_ENABLED', 'true').lower() != 'false'
+
+def _metrics_dir():
+    return os.getenv('METRICS_DIR', 'logs')
+
+# Span records are written in batches of this many, and the remainder when the run summary is written
+WRITE_BATCH_SIZE = 200
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if os.uname().sysname == 'Darwin' else 1024), 1)
+
+def _current_rss_mb():
+    """Resident memory of this process now (Linux), or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+
+def add_span_listener(callback):
+    """Call callback(record) for every finished span, e.g. to feed an exporter"""
+    _listeners.append(callback)
+
+def remove_span_listener(callback):
+    """Stop calling a callback added with add_span_listener"""
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+def flush_records():
+    """Append buffered span records to metrics_RUN_ID.jsonl in one write"""
+    with _records_lock:
+        pending = _unwritten[:]
+        _unwritten.clear()
+    if not pending:
+        return
+    try:
+        os.makedirs(_metrics_dir(), exist_ok=True)
+        with open(os.path.join(_metrics_dir(), f"metrics_{RUN_ID}.jsonl"), "ab") as f:
+            f.write(b"".join(codec.dumps_bytes(record) + b"\n" for record in pending))
+    except OSError as e:
+        logger.warning(f"Could not write {len(pending)} metrics records: {e}")
+
+def _emit_record(record):
+    if metrics_enabled():
+        with _records_lock:
+            _records.append(record)
+            _unwritten.append(record)
+            full = len(_unwritten) >= WRITE_BATCH_SIZE
+        if full:
+            flush_records()
+    for callback in _listeners:
+        try:
+            callback(record)
+        except Exception as e:
+            logger.warning(f"Span listener failed: {e}")
+
+@contextmanager
+def span(stage, company_id=None):
+    """Time a pipeline stage: wall time, CPU time, resident memory and bytes in/out.
+
+    Usable in sync and async code; bytes can be attributed with record_bytes_in/out.
+    rss_mb is the process's resident memory when the span ends and rss_delta_mb its
+    change over the span; concurrent spans share the process, so deltas overlap.
+    A span nested in one of the same stage and company is folded into the outer one.
+    """
+    if not metrics_enabled() and not _listeners:
+        yield Span(stage, company_id)
+        return
+
+    company_id = company_id or os.getenv('COMPANY_ID', 'unknown')
+    outer = _current_span.get()
+    if outer is not None and (outer.stage, outer.company_id) == (stage, company_id):
+        yield outer
+        return
+
+    current = Span(stage, company_id)
+    token = _current_span.set(current)
+    status = "ok"
+    rss_start = _current_rss_mb()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield current
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _current_span.reset(token)
+        rss_end = _current_rss_mb()
+        _emit_record({
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "run_id": RUN_ID,
+            "stage": current.stage,
+            "company_id": current.company_id,
+            "status": status,
+            "wall_s": round(time.perf_counter() - wall_start, 6),
+            "cpu_s": round(time.process_time() - cpu_start, 6),
+            "rss_mb": rss_end,
+            "rss_delta_mb": round(rss_end - rss_start, 1) if rss_end is not None and rss_start is not None else None,
+            "bytes_in": current.bytes_in,
+            "bytes_out": current.bytes_out,
+        })
+
+def record_bytes_in(count):
+    """Attribute received bytes to the active span, if any"""
+    current = _current_span.get()
+    if current is not None:
+        current.add_bytes_in(count)
+
+def record_bytes_out(count):
+    """Attribute sent or written bytes to the active span, if any"""
+    current = _current_span.get()
+    if current is not None:
+        current.add_bytes_out(count)
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def run_summary():
+    """Per-stage p50/p95/max of wall and CPU time plus byte totals, and the process's peak RSS for this run"""
+    with _records_lock:
+        records = list(_records)
+    by_stage = {}
+    for record in records:
+        by_stage.setdefault(record["stage"], []).append(record)
+
+    summary = {"run_id": RUN_ID, "peak_rss_mb": _peak_rss_mb(), "stages": {}}
+    for stage, stage_records in by_stage.items():
+        wall = [r["wall_s"] for r in stage_records]
+        cpu = [r["cpu_s"] for r in stage_records]
+        summary["stages"][stage] = {
+            "count": len(stage_records),
+            "errors": sum(1 for r in stage_records if r["status"] != "ok"),
+            "wall_p50_s": percentile(wall, 50),
+            "wall_p95_s": percentile(wall, 95),
+            "wall_max_s": max(wall),
+            "cpu_p50_s": percentile(cpu, 50),
+            "cpu_p95_s": percentile(cpu, 95),
+            "cpu_max_s": max(cpu),
+            "bytes_in": sum(r["bytes_in"] for r in stage_records),
+            "bytes_out": sum(r["bytes_out"] for r in stage_records),
+        }
+    return summary
+
+def write_run_summary():
+    """Flush buffered span records, then write the run summary next to them and log one line per stage"""
+    global _summarized_count
+    flush_records()
+    summary = run_summary()
+    record_count = sum(stats["count"] for stats in summary["stages"].values())
+    if not record_count or record_count == _summarized_count:
+        return None
+    _summarized_count = record_count
+    summary_file = os.path.join(_metrics_dir(), f"metrics_summary_{RUN_ID}.json")
+    os.makedirs(_metrics_dir(), exist_ok=True)
+    with open(summary_file, "wb") as f:
+        f.write(codec.dumps_bytes(summary))
+    for stage, stats in summary["stages"].items():
+        logger.info(f"Stage {stage}: n={stats['count']} p50={stats['wall_p50_s']:.3f}s "
+                    f"p95={stats['wall_p95_s']:.3f}s max={stats['wall_max_s']:.3f}s")
+    logger.info(f"Saved metrics summary to {summary_file}")
+    return summary_file
+
+atexit.register(write_run_summary)
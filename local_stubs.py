@@ -0,0 +1,269 @@
+"""
+Local stand-ins for the external services used by the report pipeline:
+a reviews/company-details HTTP API, an SMTP sink and S3/DynamoDB (moto when
+installed, otherwise an in-process fake). Used by benchmark_pipeline.py.
+"""
+import base64
+import socketserver
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import codec
+from synthetic_data import generate_reviews, company_details
+
+logger = logging.getLogger('InstaReview')
+
+# --- Reviews and company details API ---
+class StubApiServer:
+    """Serve /reviews and /company-details for synthetic companies on localhost.
+
+    Reviews are generated once per company and kept for the server's lifetime.
+    When the client sends a "limit" parameter, responses are paginated with
+    nextToken. Date bounds are ignored, like older API deployments.
+    """
+
+    def __init__(self, companies, reviews_per_company, start=None, end=None):
+        self.companies = {c["id"]: c for c in companies}
+        self.reviews_per_company = reviews_per_company
+        self.window_start = start
+        self.window_end = end
+        self.requests = 0
+        self._reviews = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-api", daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def reviews_for(self, company_id):
+        with self._lock:
+            if company_id not in self._reviews:
+                self._reviews[company_id] = generate_reviews(self.reviews_per_company, company_id, self.window_start, self.window_end)
+            return self._reviews[company_id]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload):
+                body = codec.dumps_bytes(payload)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                stub.requests += 1
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                company_id = query.get("companyId")
+                if company_id not in stub.companies:
+                    return self._send_json(404, {"message": "company not found"})
+
+                if url.path == "/company-details":
+                    return self._send_json(200, company_details(stub.companies[company_id]))
+                if url.path != "/reviews":
+                    return self._send_json(404, {"message": "not found"})
+
+                reviews = stub.reviews_for(company_id)
+                if "limit" not in query:
+                    return self._send_json(200, reviews)
+                offset = int(query.get("nextToken", 0))
+                limit = int(query["limit"])
+                page = reviews[offset:offset + limit]
+                next_token = str(offset + limit) if offset + limit < len(reviews) else None
+                return self._send_json(200, {"items": page, "nextToken": next_token})
+
+        return Handler
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+# --- SMTP sink ---
+class SmtpSink:
+    """Plain-SMTP server on localhost that accepts any login and counts delivered messages"""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(f"{line}\r\n".encode())
+
+            def handle(self):
+                self.reply("220 smtp-sink ESMTP")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode(errors="replace").strip()
+                    verb = command.split(" ", 1)[0].upper()
+                    if verb == "EHLO":
+                        self.wfile.write(b"250-smtp-sink\r\n250-AUTH PLAIN LOGIN\r\n250 OK\r\n")
+                    elif verb == "AUTH" and command.upper().startswith("AUTH LOGIN"):
+                        self.reply("334 " + base64.b64encode(b"Username:").decode())
+                        self.rfile.readline()
+                        self.reply("334 " + base64.b64encode(b"Password:").decode())
+                        self.rfile.readline()
+                        self.reply("235 Authentication successful")
+                    elif verb == "AUTH":
+                        self.reply("235 Authentication successful")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        size = 0
+                        while True:
+                            data_line = self.rfile.readline()
+                            if not data_line or data_line == b".\r\n":
+                                break
+                            size += len(data_line)
+                        with sink._lock:
+                            sink.messages += 1
+                            sink.bytes_received += size
+                        self.reply("250 OK: queued")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("250 OK")
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="smtp-sink", daemon=True)
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+# --- S3 and DynamoDB ---
+class FakeS3Client:
+    """Subset of the boto3 S3 client used by the pipeline, backed by a dict"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def upload_file(self, file_path, bucket, key, ExtraArgs=None):
+        with open(file_path, "rb") as f:
+            self.put_object(Bucket=bucket, Key=key, Body=f.read(), **(ExtraArgs or {}))
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        data = Body if isinstance(Body, bytes) else Body.read()
+        self.store[(Bucket, Key)] = {"Body": data, "Metadata": kwargs.get("Metadata", {}),
+                                     "ContentType": kwargs.get("ContentType")}
+        return {"ETag": f'"{len(data)}"'}
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.store:
+            raise KeyError(f"s3://{Bucket}/{Key} not found")
+        obj = self.store[(Bucket, Key)]
+        return {"ContentLength": len(obj["Body"]), "Metadata": obj["Metadata"]}
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn=3600):
+        return f"http://127.0.0.1/fake-s3/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+class FakeTable:
+    def __init__(self, items):
+        self.items = items
+
+    def scan(self, **kwargs):
+        return {"Items": list(self.items)}
+
+    def get_item(self, Key):
+        for item in self.items:
+            if item.get("id") == Key.get("id"):
+                return {"Item": item}
+        return {}
+
+class FakeDynamoResource:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def Table(self, name):
+        return self.tables.setdefault(name, FakeTable([]))
+
+class FakeSession:
+    """Stand-in for boto3.Session that ignores profiles and serves the fakes above"""
+    s3_store = {}
+    tables = {}
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def client(self, service, **kwargs):
+        if service != "s3":
+            raise ValueError(f"FakeSession has no {service} client")
+        return FakeS3Client(FakeSession.s3_store)
+
+    def resource(self, service, **kwargs):
+        if service != "dynamodb":
+            raise ValueError(f"FakeSession has no {service} resource")
+        return FakeDynamoResource(FakeSession.tables)
+
+def install_aws_stubs(companies, bucket, table_name, region="us-east-1"):
+    """Point boto3.Session at moto (when installed) or the in-process fakes.
+
+    Returns a callable that undoes the patch.
+    """
+    import boto3
+    real_session = boto3.Session
+    try:
+        import moto
+        mock = moto.mock_aws() if hasattr(moto, "mock_aws") else None
+        if mock is None:
+            raise ImportError("moto < 5 is not supported")
+        mock.start()
+
+        def session(profile_name=None, **kwargs):
+            return real_session(aws_access_key_id="testing", aws_secret_access_key="testing", region_name=region)
+
+        session().client("s3").create_bucket(Bucket=bucket)
+        dynamodb = session().resource("dynamodb")
+        table = dynamodb.create_table(
+            TableName=table_name,
+            KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        with table.batch_writer() as batch:
+            for company in companies:
+                batch.put_item(Item=company)
+        boto3.Session = session
+        logger.info("Using moto for S3 and DynamoDB")
+
+        def restore():
+            boto3.Session = real_session
+            mock.stop()
+        return restore
+    except ImportError:
+        FakeSession.s3_store.clear()
+        FakeSession.tables.clear()
+        FakeSession.tables[table_name] = FakeTable(companies)
+        boto3.Session = FakeSession
+        logger.info("moto not installed, using in-process S3 and DynamoDB fakes")
+
+        def restore():
+            boto3.Session = real_session
+        return restore
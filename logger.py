@@ -1,37 +1,126 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
 import os
+import queue
+from contextlib import contextmanager
 from datetime import datetime
 
+# Per-company fields (company_id, stage, ...) attached to every record logged in this context
+_log_context = contextvars.ContextVar('instareview_log_context', default={})
+_listener = None
+
+# Attributes every LogRecord has; anything else was passed via extra= or the log context
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class ContextFilter(logging.Filter):
+    """Copy the current log context onto records before they leave the calling task"""
+
+    def filter(self, record):
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with timestamp, level, message and context fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class ContextTextFormatter(logging.Formatter):
+    """Plain-text format with the company id prefixed when one is set"""
+
+    def format(self, record):
+        message = super().format(record)
+        company_id = getattr(record, 'company_id', None)
+        return f"[{company_id}] {message}" if company_id else message
+
+def set_log_context(**fields):
+    """Add fields to the log context of the current task; returns a token for reset_log_context"""
+    return _log_context.set({**_log_context.get(), **fields})
+
+def reset_log_context(token):
+    _log_context.reset(token)
+
+@contextmanager
+def log_context(**fields):
+    """Attach fields such as company_id to every record logged inside the block"""
+    token = set_log_context(**fields)
+    try:
+        yield
+    finally:
+        reset_log_context(token)
+
+def _stop_listener():
+    """Drain queued records at exit and log directly for the rest of shutdown"""
+    global _listener
+    if _listener is None:
+        return
+    logger = logging.getLogger('InstaReview')
+    for handler in list(logger.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            logger.removeHandler(handler)
+            for target in _listener.handlers:
+                target.addFilter(ContextFilter())
+                logger.addHandler(target)
+    _listener.stop()
+    _listener = None
+
 def setup_logger():
+    global _listener
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
+
     # Create logs directory
     logs_dir = "logs"
     os.makedirs(logs_dir, exist_ok=True)
-    
+
     # Setup logger
     logger = logging.getLogger('InstaReview')
-    
+
     # Only setup if not already configured
     if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        
-        # Create file handler with timestamp
-        log_file = os.path.join(logs_dir, f"feedback_processing_{timestamp}.log")
-        file_handler = logging.FileHandler(log_file)
-        
+        logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+        logger.propagate = False
+
+        # Size-based rotation of one JSON-lines log file instead of a new file per run
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(logs_dir, "instareview.log"),
+            maxBytes=int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+            backupCount=int(os.getenv('LOG_BACKUP_COUNT', '10')),
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(JsonFormatter())
+
         # Create console handler
         console_handler = logging.StreamHandler()
-        
-        # Create formatter
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
-        
-        # Add handlers to logger
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-    
+        if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+            console_handler.setFormatter(JsonFormatter())
+        else:
+            console_handler.setFormatter(ContextTextFormatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+        # Callers only enqueue records; file and console I/O happen on the listener thread
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+        logger.addHandler(queue_handler)
+
+        _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_listener)
+
     return logger, timestamp
 
 def create_categorical_folders():
@@ -41,8 +130,8 @@ def create_categorical_folders():
         'reports': "reports",
         'logs': "logs"
     }
-    
+
     for folder in folders.values():
         os.makedirs(folder, exist_ok=True)
-    
-    return folders
\ No newline at end of file
+
+    return folders
@@ -0,0 +1,170 @@
+import bisect
+import os
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from instrumentation import add_span_listener
+
+logger = logging.getLogger('InstaReview')
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class _Metric:
+    """Thread-safe labelled metric rendered in the Prometheus text format"""
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _label_text(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{self._label_text(key)} {value}")
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            state[0][index] += 1
+            state[1] += 1
+            state[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, (counts, count, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{self.name}_bucket{self._label_text(key, [('le', le)])} {cumulative}")
+                lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+                lines.append(f"{self.name}_sum{self._label_text(key)} {total}")
+        return lines
+
+_REGISTRY = []
+
+REPORTS_RENDERED = Counter("instareview_reports_total", "Reports processed by outcome", ["status"])
+STAGE_LATENCY = Histogram("instareview_stage_duration_seconds", "Pipeline stage wall time", ["stage"])
+RENDER_LATENCY = Histogram("instareview_render_duration_seconds", "Chromium render and print time")
+API_LATENCY = Histogram("instareview_api_request_duration_seconds", "Upstream API fetch time")
+API_ERRORS = Counter("instareview_api_errors_total", "Failed upstream API fetches", ["endpoint"])
+S3_UPLOADED_BYTES = Counter("instareview_s3_uploaded_bytes_total", "Bytes uploaded to S3")
+EMAILS = Counter("instareview_emails_total", "Report emails by outcome", ["status"])
+COMPANIES_QUEUED = Gauge("instareview_companies_queued", "Companies waiting to be processed")
+COMPANIES_IN_FLIGHT = Gauge("instareview_companies_in_flight", "Companies currently being processed")
+
+def render_metrics():
+    """All metrics in the Prometheus/OpenMetrics text exposition format"""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def _on_span(record):
+    STAGE_LATENCY.observe(record["wall_s"], stage=record["stage"])
+    if record["stage"] == "print":
+        RENDER_LATENCY.observe(record["wall_s"])
+    elif record["stage"] == "fetch":
+        API_LATENCY.observe(record["wall_s"])
+    elif record["stage"] == "upload" and record["status"] == "ok":
+        S3_UPLOADED_BYTES.inc(record["bytes_out"])
+
+def write_textfile(path=None):
+    """Atomically write metrics for the node_exporter textfile collector (METRICS_TEXTFILE)"""
+    path = path or os.getenv('METRICS_TEXTFILE')
+    if not path:
+        return None
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(render_metrics())
+        os.replace(tmp_path, path)
+        return path
+    except OSError as e:
+        logger.warning(f"Could not write metrics textfile {path}: {e}")
+        return None
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+_started = False
+
+def start_exporter():
+    """Subscribe to stage spans and serve /metrics on METRICS_PORT when configured"""
+    global _started
+    if _started:
+        return
+    _started = True
+    add_span_listener(_on_span)
+
+    port = os.getenv('METRICS_PORT')
+    if port:
+        server = ThreadingHTTPServer((os.getenv('METRICS_HOST', '0.0.0.0'), int(port)), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+        logger.info(f"Serving Prometheus metrics on port {port}/metrics")
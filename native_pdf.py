@@ -0,0 +1,289 @@
+import base64
+import math
+import textwrap
+from io import BytesIO
+import logging
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.lines import Line2D
+from matplotlib.patches import FancyBboxPatch
+
+logger = logging.getLogger('InstaReview')
+
+# A4 in inches; layout coordinates below are millimetres from the top-left corner
+PAGE_SIZE = (8.27, 11.69)
+PAGE_W_MM, PAGE_H_MM = 210.0, 297.0
+MARGIN_MM = 15.0
+CONTENT_TOP_MM = 30.0
+GUTTER_MM = 5.0
+
+COLORS = {
+    "text": "#1e293b",
+    "muted": "#64748b",
+    "border": "#e2e8f0",
+    "card": "#f8fafc",
+    "primary": "#3b82f6",
+    "positive": "#10b981",
+    "negative": "#ef4444",
+    "warning": "#f59e0b",
+}
+
+IMPROVEMENT_AREAS = [
+    "Enhance tortilla texture and quality",
+    "Increase cheese and meat portions",
+    "Improve flavor profile consistency",
+    "Better microwave cooking instructions",
+]
+
+SUCCESS_METRICS = [
+    "Customer Satisfaction: 3.4/5",
+    "Response Rate: 100%",
+    "Feedback Quality: High",
+    "Action Items: 4 identified",
+]
+
+DISCLAIMER = ("Disclaimer: This analysis is generated by AI based on transcript metadata and automated "
+              "sentiment analysis. Results should be verified by human review for business-critical decisions.")
+
+def _x(mm):
+    return mm / PAGE_W_MM
+
+def _y(mm):
+    return 1 - mm / PAGE_H_MM
+
+def _text(fig, x_mm, y_mm, text, size=8, color=COLORS["text"], weight="normal", ha="left", va="top", style="normal"):
+    fig.text(_x(x_mm), _y(y_mm), text, fontsize=size, color=color, fontweight=weight, ha=ha, va=va, fontstyle=style)
+
+def _box(fig, x_mm, y_mm, w_mm, h_mm, face="white", edge=COLORS["border"], linewidth=0.6):
+    fig.add_artist(FancyBboxPatch(
+        (_x(x_mm), _y(y_mm + h_mm)), w_mm / PAGE_W_MM, h_mm / PAGE_H_MM,
+        boxstyle="round,pad=0,rounding_size=0.006", transform=fig.transFigure,
+        facecolor=face, edgecolor=edge, linewidth=linewidth))
+
+def _wrapped(fig, x_mm, y_mm, text, width_chars, size=7, line_mm=3.6, max_lines=None, **kwargs):
+    """Draw word-wrapped text; returns the y position below the last line"""
+    lines = textwrap.wrap(str(text), width_chars) or [""]
+    if max_lines and len(lines) > max_lines:
+        lines = lines[:max_lines]
+        lines[-1] = lines[-1].rstrip(". ") + "..."
+    for line in lines:
+        _text(fig, x_mm, y_mm, line, size=size, **kwargs)
+        y_mm += line_mm
+    return y_mm
+
+def _chart(fig, x_mm, y_mm, w_mm, h_mm, title, chart_b64):
+    """Card with a title and one of the report's PNG charts"""
+    _box(fig, x_mm, y_mm, w_mm, h_mm)
+    _text(fig, x_mm + 4, y_mm + 4, title, size=9, weight="bold")
+    image = plt.imread(BytesIO(base64.b64decode(chart_b64)), format="png")
+    ax = fig.add_axes([_x(x_mm + 4), _y(y_mm + h_mm - 3), (w_mm - 8) / PAGE_W_MM, (h_mm - 13) / PAGE_H_MM])
+    ax.imshow(image, interpolation="bilinear")
+    ax.set_axis_off()
+
+def _stars(rating):
+    full_stars = math.floor(rating)
+    half_star = 1 if rating - full_stars >= 0.5 else 0
+    return f"{'★' * full_stars}{'½' if half_star else ''}{'☆' * (5 - full_stars - half_star)} {rating}"
+
+def _percent(part, total):
+    return round(part / total * 100) if total else 0
+
+def _header_footer(fig, client, page_number, page_count, generated_on, subtitle=None):
+    # Header band
+    _box(fig, 0, 0, PAGE_W_MM, 22, face=COLORS["card"], edge=COLORS["card"])
+    fig.add_artist(Line2D([0, 1], [_y(22), _y(22)], color=COLORS["primary"], linewidth=2.2, transform=fig.transFigure))
+    _text(fig, MARGIN_MM, 5, f"{client['company_name']} {client['report_cadence']} Analytics Report", size=11, weight="bold")
+    _text(fig, MARGIN_MM, 11, subtitle or f"{client['company_city']} | {client['company_industry']} Industry", size=7, color=COLORS["muted"])
+    _text(fig, MARGIN_MM, 15.5, "Powered by InstaReview.ai", size=7, color=COLORS["muted"])
+    _text(fig, PAGE_W_MM - MARGIN_MM, 6, client['report_period_label'], size=8.5, color=COLORS["primary"], weight="bold", ha="right")
+    _text(fig, PAGE_W_MM - MARGIN_MM, 11.5, f"Data through {generated_on}", size=7, color=COLORS["muted"], ha="right")
+
+    # Footer band
+    _box(fig, 0, PAGE_H_MM - 16, PAGE_W_MM, 16, face=COLORS["text"], edge=COLORS["text"])
+    fig.add_artist(Line2D([0, 1], [_y(PAGE_H_MM - 16), _y(PAGE_H_MM - 16)], color=COLORS["primary"], linewidth=2.2, transform=fig.transFigure))
+    _text(fig, MARGIN_MM, PAGE_H_MM - 12, f"{client['company_name']} | {client['report_cadence']} Analytics Report", size=7.5, color="white", weight="bold")
+    _text(fig, MARGIN_MM, PAGE_H_MM - 7.5, "*Analysis based on AI processing of transcript metadata, not human review",
+          size=6, color="#94a3b8")
+    _text(fig, PAGE_W_MM - MARGIN_MM, PAGE_H_MM - 10, f"InstaReview.ai Analytics    Page {page_number} of {page_count}",
+          size=7.5, color="white", ha="right")
+
+def _page_one(fig, client, charts):
+    col_w = (PAGE_W_MM - 2 * MARGIN_MM - GUTTER_MM) / 2
+    right_x = MARGIN_MM + col_w + GUTTER_MM
+
+    # KPI cards
+    total = client['total_reviews']
+    kpis = [
+        (str(total), "Total Reviews", "▲ 15%", COLORS["positive"]),
+        (f"{_percent(client['positive_reviews'], total)}%", "Positive", "▲ 3%", COLORS["positive"]),
+        (f"{_percent(client['neutral_reviews'], total)}%", "Neutral", "– 0%", COLORS["muted"]),
+        (f"{_percent(client['negative_reviews'], total)}%", "Negative", "▼ 2%", COLORS["negative"]),
+    ]
+    kpi_w = (PAGE_W_MM - 2 * MARGIN_MM - 3 * GUTTER_MM) / 4
+    for i, (value, label, change, color) in enumerate(kpis):
+        x = MARGIN_MM + i * (kpi_w + GUTTER_MM)
+        _box(fig, x, CONTENT_TOP_MM, kpi_w, 24)
+        _text(fig, x + kpi_w / 2, CONTENT_TOP_MM + 4, value, size=17, weight="bold", ha="center")
+        _text(fig, x + kpi_w / 2, CONTENT_TOP_MM + 13, label, size=7, color=COLORS["muted"], ha="center")
+        _text(fig, x + kpi_w / 2, CONTENT_TOP_MM + 18, change, size=7, color=color, ha="center")
+
+    # Charts
+    charts_y = CONTENT_TOP_MM + 29
+    _chart(fig, MARGIN_MM, charts_y, col_w, 72, "Sentiment Trend (7 Days)", charts[0])
+    _chart(fig, right_x, charts_y, col_w, 72, "Star Ratings Distribution", charts[1])
+
+    # Themes and quotes
+    cards_y = charts_y + 77
+    _box(fig, MARGIN_MM, cards_y, col_w, 52, face=COLORS["card"])
+    _text(fig, MARGIN_MM + 4, cards_y + 4, "Top Positive Themes", size=8.5, weight="bold")
+    y = _wrapped(fig, MARGIN_MM + 4, cards_y + 10, " · ".join(client['positive_themes']), 60, color="#1d4ed8", max_lines=4)
+    _text(fig, MARGIN_MM + 4, y + 2, "Areas for Improvement", size=8.5, weight="bold")
+    _wrapped(fig, MARGIN_MM + 4, y + 8, " · ".join(client['negative_themes']), 60, color="#dc2626", max_lines=4)
+
+    _box(fig, right_x, cards_y, col_w, 52, face=COLORS["card"])
+    _text(fig, right_x + 4, cards_y + 4, "Notable Customer Quotes", size=8.5, weight="bold")
+    y = cards_y + 10
+    for i, quote in enumerate(client['notable_quotes'][:3]):
+        color = COLORS["positive"] if i == 0 else COLORS["muted"] if i == 1 else COLORS["negative"]
+        fig.add_artist(Line2D([_x(right_x + 4)] * 2, [_y(y - 0.5), _y(y + 10)], color=color, linewidth=1.2, transform=fig.transFigure))
+        y = _wrapped(fig, right_x + 6, y, f'"{quote}"', 58, size=6.5, line_mm=3.3, max_lines=3,
+                     color=COLORS["muted"], style="italic") + 2.5
+
+    # Survey questions and recommendations
+    table_y = cards_y + 57
+    _box(fig, MARGIN_MM, table_y, col_w, 60, face=COLORS["card"])
+    _text(fig, MARGIN_MM + 4, table_y + 4, "Survey Questions Performance", size=8.5, weight="bold")
+    y = table_y + 10
+    for question, rating in client['top_questions'][:8]:
+        y_next = _wrapped(fig, MARGIN_MM + 4, y, question, 36, size=6.5, line_mm=3.2, max_lines=2)
+        _text(fig, MARGIN_MM + col_w - 4, y, _stars(rating), size=6.5, color="#d97706", ha="right")
+        y = y_next + 1.5
+
+    _box(fig, right_x, table_y, col_w, 60, face=COLORS["card"])
+    _text(fig, right_x + 4, table_y + 4, "Key Recommendations", size=8.5, weight="bold")
+    _wrapped(fig, right_x + 4, table_y + 10, client['recommendation'], 62, size=7, max_lines=13)
+
+def _page_two(fig, client, report, charts):
+    col_w = (PAGE_W_MM - 2 * MARGIN_MM - GUTTER_MM) / 2
+    right_x = MARGIN_MM + col_w + GUTTER_MM
+    stats = report['overall_stats']
+    audio = report['audio_metrics']
+
+    _chart(fig, MARGIN_MM, CONTENT_TOP_MM, col_w, 72, "Channel Breakdown", charts[2])
+    _chart(fig, right_x, CONTENT_TOP_MM, col_w, 72, "NPS Trend (4 Weeks)", charts[3])
+
+    cards_y = CONTENT_TOP_MM + 77
+    _box(fig, MARGIN_MM, cards_y, col_w, 32, face=COLORS["card"])
+    _text(fig, MARGIN_MM + 4, cards_y + 4, "Sentiment Breakdown", size=8.5, weight="bold")
+    for i, sentiment in enumerate(("Positive", "Neutral", "Negative")):
+        y = cards_y + 11 + i * 6
+        _text(fig, MARGIN_MM + 4, y, sentiment, size=7.5)
+        _text(fig, MARGIN_MM + col_w - 4, y,
+              f"{stats[sentiment.lower() + '_percentage']}% ({audio['sentiment_distribution'].get(sentiment, 0)} reviews)",
+              size=7.5, weight="bold", ha="right")
+
+    complaints = sum(1 for item in audio.get('sample_transcripts', []) if 'disappointing' in item.lower() or 'bad' in item.lower())
+    distribution = [
+        f"Survey Responses: {report['survey_metrics']['total_responses']}",
+        f"Audio Feedback: {audio['total_feedback']}",
+        f"Total Feedback: {stats['total_feedback']}",
+        f"Audio Length: {client['avg_feedback_duration']} avg, {client['median_feedback_duration']} median, "
+        f"{client['p90_feedback_duration']} p90",
+        f"Complaints Detected: {complaints}/{audio['total_feedback']}",
+    ]
+    _box(fig, right_x, cards_y, col_w, 32, face=COLORS["card"])
+    _text(fig, right_x + 4, cards_y + 4, "Feedback Distribution", size=8.5, weight="bold")
+    for i, line in enumerate(distribution):
+        _text(fig, right_x + 4, cards_y + 10.5 + i * 4.8, line, size=7.5)
+
+    lists_y = cards_y + 37
+    for x, title, lines, bullet in ((MARGIN_MM, "Improvement Areas", IMPROVEMENT_AREAS, "• "),
+                                    (right_x, "Success Metrics", SUCCESS_METRICS, "")):
+        _box(fig, x, lists_y, col_w, 30, face=COLORS["card"])
+        _text(fig, x + 4, lists_y + 4, title, size=8.5, weight="bold")
+        for i, line in enumerate(lines):
+            _text(fig, x + 4, lists_y + 10.5 + i * 4.5, f"{bullet}{line}", size=7)
+
+    steps_y = lists_y + 35
+    width = PAGE_W_MM - 2 * MARGIN_MM
+    _box(fig, MARGIN_MM, steps_y, width, 18, face=COLORS["border"])
+    _text(fig, MARGIN_MM + 4, steps_y + 4, "Next Steps", size=8.5, weight="bold")
+    _text(fig, MARGIN_MM + 4, steps_y + 10, "Focus on product quality improvements based on feedback", size=7.5, color=COLORS["muted"])
+    if client.get('benchmark_summary'):
+        _text(fig, MARGIN_MM + 4, steps_y + 14.5, client['benchmark_summary'], size=6.5, color=COLORS["primary"])
+    _text(fig, MARGIN_MM + width - 4, steps_y + 4, f"NPS Score: {client['nps_score']}", size=8, color=COLORS["primary"], weight="bold", ha="right")
+    _text(fig, MARGIN_MM + width - 4, steps_y + 10, "Powered by InstaReview.ai", size=6.5, color=COLORS["muted"], ha="right")
+
+    disclaimer_y = steps_y + 23
+    _box(fig, MARGIN_MM, disclaimer_y, width, 12, face="#fef3c7", edge=COLORS["warning"])
+    _wrapped(fig, MARGIN_MM + 3, disclaimer_y + 3, DISCLAIMER, 140, size=6.5, line_mm=3.2, color="#92400e")
+
+def _group_summary(fig, sections, kpis):
+    """KPI cards across locations and one table row per location"""
+    kpi_w = (PAGE_W_MM - 2 * MARGIN_MM - 3 * GUTTER_MM) / 4
+    for i, (value, label) in enumerate(kpis):
+        x = MARGIN_MM + i * (kpi_w + GUTTER_MM)
+        _box(fig, x, CONTENT_TOP_MM, kpi_w, 20)
+        _text(fig, x + kpi_w / 2, CONTENT_TOP_MM + 4, str(value), size=17, weight="bold", ha="center")
+        _text(fig, x + kpi_w / 2, CONTENT_TOP_MM + 13, label, size=7, color=COLORS["muted"], ha="center")
+
+    width = PAGE_W_MM - 2 * MARGIN_MM
+    table_y = CONTENT_TOP_MM + 26
+    columns = ((4, "Location", "left"), (70, "City", "left"), (120, "Reviews", "right"),
+               (140, "Positive", "right"), (158, "Negative", "right"), (width - 4, "NPS", "right"))
+    _box(fig, MARGIN_MM, table_y, width, 12 + 6 * len(sections), face=COLORS["card"])
+    for offset, label, align in columns:
+        _text(fig, MARGIN_MM + offset, table_y + 4, label, size=7.5, weight="bold", ha=align)
+    for i, section in enumerate(sections):
+        client, stats = section["client"], section["report"]["overall_stats"]
+        values = (textwrap.shorten(client['company_name'], 40), textwrap.shorten(str(client['company_city']), 28),
+                  client['total_reviews'], f"{stats['positive_percentage']}%", f"{stats['negative_percentage']}%",
+                  client['nps_score'])
+        for (offset, _, align), value in zip(columns, values):
+            _text(fig, MARGIN_MM + offset, table_y + 10 + i * 6, str(value), size=7.5, ha=align)
+
+def _draw_pages(pdf, pages, generated_on):
+    """Save (header client, draw, header subtitle) pages in order, numbered across the document"""
+    for page_number, (client, draw, subtitle) in enumerate(pages, 1):
+        fig = plt.figure(figsize=PAGE_SIZE, facecolor="white")
+        try:
+            _header_footer(fig, client, page_number, len(pages), generated_on, subtitle)
+            draw(fig)
+            pdf.savefig(fig)
+        finally:
+            plt.close(fig)
+
+def _report_pages(client, report, charts):
+    return [(client, lambda fig: _page_one(fig, client, charts), None),
+            (client, lambda fig: _page_two(fig, client, report, charts), None)]
+
+def render_native_pdf(client, report, charts, generated_on):
+    """Draw the standard two-page weekly report with matplotlib's PDF backend; returns PDF bytes.
+
+    charts are the base64 PNGs from the chart functions, in the order
+    trend, star ratings, channel, NPS.
+    """
+    buffer = BytesIO()
+    with PdfPages(buffer, metadata={"Title": f"{client['company_name']} {client['report_cadence']} Analytics Report",
+                                    "Creator": "InstaReview.ai", "CreationDate": None}) as pdf:
+        _draw_pages(pdf, _report_pages(client, report, charts), generated_on)
+    return buffer.getvalue()
+
+def render_native_bundle(group_name, sections, kpis, generated_on):
+    """Draw a group bundle: a summary page, then each location's two report pages; returns PDF bytes.
+
+    sections carry each location's client and report data and its charts;
+    kpis are the (value, label) cards of the summary page.
+    """
+    first = sections[0]["client"]
+    group = dict(first, company_name=group_name, report_cadence=f"{first['report_cadence']} Group")
+    pages = [(group, lambda fig: _group_summary(fig, sections, kpis), f"{len(sections)} locations")]
+    for section in sections:
+        pages += _report_pages(section["client"], section["report"], section["charts"])
+    buffer = BytesIO()
+    with PdfPages(buffer, metadata={"Title": f"{group_name} Group Report", "Creator": "InstaReview.ai",
+                                    "CreationDate": None}) as pdf:
+        _draw_pages(pdf, pages, generated_on)
+    return buffer.getvalue()
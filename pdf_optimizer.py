@@ -0,0 +1,158 @@
+import base64
+import os
+import threading
+import time
+import logging
+from io import BytesIO
+import PyPDF2
+from instrumentation import span
+
+try:
+    import pikepdf
+except ImportError:
+    pikepdf = None
+
+logger = logging.getLogger('InstaReview')
+
+# pikepdf's flate level is process-wide: set it only for one save at a time and put back zlib's default after
+DEFAULT_FLATE_LEVEL = -1
+_flate_lock = threading.Lock()
+
+# Charts are drawn at figsize (3, 2.5) and shown in a 180px-tall .chart-img box (96 CSS px per inch)
+CHART_DISPLAY_HEIGHT_IN = 180 / 96
+
+# chart_ppi: chart pixels per printed inch; palette_colors: quantize chart PNGs (None keeps full colour);
+# flate_level: recompress every stream at this zlib level (None keeps the printed streams)
+QUALITY_TIERS = {
+    "high": {"chart_ppi": 200, "palette_colors": None, "flate_level": None},
+    "standard": {"chart_ppi": 150, "palette_colors": 128, "flate_level": 9},
+    "small": {"chart_ppi": 110, "palette_colors": 48, "flate_level": 9},
+}
+
+def pdf_quality():
+    """PDF_QUALITY: high (default, charts as before), standard, small, or off to skip the optimization stage"""
+    quality = os.getenv('PDF_QUALITY', 'high').strip().lower()
+    if quality not in QUALITY_TIERS and quality != 'off':
+        logger.warning(f"Unknown PDF_QUALITY '{quality}', falling back to 'high'")
+        return 'high'
+    return quality
+
+def _tier():
+    return QUALITY_TIERS.get(pdf_quality(), QUALITY_TIERS["high"])
+
+def chart_dpi(fig):
+    """Render DPI that gives the tier's pixel density at the size the chart is printed, not the figure size"""
+    return max(72, round(_tier()["chart_ppi"] * CHART_DISPLAY_HEIGHT_IN / fig.get_figheight()))
+
+def _quantize_png(png_bytes, colors):
+    """Palette PNG of at most colors colours; flat chart fills compress far better than RGBA"""
+    from PIL import Image
+    image = Image.open(BytesIO(png_bytes)).convert('RGB').quantize(colors=colors, dither=0)
+    output = BytesIO()
+    image.save(output, format='PNG', optimize=True)
+    return output.getvalue() if output.tell() < len(png_bytes) else png_bytes
+
+def encode_chart(fig):
+    """Base64 PNG of a chart figure at the PDF_QUALITY tier's DPI and palette"""
+    buf = BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight', dpi=chart_dpi(fig), facecolor='white')
+    png_bytes = buf.getvalue()
+    colors = _tier()["palette_colors"]
+    if colors:
+        try:
+            png_bytes = _quantize_png(png_bytes, colors)
+        except Exception as e:
+            logger.warning(f"Could not quantize chart PNG, keeping full colour: {e}")
+    return base64.b64encode(png_bytes).decode()
+
+def _optimize_with_pikepdf(pdf_bytes, flate_level, metadata):
+    output = BytesIO()
+    with pikepdf.open(BytesIO(pdf_bytes)) as pdf:
+        if metadata is not None:
+            info = dict(metadata)
+            if pdf.docinfo.get('/Title') is not None:
+                info['/Title'] = pdf.docinfo['/Title']
+            pdf.trailer.Info = pdf.make_indirect(pikepdf.Dictionary(info))
+            if '/Metadata' in pdf.Root:
+                del pdf.Root.Metadata
+        pdf.remove_unreferenced_resources()
+        with _flate_lock:
+            if flate_level is not None:
+                pikepdf.settings.set_flate_compression_level(flate_level)
+            try:
+                pdf.save(output, compress_streams=True, recompress_flate=flate_level is not None,
+                         object_stream_mode=pikepdf.ObjectStreamMode.generate, deterministic_id=True)
+            finally:
+                if flate_level is not None:
+                    pikepdf.settings.set_flate_compression_level(DEFAULT_FLATE_LEVEL)
+    return output.getvalue()
+
+def _optimize_with_pypdf2(pdf_bytes, metadata):
+    reader = PyPDF2.PdfReader(BytesIO(pdf_bytes))
+    writer = PyPDF2.PdfWriter()
+    for page in reader.pages:
+        writer.add_page(page)
+    for page in writer.pages:
+        page.compress_content_streams()
+    if metadata is not None:
+        info = dict(metadata)
+        if reader.metadata and reader.metadata.title:
+            info['/Title'] = reader.metadata.title
+        writer.add_metadata(info)
+    elif reader.metadata:
+        writer.add_metadata(dict(reader.metadata))
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+def optimize_pdf(pdf_bytes, company_id=None, metadata=None):
+    """Compress a printed PDF losslessly: object streams and recompressed streams with pikepdf, else
+    compressed page content with PyPDF2. Returns the smaller of the input and the result.
+
+    metadata, when given, replaces the document info (dates and IDs included; the title is kept)
+    in the same rewrite, and the rewrite is then kept even when it is not smaller.
+    """
+    quality = pdf_quality()
+    if quality == 'off':
+        return pdf_bytes
+    started = time.perf_counter()
+    with span("optimize", company_id) as optimize_span:
+        optimize_span.add_bytes_in(len(pdf_bytes))
+        try:
+            if pikepdf is not None:
+                optimized = _optimize_with_pikepdf(pdf_bytes, QUALITY_TIERS[quality]["flate_level"], metadata)
+            else:
+                optimized = _optimize_with_pypdf2(pdf_bytes, metadata)
+        except Exception as e:
+            logger.warning(f"Could not optimize PDF, keeping the printed bytes: {e}")
+            optimized = pdf_bytes
+        if len(optimized) >= len(pdf_bytes) and metadata is None:
+            optimized = pdf_bytes
+        optimize_span.add_bytes_out(len(optimized))
+    elapsed = time.perf_counter() - started
+    saved = 1 - len(optimized) / len(pdf_bytes) if pdf_bytes else 0
+    logger.info(f"Optimized PDF ({quality}): {len(pdf_bytes)} -> {len(optimized)} bytes "
+                f"({saved:.0%} smaller) in {elapsed * 1000:.0f}ms",
+                extra={"pdf_quality": quality, "pdf_bytes_before": len(pdf_bytes),
+                       "pdf_bytes_after": len(optimized), "optimize_ms": round(elapsed * 1000, 1)})
+    return optimized
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Optimize existing report PDFs and print the size saved")
+    parser.add_argument("pdfs", nargs="+", help="PDF files to optimize")
+    parser.add_argument("--quality", choices=sorted(QUALITY_TIERS), help="Override PDF_QUALITY")
+    parser.add_argument("--write", action="store_true", help="Replace each file with its optimized version")
+    args = parser.parse_args()
+    if args.quality:
+        os.environ['PDF_QUALITY'] = args.quality
+    from logger import setup_logger
+    setup_logger()
+    for path in args.pdfs:
+        with open(path, 'rb') as f:
+            original = f.read()
+        optimized = optimize_pdf(original, os.path.basename(path))
+        print(f"{path}: {len(original)} -> {len(optimized)} bytes")
+        if args.write and optimized is not original:
+            with open(path, 'wb') as f:
+                f.write(optimized)
@@ -0,0 +1,192 @@
+import os
+import datetime
+import logging
+from bisect import bisect_left
+from dataclasses import dataclass
+
+logger = logging.getLogger('InstaReview')
+
+# Fields checked, in order, for a review's creation time before falling back to the audioId prefix
+TIMESTAMP_FIELDS = ('createdAt', 'dateCreated', 'created_at', 'timestamp', 'dateUpdated')
+
+def parse_datetime(value):
+    """Parse an ISO-8601 string or epoch seconds/milliseconds into a naive UTC datetime"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time.min)
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.isdigit()):
+        epoch = float(value)
+        if epoch > 1e11:  # milliseconds
+            epoch /= 1000
+        return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).replace(tzinfo=None)
+    try:
+        parsed = datetime.datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parse_datetime(parsed) if parsed.tzinfo is not None else parsed
+
+def get_report_period(now=None):
+    """Return (start_date, end_date) from REPORT_FROM_DATE/REPORT_TO_DATE or the current week"""
+    from_date_env = os.getenv('REPORT_FROM_DATE')
+    to_date_env = os.getenv('REPORT_TO_DATE')
+
+    if from_date_env and to_date_env:
+        week_start = datetime.datetime.fromisoformat(from_date_env.replace('Z', '')).date()
+        week_end = datetime.datetime.fromisoformat(to_date_env.replace('Z', '')).date()
+    else:
+        today = (now or datetime.datetime.now()).date()
+        week_start = today - datetime.timedelta(days=today.weekday())
+        week_end = week_start + datetime.timedelta(days=6)
+    return week_start, week_end
+
+def period_bounds(start_date, end_date):
+    """Return [start, end) datetimes covering whole days from start_date to end_date inclusive"""
+    start = datetime.datetime.combine(start_date, datetime.time.min)
+    end = datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time.min)
+    return start, end
+
+def review_timestamp(item):
+    """Best-effort creation time of an API review item, or None if it cannot be determined"""
+    for field in TIMESTAMP_FIELDS:
+        created = parse_datetime(item.get(field))
+        if created:
+            return created
+
+    # audioId is "<epoch ms>_<companyId>"
+    meta_data = item.get("metaData")
+    if isinstance(meta_data, dict):
+        prefix = str(meta_data.get("audioId", "")).split("_", 1)[0]
+        if prefix.isdigit():
+            return parse_datetime(prefix)
+    return None
+
+def filter_by_period(items, start_date, end_date):
+    """Keep items created within the period; items without a timestamp are kept"""
+    start, end = period_bounds(start_date, end_date)
+    kept = []
+    dropped = 0
+    undated = 0
+    for item in items:
+        created = review_timestamp(item)
+        if created is None:
+            undated += 1
+        elif not (start <= created < end):
+            dropped += 1
+            continue
+        kept.append(item)
+    if dropped:
+        logger.info(f"Filtered out {dropped} reviews outside {start_date} - {end_date}")
+    if undated:
+        logger.warning(f"{undated} reviews have no timestamp and were kept unfiltered")
+    return kept
+
+@dataclass(frozen=True)
+class Period:
+    """A report period: kind is 'week', 'month' or 'custom'; start and end dates are inclusive"""
+    kind: str
+    start: datetime.date
+    end: datetime.date
+
+    @property
+    def cadence(self):
+        return {"week": "Weekly", "month": "Monthly"}.get(self.kind, "Custom Period")
+
+    @property
+    def label(self):
+        if self.kind == "month":
+            return self.start.strftime('%B %Y')
+        prefix = "Week of " if self.kind == "week" else ""
+        return f"{prefix}{self.start.strftime('%b %d')} – {self.end.strftime('%b %d, %Y')}"
+
+    @property
+    def key_date(self):
+        """Date whose YYYY/MM folder holds the report; a week belongs to the month of its Thursday, as in ISO weeks"""
+        return self.start + datetime.timedelta(days=3) if self.kind == "week" else self.start
+
+    @property
+    def key_name(self):
+        """File name in the period's YYYY/MM/ S3 folder: W#, month or YYYYMMDD-YYYYMMDD"""
+        if self.kind == "week":
+            return str(self.start.isocalendar()[1])
+        if self.kind == "month":
+            return "month"
+        return f"{self.start:%Y%m%d}-{self.end:%Y%m%d}"
+
+def week_period(day):
+    """The Monday-to-Sunday week containing day"""
+    start = day - datetime.timedelta(days=day.weekday())
+    return Period("week", start, start + datetime.timedelta(days=6))
+
+def month_period(day):
+    start = day.replace(day=1)
+    next_month = (start + datetime.timedelta(days=32)).replace(day=1)
+    return Period("month", start, next_month - datetime.timedelta(days=1))
+
+def weekly_periods(start_date, end_date):
+    """Every ISO week overlapping start_date..end_date, oldest first"""
+    periods = []
+    period = week_period(start_date)
+    while period.start <= end_date:
+        periods.append(period)
+        period = week_period(period.start + datetime.timedelta(days=7))
+    return periods
+
+def parse_periods(spec, today=None):
+    """Periods from a comma-separated spec: week, last-week, month, last-month or YYYY-MM-DD:YYYY-MM-DD"""
+    today = today or datetime.date.today()
+    periods = []
+    for part in (p.strip().lower() for p in spec.split(',') if p.strip()):
+        if part == "week":
+            periods.append(week_period(today))
+        elif part == "last-week":
+            periods.append(week_period(today - datetime.timedelta(days=7)))
+        elif part == "month":
+            periods.append(month_period(today))
+        elif part == "last-month":
+            periods.append(month_period(today.replace(day=1) - datetime.timedelta(days=1)))
+        elif ":" in part:
+            start, end = (datetime.date.fromisoformat(d.strip()[:10]) for d in part.split(":", 1))
+            if end < start:
+                raise ValueError(f"Period {part} ends before it starts")
+            periods.append(Period("custom", start, end))
+        else:
+            raise ValueError(f"Unknown report period '{part}'")
+    return list(dict.fromkeys(periods))
+
+def union_bounds(periods):
+    """(start_date, end_date) covering every period, for a single fetch"""
+    return min(p.start for p in periods), max(p.end for p in periods)
+
+def bucket_by_period(items, periods):
+    """Split items into {period: items} in one pass over the data.
+
+    Items are ordered by creation time once; each period is then a slice found
+    by bisecting its bounds, so overlapping periods (a week inside a month)
+    share the work. Undated items are kept for a single period, as in
+    filter_by_period; with several periods they cannot be placed and are
+    counted and left out, rather than inflating every report.
+    """
+    dated = []
+    undated = []
+    for item in items:
+        created = review_timestamp(item)
+        if created is None:
+            undated.append(item)
+        else:
+            dated.append((created, len(dated), item))
+    dated.sort(key=lambda entry: (entry[0], entry[1]))
+    times = [entry[0] for entry in dated]
+    if undated and len(periods) > 1:
+        logger.warning(f"{len(undated)} reviews have no timestamp and were left out of all {len(periods)} periods")
+        undated = []
+
+    buckets = {}
+    for period in periods:
+        start, end = period_bounds(period.start, period.end)
+        buckets[period] = [entry[2] for entry in dated[bisect_left(times, start):bisect_left(times, end)]] + undated
+    return buckets
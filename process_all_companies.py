@@ -1,13 +1,21 @@
+import argparse
 import os
 import asyncio
 import json
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from logger import setup_logger
+from logger import setup_logger, set_log_context, reset_log_context
 from fetch_companies_dynamodb import get_all_companies
 from fetch_customer_data import fetch_company_details, process_customer_data
-from create_pdf_report import generate_pdf, upload_to_s3
-from send_email import send_reports_for_companies
+from create_pdf_report import generate_report, generate_report_data, get_report_format, nps_score, use_aggregates, has_aggregate
+from industry_index import IndustryIndex, benchmarks_enabled, company_metrics, use_index
+from render_scheduler import RenderScheduler, default_concurrency
+from report_bundles import bundle_mode_enabled, group_companies, group_contact, generate_bundle
+from email_outbox import connect as connect_outbox, enqueue, deliver, outbox_mode, status_counts
+from periods import get_report_period
+from instrumentation import write_run_summary
+from profiling import add_profile_arguments, configure_profiling
+from metrics_exporter import start_exporter, write_textfile, REPORTS_RENDERED, COMPANIES_QUEUED, COMPANIES_IN_FLIGHT
 
 # Load environment variables
 load_dotenv()
@@ -15,8 +23,12 @@ load_dotenv()
 # Setup logging
 logger, timestamp = setup_logger()
 
-async def process_company_report(company_id):
-    """Process report for a single company"""
+async def process_company_report(company_id, scheduler=None, report_format='pdf', data=None):
+    """Process report for a single company; data is its reviews when already fetched this run.
+
+    A company whose aggregate was handed over with use_aggregates is reported without fetching.
+    """
+    log_token = set_log_context(company_id=company_id)
     try:
         # Set company ID for this process
         os.environ['COMPANY_ID'] = company_id
@@ -24,42 +36,92 @@ async def process_company_report(company_id):
         logger.info(f"Processing company: {company_id}")
         
         # Check if company has data
-        filtered_data = process_customer_data()
-        if not filtered_data or len(filtered_data) == 0:
+        filtered_data = data
+        if data is None and not has_aggregate(company_id):
+            filtered_data = process_customer_data()
+        if filtered_data is not None and len(filtered_data) == 0:
             logger.info(f"No data found for company {company_id}, skipping report generation")
+            REPORTS_RENDERED.inc(status="no_data")
             return None, None
         
-        logger.info(f"Found {len(filtered_data)} records for company {company_id}")
-        
-        # Generate PDF report
-        from create_pdf_report import generate_pdf
-        pdf_path = await generate_pdf()
-        
-        if not pdf_path or not os.path.exists(pdf_path):
-            logger.error(f"Failed to generate PDF for company {company_id}")
-            return None, None
+        if filtered_data is not None:
+            logger.info(f"Found {len(filtered_data)} records for company {company_id}")
         
-        # Upload to S3
-        week_num = datetime.now().isocalendar()[1]
-        year = datetime.now().year
-        month = datetime.now().month
-        s3_key = f"instareview-reports/{company_id}/{year:04d}/{month:02d}/{week_num}.pdf"
+        # Generate the report in the company's format; it is uploaded and the S3 keys returned
+        pdf_path, s3_keys = await generate_report(filtered_data, company_id, scheduler, report_format)
         
-        if upload_to_s3(pdf_path, company_id, week_num):
-            logger.info(f"Report uploaded to S3 for company {company_id}")
-            return company_id, s3_key
+        if s3_keys:
+            logger.info(f"Report ({report_format}) uploaded to S3 for company {company_id}")
+            REPORTS_RENDERED.inc(status="success")
+            return company_id, s3_keys
         else:
-            logger.error(f"Failed to upload report to S3 for company {company_id}")
+            logger.error(f"Failed to generate or upload report for company {company_id}")
+            REPORTS_RENDERED.inc(status="failed")
             return None, None
             
     except Exception as e:
         logger.error(f"Error processing company {company_id}: {e}")
+        REPORTS_RENDERED.inc(status="failed")
         return None, None
+    finally:
+        reset_log_context(log_token)
 
-async def main():
+async def process_group_report(contact, locations, scheduler=None, prefetched=None):
+    """Process one combined report for all locations of a group account"""
+    group_id = contact['id']
+    log_token = set_log_context(company_id=group_id)
+    try:
+        logger.info(f"Processing group {group_id} with {len(locations)} locations")
+        s3_key = await generate_bundle(contact, locations, scheduler, prefetched)
+        if s3_key:
+            REPORTS_RENDERED.inc(status="success")
+            return group_id, s3_key
+        REPORTS_RENDERED.inc(status="no_data")
+        return None, None
+    except Exception as e:
+        logger.error(f"Error processing group {group_id}: {e}")
+        REPORTS_RENDERED.inc(status="failed")
+        return None, None
+    finally:
+        reset_log_context(log_token)
+
+def build_industry_index(companies):
+    """Phase one of a benchmarked run: aggregate every company once and persist the peer index.
+
+    Returns the index, {company_id: report_data} for every company with reviews
+    and the ids of companies without any. Only the compact aggregates are kept,
+    so phase two renders the reports without fetching or aggregating again.
+    """
+    index = IndustryIndex()
+    aggregates = {}
+    empty = set()
+    for company in companies:
+        company_id = company.get('id')
+        if not company_id:
+            continue
+        log_token = set_log_context(company_id=company_id)
+        try:
+            filtered_data = process_customer_data(company_id=company_id)
+            if not filtered_data:
+                empty.add(company_id)
+                continue
+            report_data = aggregates[company_id] = generate_report_data(filtered_data, company_id)
+            details = fetch_company_details(company_id) or company
+            index.add(details.get('industry'), details.get('city'),
+                      company_metrics(report_data, nps_score(report_data["overall_stats"])))
+        except Exception as e:
+            logger.warning(f"Leaving company {company_id} out of the industry index: {e}")
+        finally:
+            reset_log_context(log_token)
+    index.freeze().save()
+    return index, aggregates, empty
+
+async def main(profile=False, profile_every=1):
     """Main function to process all companies"""
     try:
         logger.info("Starting batch report generation for all companies")
+        configure_profiling(profile, profile_every)
+        start_exporter()
         
         # Get all companies from DynamoDB
         companies = get_all_companies()
@@ -69,37 +131,103 @@ async def main():
         
         logger.info(f"Found {len(companies)} companies to process")
         
-        # Process each company
+        # Peer percentiles need every company's aggregate before the first report;
+        # the reports below reuse those aggregates, and skip companies found without reviews
+        prefetched = {}
+        if benchmarks_enabled():
+            index, aggregates, empty = build_industry_index(companies)
+            use_index(index)
+            use_aggregates(aggregates)
+            prefetched = {company_id: [] for company_id in empty}
+        
+        # Locations of a group account become one bundled report when REPORT_BUNDLES=on
+        groups, by_id = {}, {}
+        if bundle_mode_enabled():
+            groups, companies, by_id = group_companies(companies)
+            logger.info(f"Bundling {sum(len(locations) for locations in groups.values())} locations into {len(groups)} group reports")
+        COMPANIES_QUEUED.set(len(companies) + len(groups))
+        
+        # Process each company; fetch and layout run one company at a time while
+        # earlier companies print concurrently in the shared browser
         companies_with_reports = []
         
-        for company in companies:
-            company_id = company.get('id')
-            if not company_id:
-                logger.warning("Company missing ID, skipping")
-                continue
-            
-            # Check if company has email
-            company_email = company.get('email')
-            if not company_email:
-                logger.warning(f"Company {company_id} has no email, will skip email sending")
+        # Record each uploaded report in the durable email outbox as soon as it is uploaded, once per
+        # company and period, so a crash later in the run still leaves the finished reports to be emailed
+        outbox = connect_outbox()
+        period_start, period_end = get_report_period()
+        
+        def record_upload(company, processed_id, s3_keys):
+            if processed_id and s3_keys:
+                enqueue(outbox, company, s3_keys, period_start, period_end)
+            return processed_id, s3_keys
+        
+        async def run_company(company):
+            COMPANIES_IN_FLIGHT.inc()
+            try:
+                return record_upload(company, *await process_company_report(
+                    company['id'], scheduler, get_report_format(company), prefetched.pop(company['id'], None)))
+            finally:
+                COMPANIES_IN_FLIGHT.dec()
+                write_textfile()
+        
+        async def run_group(contact, locations):
+            COMPANIES_IN_FLIGHT.inc()
+            try:
+                return record_upload(contact, *await process_group_report(contact, locations, scheduler, prefetched))
+            finally:
+                COMPANIES_IN_FLIGHT.dec()
+                write_textfile()
+        
+        async with RenderScheduler(default_concurrency()) as scheduler:
+            tasks = []
+            for company in companies:
+                COMPANIES_QUEUED.dec()
+                company_id = company.get('id')
+                if not company_id:
+                    logger.warning("Company missing ID, skipping")
+                    continue
+                
+                # Check if company has email
+                company_email = company.get('email')
+                if not company_email:
+                    logger.warning(f"Company {company_id} has no email, will skip email sending")
+                
+                # Bound the reports held in memory while waiting for a page
+                in_progress = [task for _, task in tasks if not task.done()]
+                if len(in_progress) >= scheduler.concurrency * 2:
+                    await asyncio.wait(in_progress, return_when=asyncio.FIRST_COMPLETED)
+                tasks.append((company, asyncio.create_task(run_company(company))))
             
-            # Process report
-            processed_id, s3_key = await process_company_report(company_id)
+            for parent_id, locations in groups.items():
+                COMPANIES_QUEUED.dec()
+                contact = group_contact(parent_id, locations, by_id)
+                if not contact.get('email'):
+                    logger.warning(f"Group {parent_id} has no email, will skip email sending")
+                in_progress = [task for _, task in tasks if not task.done()]
+                if len(in_progress) >= scheduler.concurrency * 2:
+                    await asyncio.wait(in_progress, return_when=asyncio.FIRST_COMPLETED)
+                tasks.append((contact, asyncio.create_task(run_group(contact, locations))))
             
-            if processed_id and s3_key:
-                companies_with_reports.append((company, s3_key))
-                logger.info(f"Successfully processed report for {company_id}")
-            else:
-                logger.info(f"Skipped report for {company_id} (no data or error)")
-        
-        # Send emails for companies with reports
-        if companies_with_reports:
-            logger.info(f"Sending emails for {len(companies_with_reports)} companies with reports")
-            success_count, total_count = send_reports_for_companies(companies_with_reports)
-            logger.info(f"Email sending completed: {success_count}/{total_count} emails sent")
-        else:
+            for company, task in tasks:
+                processed_id, s3_key = await task
+                if processed_id and s3_key:
+                    companies_with_reports.append((company, s3_key))
+                    logger.info(f"Successfully processed report for {processed_id}")
+                else:
+                    logger.info(f"Skipped report for {company['id']} (no data or error)")
+        
+        # Send emails for companies with reports, unless a separate worker drains the outbox
+        if not companies_with_reports:
             logger.info("No companies had data for reports, no emails sent")
+        elif outbox_mode() == 'deferred':
+            logger.info(f"Queued {len(companies_with_reports)} report emails for the delivery worker")
+        else:
+            logger.info(f"Sending emails for {len(companies_with_reports)} companies with reports")
+            sent, failed = deliver(outbox)
+            logger.info(f"Email sending completed: {sent} sent, {failed} failed, outbox {status_counts(outbox)}")
         
+        write_run_summary()
+        write_textfile()
         logger.info("Batch report generation completed successfully")
         
     except Exception as e:
@@ -107,4 +235,7 @@ async def main():
         raise
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate and email reports for all companies")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    asyncio.run(main(args.profile, args.profile_every))
\ No newline at end of file
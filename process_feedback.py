@@ -1,79 +1,89 @@
-import json
+import glob
 import os
+import codec
 from logger import setup_logger, create_categorical_folders
+from artifacts import save_artifact, load_artifact, flush_artifacts
+from review_records import decode_reviews
+from themes import ThemeCounter
 from datetime import datetime
 
 # Setup logging
 logger, timestamp = setup_logger()
 folders = create_categorical_folders()
 
+def _duration_text(seconds):
+    """Audio duration as the API wrote it: whole seconds without a decimal point, never in exponent form"""
+    if seconds is None:
+        return ""
+    return str(int(seconds)) if float(seconds).is_integer() else str(round(seconds, 3))
+
+def load_legacy_feedback():
+    """Load filtered data from the pre-artifact JSON files, newest layout first"""
+    for legacy_file in ("output_data/customer_feedback.json", "output_data/filtered_data.json"):
+        if os.path.exists(legacy_file):
+            with open(legacy_file, "rb") as f:
+                filtered_data = codec.loads(f.read())
+            logger.info(f"Loaded {len(filtered_data)} filtered items from {legacy_file}")
+            return filtered_data
+    
+    # Try to find the latest timestamped filtered data file
+    data_files = glob.glob("data/customer_feedback_*.json") + glob.glob("data/filtered_data_*.json")
+    if data_files:
+        latest_file = max(data_files)
+        with open(latest_file, "rb") as f:
+            filtered_data = codec.loads(f.read())
+        logger.info(f"Loaded {len(filtered_data)} filtered items from {latest_file}")
+        return filtered_data
+    return None
+
 def process_filtered_data():
     logger.info("Starting data processing...")
     
-    # Load filtered data - try compatibility file first, then timestamped files
-    filtered_data = None
-    try:
-        with open("output_data/customer_feedback.json", "r") as f:
-            filtered_data = json.load(f)
-        logger.info(f"Loaded {len(filtered_data)} filtered items from compatibility file")
-    except FileNotFoundError:
-        try:
-            with open("output_data/filtered_data.json", "r") as f:
-                filtered_data = json.load(f)
-            logger.info(f"Loaded {len(filtered_data)} filtered items from old compatibility file")
-        except FileNotFoundError:
-            # Try to find the latest timestamped filtered data file
-            import glob
-            data_files = glob.glob("data/customer_feedback_*.json") + glob.glob("data/filtered_data_*.json")
-            if data_files:
-                latest_file = max(data_files)
-                with open(latest_file, "r") as f:
-                    filtered_data = json.load(f)
-                logger.info(f"Loaded {len(filtered_data)} filtered items from {latest_file}")
-            else:
-                logger.error("No customer feedback files found")
-                return None
+    # Load filtered data - try per-company artifacts first, then legacy files
+    filtered_data = load_artifact("customer_feedback", os.getenv('COMPANY_ID'))
+    if filtered_data is not None:
+        logger.info(f"Loaded {len(filtered_data)} filtered items from artifacts")
+    else:
+        filtered_data = load_legacy_feedback()
+        if filtered_data is None:
+            logger.error("No customer feedback files found")
+            return None
+    
+    # Decode to typed records in one validating pass; malformed items are skipped
+    reviews, skipped = decode_reviews(filtered_data)
     
     survey_data = []
     audio_feedback_data = []
     
-    for item in filtered_data:
+    for review in reviews:
         # Process survey data to DynamoDB format
-        if item.get("quess"):
-            for survey_item in item["quess"]:
-                formatted_survey = {
-                    "M": {
-                        "question": {"S": survey_item["question"]},
-                        "answer": {"N": str(survey_item["answer"])},
-                        "questionId": {"S": survey_item["questionId"]}
-                    }
+        for answer in review.answers:
+            formatted_survey = {
+                "M": {
+                    "question": {"S": answer.question},
+                    "answer": {"N": str(answer.answer)},
+                    "questionId": {"S": answer.question_id}
                 }
-                survey_data.append(formatted_survey)
+            }
+            survey_data.append(formatted_survey)
         
         # Process audio feedback data
-        if item.get("metaData"):
-            meta_data = item["metaData"]
-            # Parse JSON string if needed
-            if isinstance(meta_data, str):
-                try:
-                    meta_data = json.loads(meta_data)
-                except:
-                    continue
-            
+        analysis = review.analysis
+        if analysis is not None:
             formatted_audio = {
-                "audioId": meta_data["audioId"],
-                "detectedLanguage": meta_data["detectedLanguage"],
-                "audioDurationSec": str(meta_data["audioDurationSec"]),
-                "companyName": item["companyId"],
-                "transcript": item.get("transcribe", ""),
+                "audioId": review.audio_id,
+                "detectedLanguage": review.detected_language,
+                "audioDurationSec": _duration_text(review.audio_duration_sec),
+                "companyName": review.company_id,
+                "transcript": review.transcript,
                 "feedbackAnalysis": {
-                    "overallSentiment": meta_data["feedbackAnalysis"]["overallSentiment"],
-                    "tonePrimary": meta_data["feedbackAnalysis"]["tonePrimary"],
-                    "positiveIndicators": meta_data["feedbackAnalysis"]["positiveIndicators"],
-                    "negativeIndicators": meta_data["feedbackAnalysis"]["negativeIndicators"],
-                    "complaintsDetected": str(meta_data["feedbackAnalysis"]["complaintsDetected"]).lower(),
-                    "recommendations": meta_data["feedbackAnalysis"]["recommendations"],
-                    "retentionRisk": meta_data["feedbackAnalysis"]["retentionRisk"]
+                    "overallSentiment": analysis.overall_sentiment,
+                    "tonePrimary": analysis.tone_primary,
+                    "positiveIndicators": list(analysis.positive_indicators),
+                    "negativeIndicators": list(analysis.negative_indicators),
+                    "complaintsDetected": str(analysis.complaints_detected).lower(),
+                    "recommendations": list(analysis.recommendations),
+                    "retentionRisk": analysis.retention_risk
                 }
             }
             audio_feedback_data.append(formatted_audio)
@@ -84,19 +94,14 @@ def process_filtered_data():
         "audio_feedback_data": audio_feedback_data
     }
     
-    # Save structured data with timestamp
-    structured_data_file = os.path.join(folders['data'], f"processed_feedback_{timestamp}.json")
-    with open(structured_data_file, "w") as f:
-        json.dump(structured_data, f, indent=2)
-    logger.info(f"Saved processed feedback to {structured_data_file}")
-    
-    # Save to output_data for compatibility
-    os.makedirs("output_data", exist_ok=True)
-    with open("output_data/processed_feedback.json", "w") as f:
-        json.dump(structured_data, f, indent=2)
-    logger.info("Saved processed feedback to output_data/processed_feedback.json for compatibility")
+    # Keep structured data according to the artifact policy
+    structured_data_file = save_artifact("processed_feedback", structured_data, os.getenv('COMPANY_ID'), timestamp)
+    if structured_data_file:
+        logger.info(f"Queued processed feedback for {structured_data_file}")
     
     logger.info(f"Processed {len(survey_data)} survey items and {len(audio_feedback_data)} audio feedback items")
+    if skipped:
+        logger.warning(f"Skipped {skipped} malformed feedback items")
     return structured_data
 
 def generate_report_data():
@@ -135,9 +140,9 @@ def generate_report_data():
     # Calculate audio metrics
     audio_data = structured_data["audio_feedback_data"]
     sentiment_counts = {"Positive": 0, "Neutral": 0, "Negative": 0}
-    positive_themes = set()
-    negative_themes = set()
-    recommendations = []
+    positive_themes = ThemeCounter()
+    negative_themes = ThemeCounter()
+    recommendations = ThemeCounter()
     transcripts = []
     
     for item in audio_data:
@@ -146,7 +151,7 @@ def generate_report_data():
         
         positive_themes.update(item["feedbackAnalysis"]["positiveIndicators"])
         negative_themes.update(item["feedbackAnalysis"]["negativeIndicators"])
-        recommendations.extend(item["feedbackAnalysis"]["recommendations"])
+        recommendations.update(item["feedbackAnalysis"]["recommendations"])
         
         if item["transcript"]:
             transcripts.append(f"Customer mentioned: {item['transcript'][:50]}...")
@@ -157,9 +162,9 @@ def generate_report_data():
     audio_metrics = {
         "total_feedback": total_audio,
         "sentiment_distribution": sentiment_counts,
-        "positive_themes": list(positive_themes)[:5],
-        "negative_themes": list(negative_themes)[:5],
-        "recommendations": recommendations[:3],
+        "positive_themes": [theme for theme, _ in positive_themes.top(5)],
+        "negative_themes": [theme for theme, _ in negative_themes.top(5)],
+        "recommendations": [recommendation for recommendation, _ in recommendations.top(3)],
         "sample_transcripts": transcripts[:3]
     }
     
@@ -182,14 +187,15 @@ def generate_report_data():
         "overall_stats": overall_stats
     }
     
-    # Save report data with timestamp
-    report_data_file = os.path.join(folders['data'], f"analytics_summary_{timestamp}.json")
-    with open(report_data_file, "w") as f:
-        json.dump(report_data, f, indent=2)
-    logger.info(f"Saved analytics summary to {report_data_file}")
+    # Keep report data according to the artifact policy
+    report_data_file = save_artifact("analytics_summary", report_data, os.getenv('COMPANY_ID'), timestamp)
+    if report_data_file:
+        logger.info(f"Queued analytics summary for {report_data_file}")
     
     logger.info("Report data generation completed")
     return report_data
 
 if __name__ == "__main__":
-    process_filtered_data()
\ No newline at end of file
+    os.environ.setdefault('ARTIFACT_POLICY', 'full')
+    process_filtered_data()
+    flush_artifacts()
\ No newline at end of file
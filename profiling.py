@@ -0,0 +1,159 @@
+import cProfile
+import os
+import sys
+import threading
+import tracemalloc
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger('InstaReview')
+
+RUN_ID = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+_settings = {"enabled": False, "every": 1}
+_sampled = {}
+_active = {"name": None}   # company/stage currently being profiled
+_lock = threading.Lock()
+
+def add_profile_arguments(parser):
+    """Add --profile/--profile-every options to an argparse parser"""
+    parser.add_argument("--profile", action="store_true",
+                        help="Capture cProfile, sampled stacks and tracemalloc snapshots under logs/profiles/")
+    parser.add_argument("--profile-every", type=int, default=int(os.getenv('PROFILE_SAMPLE_EVERY', '1')),
+                        metavar="N", help="Profile one in every N companies (default: every company)")
+
+def configure_profiling(enabled, every=1):
+    _settings["enabled"] = bool(enabled)
+    _settings["every"] = max(1, int(every or 1))
+    if enabled:
+        logger.info(f"Profiling enabled for 1 in {_settings['every']} companies, output in {_profile_dir()}")
+
+def _profile_dir():
+    return os.path.join(os.getenv('PROFILE_DIR', os.path.join('logs', 'profiles')), RUN_ID)
+
+def is_profiled(company_id):
+    """Whether this company is in the profiled sample (1 in N, in processing order)"""
+    if not _settings["enabled"]:
+        return False
+    with _lock:
+        if company_id not in _sampled:
+            _sampled[company_id] = len(_sampled) % _settings["every"] == 0
+        return _sampled[company_id]
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+def _safe_name(value):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in str(value))
+
+def _write_memory_report(path, before, after, limit=25):
+    stats = after.compare_to(before, "lineno")
+    with open(path, "w") as f:
+        current, peak = tracemalloc.get_traced_memory()
+        f.write(f"traced current={current / 1024:.1f} KiB peak={peak / 1024:.1f} KiB\n")
+        for stat in stats[:limit]:
+            f.write(f"{stat}\n")
+
+def _claim_profiler(name):
+    """Take the process-wide profiler slot; returns the holder's name if it is already taken"""
+    with _lock:
+        if _active["name"] is not None:
+            return _active["name"]
+        _active["name"] = name
+        return None
+
+def _release_profiler():
+    with _lock:
+        _active["name"] = None
+
+@contextmanager
+def profile_stage(stage, company_id=None, trace_memory=False):
+    """Profile one stage of a sampled company.
+
+    Writes <company>_<stage>.prof (cProfile), <company>_<stage>.collapsed
+    (flamegraph.pl / speedscope compatible) and, with trace_memory, a
+    tracemalloc diff <company>_<stage>_memory.txt under logs/profiles/<run>/.
+
+    Only one stage is profiled at a time per process: a stage that starts
+    while another is profiled (nested, or another task's stage during an
+    await) runs unprofiled and counts towards the active profile instead.
+    """
+    company_id = company_id or os.getenv('COMPANY_ID', 'unknown')
+    if not is_profiled(company_id):
+        yield
+        return
+
+    holder = _claim_profiler(f"{company_id}/{stage}")
+    if holder is not None:
+        logger.debug(f"Not profiling {company_id}/{stage} separately, {holder} is being profiled")
+        yield
+        return
+
+    base = os.path.join(_profile_dir(), f"{_safe_name(company_id)}_{stage}")
+    started_tracing = False
+    snapshot_before = None
+    sampler = None
+    profiler = None
+    try:
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(int(os.getenv('PROFILE_TRACEMALLOC_FRAMES', '1')))
+                started_tracing = True
+            snapshot_before = tracemalloc.take_snapshot()
+
+        sampler = _StackSampler(threading.get_ident(), float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000)
+        sampler.start()
+        try:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        except ValueError as e:
+            # Another profiler (e.g. python -m cProfile) already owns the interpreter hook
+            logger.warning(f"cProfile unavailable for {company_id}/{stage}, keeping sampled stacks only: {e}")
+            profiler = None
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if sampler is not None:
+            sampler.stop()
+        try:
+            os.makedirs(_profile_dir(), exist_ok=True)
+            if profiler is not None:
+                profiler.dump_stats(f"{base}.prof")
+            if sampler is not None:
+                with open(f"{base}.collapsed", "w") as f:
+                    for stack, count in sampler.counts.most_common():
+                        f.write(f"{stack} {count}\n")
+            if snapshot_before is not None:
+                _write_memory_report(f"{base}_memory.txt", snapshot_before, tracemalloc.take_snapshot())
+            logger.info(f"Saved {stage} profile for {company_id} to {base}.*")
+        except OSError as e:
+            logger.warning(f"Could not write profile for {company_id}/{stage}: {e}")
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            _release_profiler()
@@ -0,0 +1,102 @@
+import heapq
+import math
+import logging
+from themes import normalize_phrase
+
+logger = logging.getLogger('InstaReview')
+
+QUOTE_PREFIX = "Customer mentioned: "
+GENERIC_INDICATORS = frozenset(('neutral', 'okay', 'uh'))
+MIN_INDICATOR_LENGTH = 4
+
+# Score weights: how often the phrase came up, how strongly the review leaned
+# the same way as the phrase, and how informative (long) the phrase is
+FREQUENCY_WEIGHT = 0.45
+SENTIMENT_WEIGHT = 0.35
+LENGTH_WEIGHT = 0.20
+FULL_LENGTH_WORDS = 8
+
+# Strength of an indicator given the review's overall sentiment
+_STRENGTH = {
+    (True, "Positive"): 1.0, (True, "Neutral"): 0.5, (True, "Negative"): 0.25,
+    (False, "Negative"): 1.0, (False, "Neutral"): 0.5, (False, "Positive"): 0.25,
+}
+
+class QuoteSelector:
+    """Pick the best N customer quotes from feedback indicators in linear time.
+
+    Candidates are deduplicated through a dict keyed by the normalized phrase,
+    so every indicator costs O(1). select() scores the distinct candidates and
+    keeps the best N with a bounded heap (O(M log N) for M candidates).
+    """
+
+    def __init__(self, limit=3):
+        self.limit = limit
+        self.candidates = {}    # key -> [count, best strength, text]
+        self.seen = 0
+
+    def add(self, indicator, sentiment, positive=True):
+        """Record one indicator from a review with the given overall sentiment"""
+        self.seen += 1
+        text = " ".join(str(indicator).split()) if indicator else ""
+        if len(text) < MIN_INDICATOR_LENGTH or text.lower() in GENERIC_INDICATORS:
+            return
+        key = normalize_phrase(text)
+        strength = _STRENGTH.get((positive, sentiment), 0.5)
+        candidate = self.candidates.get(key)
+        if candidate is None:
+            self.candidates[key] = [1, strength, text]
+        else:
+            candidate[0] += 1
+            if strength > candidate[1]:
+                candidate[1] = strength
+
+    def add_analysis(self, analysis):
+        """Record every indicator of a FeedbackAnalysis"""
+        for indicator in analysis.positive_indicators:
+            self.add(indicator, analysis.overall_sentiment, True)
+        for indicator in analysis.negative_indicators:
+            self.add(indicator, analysis.overall_sentiment, False)
+
+    def _score(self, candidate, max_log_count):
+        count, strength, text = candidate
+        frequency = math.log1p(count) / max_log_count if max_log_count else 0.0
+        length = min(len(text.split()), FULL_LENGTH_WORDS) / FULL_LENGTH_WORDS
+        return FREQUENCY_WEIGHT * frequency + SENTIMENT_WEIGHT * strength + LENGTH_WEIGHT * length
+
+    def select(self, limit=None):
+        """The best quotes as 'Customer mentioned: ...' strings, best first; ties by text"""
+        limit = self.limit if limit is None else limit
+        if not self.candidates or limit <= 0:
+            return []
+        max_log_count = math.log1p(max(candidate[0] for candidate in self.candidates.values()))
+        heap = []
+        for candidate in self.candidates.values():
+            # Min-heap of the best `limit`; the text tiebreak keeps selection deterministic
+            entry = (round(self._score(candidate, max_log_count), 6), _Reversed(candidate[2]))
+            if len(heap) < limit:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+        ranked = sorted(heap, reverse=True)
+        return [f"{QUOTE_PREFIX}{entry[1].text}" for entry in ranked]
+
+class _Reversed:
+    """Heap tiebreak that ranks alphabetically earlier text higher"""
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __lt__(self, other):
+        return self.text > other.text
+
+    def __eq__(self, other):
+        return self.text == other.text
+
+def select_quotes(analyses, limit=3):
+    """Best `limit` quotes across an iterable of FeedbackAnalysis records"""
+    selector = QuoteSelector(limit)
+    for analysis in analyses:
+        selector.add_analysis(analysis)
+    return selector.select()
@@ -0,0 +1,284 @@
+import argparse
+import asyncio
+import os
+import re
+import threading
+import time
+import logging
+from urllib.parse import urljoin
+from http_cache import cached_get
+from instrumentation import span
+
+logger = logging.getLogger('InstaReview')
+
+PDF_OPTIONS = {
+    "format": "A4",
+    "print_background": True,
+    "display_header_footer": True,
+    "margin": {"top": "25mm", "bottom": "22mm", "left": "15mm", "right": "15mm"},
+}
+
+_LINK_RE = re.compile(r'<link\s+href="(https?://[^"]+\.css)"\s+rel="stylesheet"\s*/?>')
+_IMPORT_RE = re.compile(r"@import\s+url\(['\"]?(https?://[^'\")]+)['\"]?\);?")
+_URL_RE = re.compile(r"url\((['\"]?)(?!data:|https?:|#)([^'\")]+)\1\)")
+
+_stylesheets = {}
+_stylesheets_lock = threading.Lock()
+
+def _fetch_stylesheet(url):
+    """Download a stylesheet once per process with relative url() references made absolute"""
+    with _stylesheets_lock:
+        if url in _stylesheets:
+            return _stylesheets[url]
+    try:
+        response = cached_get(url, ttl=int(os.getenv('RENDER_ASSET_TTL', '86400')), cache=True)
+        if response.status_code != 200:
+            raise ValueError(f"status {response.status_code}")
+        css = response.content.decode('utf-8')
+        css = _URL_RE.sub(lambda m: f"url({m.group(1)}{urljoin(url, m.group(2))}{m.group(1)})", css)
+    except Exception as e:
+        logger.warning(f"Could not inline stylesheet {url}: {e}")
+        css = None
+    with _stylesheets_lock:
+        _stylesheets[url] = css
+    return css
+
+def inline_stylesheets(html):
+    """Replace CDN <link> stylesheets and @import rules with their contents.
+
+    Pages then only wait for the fonts the stylesheets reference, which one
+    browser context serves from its cache after the first report.
+    """
+    def replace_link(match):
+        css = _fetch_stylesheet(match.group(1))
+        return f"<style>{css}</style>" if css is not None else match.group(0)
+
+    def replace_import(match):
+        css = _fetch_stylesheet(match.group(1))
+        return css if css is not None else match.group(0)
+
+    return _IMPORT_RE.sub(replace_import, _LINK_RE.sub(replace_link, html))
+
+def _process_tree_rss_mb(root_pid):
+    """Resident memory of all descendants of root_pid (the Playwright driver and Chromium), Linux only"""
+    children = {}
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    try:
+        pids = [int(name) for name in os.listdir('/proc') if name.isdigit()]
+    except OSError:
+        return 0.0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                # The command name may contain spaces; fields after it are fixed
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            children.setdefault(ppid, []).append(pid)
+        except (OSError, ValueError, IndexError):
+            continue
+
+    total_pages = 0
+    pending = list(children.get(root_pid, []))
+    while pending:
+        pid = pending.pop()
+        pending.extend(children.get(pid, []))
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                total_pages += int(f.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    return round(total_pages * page_size / (1024 * 1024), 1)
+
+def default_concurrency():
+    """RENDER_CONCURRENCY as an int, or None for 'auto'"""
+    value = os.getenv('RENDER_CONCURRENCY', 'auto').strip().lower()
+    if value == 'auto':
+        return None
+    return max(1, int(value))
+
+class RenderScheduler:
+    """Prints many reports concurrently from K pages of one Chromium browser context.
+
+    With concurrency=None (RENDER_CONCURRENCY=auto) the page count starts at
+    one and is hill-climbed towards the level with the best reports/s. When the
+    browser's resident memory exceeds RENDER_MAX_BROWSER_RSS_MB, new renders
+    wait, the idle pages are recycled and the concurrency is lowered.
+    """
+
+    def __init__(self, concurrency=None, max_browser_rss_mb=None):
+        self.autotune = concurrency is None
+        self.concurrency = concurrency or 1
+        self.max_concurrency = int(os.getenv('RENDER_MAX_CONCURRENCY', str(max(2, (os.cpu_count() or 1) * 2))))
+        self.max_browser_rss_mb = float(max_browser_rss_mb or os.getenv('RENDER_MAX_BROWSER_RSS_MB', '2048'))
+        self.rendered = 0
+        self.failed = 0
+        self.peak_rss_mb = 0.0
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._idle = []
+        self._in_flight = 0
+        self._draining = False
+        self._cond = None
+        self._launch_lock = None
+        self._started_at = None
+        self._window_start = None
+        self._window_count = 0
+        self._last_throughput = 0.0
+
+    async def start(self):
+        """Prepare the scheduler; Chromium is launched on the first render"""
+        self._cond = asyncio.Condition()
+        self._launch_lock = asyncio.Lock()
+        return self
+
+    async def _ensure_browser(self):
+        async with self._launch_lock:
+            if self._context is not None:
+                return
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch()
+            self._context = await self._browser.new_context()
+            self._started_at = self._window_start = time.perf_counter()
+            logger.info(f"Render scheduler started with {self.concurrency} page(s)"
+                        f"{' (auto-tuning)' if self.autotune else ''}")
+
+    async def close(self):
+        for page in self._idle:
+            await page.close()
+        self._idle = []
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+        if self.rendered:
+            logger.info(f"Rendered {self.rendered} reports at {self.throughput():.2f} reports/s "
+                        f"with {self.concurrency} page(s), peak browser RSS {self.peak_rss_mb} MB")
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def throughput(self):
+        """Reports per second for this browser since start"""
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0
+        return self.rendered / elapsed if elapsed else 0.0
+
+    async def _acquire_page(self):
+        await self._ensure_browser()
+        async with self._cond:
+            await self._cond.wait_for(lambda: not self._draining and self._in_flight < self.concurrency)
+            self._in_flight += 1
+            page = self._idle.pop() if self._idle else None
+        if page is None:
+            try:
+                page = await self._context.new_page()
+            except Exception:
+                async with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+                raise
+        return page
+
+    async def _release_page(self, page):
+        async with self._cond:
+            self._in_flight -= 1
+            keep = len(self._idle) + self._in_flight < self.concurrency
+            if keep:
+                self._idle.append(page)
+            self._cond.notify_all()
+        if not keep:
+            await page.close()
+        await self._apply_backpressure()
+        self._tune()
+
+    async def _apply_backpressure(self):
+        rss = _process_tree_rss_mb(os.getpid())
+        self.peak_rss_mb = max(self.peak_rss_mb, rss)
+        if rss <= self.max_browser_rss_mb or self._draining:
+            return
+        logger.warning(f"Browser RSS {rss} MB over {self.max_browser_rss_mb} MB, draining and recycling pages")
+        async with self._cond:
+            self._draining = True
+            await self._cond.wait_for(lambda: self._in_flight == 0)
+            idle, self._idle = self._idle, []
+        try:
+            for page in idle:
+                await page.close()
+        finally:
+            async with self._cond:
+                self.concurrency = max(1, self.concurrency - 1)
+                self.autotune = False
+                self._draining = False
+                self._cond.notify_all()
+        logger.info(f"Render concurrency lowered to {self.concurrency} after recycling pages")
+
+    def _tune(self):
+        """Hill-climb the page count on reports/s measured over windows of completed renders"""
+        if not self.autotune:
+            return
+        self._window_count += 1
+        if self._window_count < max(4, self.concurrency * 2):
+            return
+        now = time.perf_counter()
+        throughput = self._window_count / (now - self._window_start)
+        self._window_start, self._window_count = now, 0
+
+        if throughput >= self._last_throughput * 1.05 and self.concurrency * 2 <= self.max_concurrency:
+            self._last_throughput = throughput
+            self.concurrency *= 2
+            logger.info(f"Render concurrency -> {self.concurrency} ({throughput:.2f} reports/s)")
+            return
+        if throughput < self._last_throughput * 1.05 and self.concurrency > 1:
+            # The last doubling did not pay off: step back and stop tuning
+            self.concurrency //= 2
+        self.autotune = False
+        logger.info(f"Render concurrency settled at {self.concurrency} ({throughput:.2f} reports/s)")
+
+    async def render(self, html, header_template, footer_template, company_id=None):
+        """Print one report to PDF bytes on a pooled page"""
+        html = inline_stylesheets(html)
+        page = await self._acquire_page()
+        try:
+            with span("print", company_id) as print_span:
+                await page.set_content(html, wait_until="load")
+                # Stylesheets are inlined, but their @font-face files still download after load
+                await page.evaluate("() => document.fonts.ready.then(() => undefined)")
+                pdf_bytes = await page.pdf(header_template=header_template, footer_template=footer_template, **PDF_OPTIONS)
+                print_span.add_bytes_out(len(pdf_bytes))
+            self.rendered += 1
+            return pdf_bytes
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            await self._release_page(page)
+
+async def _benchmark(reports, levels, reviews):
+    """Render the same synthetic report at several fixed concurrency levels"""
+    from synthetic_data import generate_reviews
+    import create_pdf_report as report
+
+    data = generate_reviews(reviews, "bench-company", seed=1)
+    html, header, footer = report.build_report_html(data, "bench-company")
+    results = {}
+    for level in levels:
+        async with RenderScheduler(concurrency=level) as scheduler:
+            started = time.perf_counter()
+            await asyncio.gather(*(scheduler.render(html, header, footer, "bench-company") for _ in range(reports)))
+            results[level] = reports / (time.perf_counter() - started)
+            print(f"concurrency {level:>3}: {results[level]:6.2f} reports/s, peak browser RSS {scheduler.peak_rss_mb} MB")
+    best = max(results, key=results.get)
+    print(f"Best concurrency on {os.cpu_count()} cores: {best} (set RENDER_CONCURRENCY={best})")
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure PDF render throughput per browser at several concurrency levels")
+    parser.add_argument("--reports", type=int, default=32, help="Reports rendered per level")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Concurrency levels to try")
+    parser.add_argument("--reviews", type=int, default=200, help="Synthetic reviews in the report")
+    args = parser.parse_args()
+    logging.getLogger('InstaReview').setLevel(logging.WARNING)
+    asyncio.run(_benchmark(args.reports, args.levels, args.reviews))
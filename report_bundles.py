@@ -0,0 +1,206 @@
+import asyncio
+import html
+import os
+import time
+import logging
+import create_pdf_report as report
+from fetch_customer_data import process_customer_data
+from render_scheduler import RenderScheduler
+from native_pdf import render_native_bundle
+from instrumentation import span
+from periods import Period, get_report_period
+
+logger = logging.getLogger('InstaReview')
+
+# Company fields naming the parent account of a location, checked in order
+GROUP_FIELDS = ('parentCompanyId', 'groupId')
+GROUP_NAME_FIELDS = ('parentCompanyName', 'groupName')
+
+def bundle_mode_enabled():
+    """REPORT_BUNDLES=on renders group accounts as one combined report"""
+    return os.getenv('REPORT_BUNDLES', 'off').strip().lower() in ('on', 'true', '1')
+
+def _group_fields():
+    field = os.getenv('BUNDLE_GROUP_FIELD')
+    return (field,) if field else GROUP_FIELDS
+
+def _parent_id(company):
+    return next((company[field] for field in _group_fields() if company.get(field)), None)
+
+def group_companies(companies):
+    """Split companies into {parent_id: [locations]} and companies reported on their own.
+
+    A parent with a single location is reported on its own as before. A parent
+    record that is itself in the list is the group's contact and is bundled
+    first, so its own reviews are reported alongside its locations.
+    """
+    by_id = {company.get('id'): company for company in companies}
+    groups = {}
+    for company in companies:
+        parent_id = _parent_id(company)
+        if parent_id and parent_id != company.get('id'):
+            groups.setdefault(parent_id, []).append(company)
+
+    singles = []
+    for company in companies:
+        parent_id = _parent_id(company)
+        if parent_id and len(groups.get(parent_id, [])) > 1:
+            continue
+        if company.get('id') in groups and len(groups[company['id']]) > 1:
+            continue
+        singles.append(company)
+    bundled = {parent_id: ([by_id[parent_id]] if parent_id in by_id else []) + locations
+               for parent_id, locations in groups.items() if len(locations) > 1}
+    return bundled, singles, by_id
+
+def group_contact(parent_id, locations, by_id):
+    """Company record used for the bundle's S3 key and email: the parent if known, else the first location"""
+    parent = by_id.get(parent_id)
+    first = locations[0]
+    name = (parent or {}).get('companyName') or next(
+        (first[field] for field in GROUP_NAME_FIELDS if first.get(field)), parent_id)
+    return {
+        "id": parent_id,
+        "companyName": name,
+        "email": (parent or {}).get('email') or first.get('groupEmail') or first.get('email'),
+        "locations": len(locations),
+    }
+
+def _location_row(section):
+    client = section["client"]
+    stats = section["report"]["overall_stats"]
+    return (f"<tr><td>{html.escape(client['company_name'])}</td><td>{html.escape(str(client['company_city']))}</td>"
+            f"<td>{client['total_reviews']}</td><td>{stats['positive_percentage']}%</td>"
+            f"<td>{stats['negative_percentage']}%</td><td>{client['nps_score']}</td></tr>")
+
+def group_kpis(sections):
+    """Summary page KPIs across locations as (value, label) pairs"""
+    total_reviews = sum(s["client"]["total_reviews"] for s in sections)
+    audio_total = sum(s["report"]["audio_metrics"]["total_feedback"] for s in sections)
+    sentiment = {key: sum(s["report"]["audio_metrics"]["sentiment_distribution"].get(key, 0) for s in sections)
+                 for key in ("Positive", "Neutral", "Negative")}
+    percent = {key: round(count / audio_total * 100) if audio_total else 0 for key, count in sentiment.items()}
+    return [(total_reviews, "Total Reviews"), (len(sections), "Locations"),
+            (f"{percent['Positive']}%", "Positive"), (f"{percent['Negative']}%", "Negative")]
+
+def build_group_summary(group_name, sections):
+    """Group summary page: totals across locations and one row per location"""
+    kpis = group_kpis(sections)
+    return f"""
+    <div class="page container-fluid">
+        <h2 style="font-size: 18px; font-weight: 800; margin-bottom: 12px;">{html.escape(group_name)} – Group Summary</h2>
+        <div class="row g-3 mb-3">
+            {''.join(f'<div class="col-3"><div class="border rounded p-3 text-center h-100"><div class="kpi-value">{value}</div><div class="kpi-label">{label}</div></div></div>' for value, label in kpis)}
+        </div>
+        <div class="insight-card">
+            <div class="insight-title">Locations</div>
+            <table class="questions-table">
+                <thead><tr><th>Location</th><th>City</th><th>Reviews</th><th>Positive</th><th>Negative</th><th>NPS</th></tr></thead>
+                <tbody>{''.join(_location_row(s) for s in sections)}</tbody>
+            </table>
+        </div>
+    </div>
+"""
+
+def _body(document):
+    return document.split("<body>", 1)[1].rsplit("</body>", 1)[0]
+
+def build_bundle_html(group_name, sections):
+    """One document: the group summary followed by each location's pages under a section title"""
+    head = sections[0]["html"].split("<body>", 1)[0]
+    head = head.split("<title>", 1)[0] + f"<title>{html.escape(group_name)} Group Report - InstaReview.ai</title>" + head.split("</title>", 1)[1]
+    parts = [build_group_summary(group_name, sections)]
+    for section in sections:
+        title = (f'<h2 style="font-size: 16px; font-weight: 800; margin-bottom: 10px;">'
+                 f'{html.escape(section["client"]["company_name"])} <span style="font-size: 11px; color: #64748b;">'
+                 f'{html.escape(str(section["client"]["company_city"]))}</span></h2>')
+        body = _body(section["html"]).replace('<div class="page container-fluid">', f'<div class="page container-fluid" style="page-break-before: always;">{title}', 1)
+        parts.append(body)
+    return f"{head}<body>{''.join(parts)}</body>\n</html>\n"
+
+def build_bundle_templates(group_name, location_count, period_start, period_end):
+    """Header and footer for the combined document"""
+    header = f"""
+<div style="width: 100%; font-family: 'Inter', sans-serif; background: linear-gradient(135deg, #f8fafc 0%, #e2e8f0 100%); padding: 15px 20mm; box-sizing: border-box; border-bottom: 3px solid #3b82f6;">
+    <div style="display: flex; justify-content: space-between; align-items: center;">
+        <div>
+            <div style="font-size: 14px; font-weight: 700; color: #1e293b;">{html.escape(group_name)} Weekly Group Report</div>
+            <div style="font-size: 9px; color: #64748b;">{location_count} locations | Powered by InstaReview.ai</div>
+        </div>
+        <div style="font-size: 11px; font-weight: 600; color: #3b82f6;">Week of {period_start.strftime('%b %d')} – {period_end.strftime('%b %d, %Y')}</div>
+    </div>
+</div>
+"""
+    footer = f"""
+<div style="width: 100%; font-family: 'Inter', sans-serif; background: #1e293b; color: white; padding: 12px 20mm; box-sizing: border-box; border-top: 3px solid #3b82f6;">
+    <div style="display: flex; justify-content: space-between; align-items: center;">
+        <div style="font-size: 10px; font-weight: 500;">{html.escape(group_name)} | Weekly Group Report</div>
+        <div style="font-size: 10px; font-weight: 600;">Page <span class="pageNumber"></span> of <span class="totalPages"></span></div>
+    </div>
+</div>
+"""
+    return header, footer
+
+async def generate_bundle(contact, locations, scheduler=None, prefetched=None):
+    """Render all locations of a group as one PDF, upload it once; returns the S3 key or None.
+
+    Locations are fetched and laid out one after another, then printed in a
+    single set_content/pdf call, so Chromium, S3 and SMTP costs are paid once
+    per group instead of once per location. With PDF_BACKEND=native the
+    bundle is drawn by matplotlib instead. prefetched maps company ids to
+    reviews already fetched this run; locations with an aggregate handed over
+    with create_pdf_report.use_aggregates are not fetched at all. The bundle covers the configured report
+    week and is filed under that week's key, like the locations' own reports.
+    """
+    group_id, group_name = contact["id"], contact["companyName"]
+    native = report.get_pdf_backend() == 'native'
+    period = Period("week", *get_report_period(report.current_time))
+    sections = []
+    for location in locations:
+        company_id = location.get('id')
+        data = (prefetched or {}).pop(company_id, None)
+        if data is None and not report.has_aggregate(company_id, period):
+            data = process_customer_data(period.start, period.end, company_id)
+        if data is not None and not data:
+            logger.info(f"No data for location {company_id} of group {group_id}, leaving it out of the bundle")
+            continue
+        if native:
+            charts = report.prepare_report(data, company_id, period)
+            sections.append({"charts": charts, "client": dict(report.client_data), "report": report.report_data})
+        else:
+            document, _, _ = report.build_report_html(data, company_id, period)
+            sections.append({"html": document, "client": dict(report.client_data), "report": report.report_data})
+
+    if not sections:
+        logger.info(f"No location of group {group_id} has data, skipping bundle")
+        return None
+
+    contact["locations"] = len(sections)
+    print_started = time.perf_counter()
+    if native:
+        generated_on = sections[0]["client"]["date_generated"].strftime('%B %d, %Y')
+        with span("print", group_id) as print_span:
+            pdf_bytes = render_native_bundle(group_name, sections, group_kpis(sections), generated_on)
+            print_span.add_bytes_out(len(pdf_bytes))
+    else:
+        bundle_html = build_bundle_html(group_name, sections)
+        header, footer = build_bundle_templates(group_name, len(sections), sections[0]["client"]["report_period_start"],
+                                                sections[0]["client"]["report_period_end"])
+        if scheduler is not None:
+            pdf_bytes = await scheduler.render(bundle_html, header, footer, group_id)
+        else:
+            async with RenderScheduler(concurrency=1) as own_scheduler:
+                pdf_bytes = await own_scheduler.render(bundle_html, header, footer, group_id)
+
+    pdf_bytes = await asyncio.to_thread(report.finish_pdf, pdf_bytes, group_id)
+    if report.get_pdf_output_mode() == 'disk':
+        pdf_path = os.path.join(report.folders['reports'], f"Group_Weekly_Analytics_{group_id}_{report.timestamp}.pdf")
+        with open(pdf_path, 'wb') as f:
+            f.write(pdf_bytes)
+    else:
+        report.archive_pdf(pdf_bytes, f"Group_Weekly_Analytics_{group_id}_{report.timestamp}.pdf")
+    s3_key = report.upload_bytes_to_s3(pdf_bytes, group_id, f"{period.key_name}-group", period.key_date)
+    if s3_key:
+        logger.info(f"Group report for {group_name}: {len(sections)} locations, {len(pdf_bytes)} bytes, "
+                    f"{time.perf_counter() - print_started:.2f}s from print to upload")
+    return s3_key
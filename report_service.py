@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Resident report service: renders on-demand PDF reports from a warm process.
+
+Libraries, the logo and one Chromium browser with a page pool are loaded once.
+Requests are queued to a fixed set of workers; concurrent requests for the same
+company and period share one render, and recently rendered PDFs are served
+from an in-memory LRU cache.
+
+API (HTTP/1.1 on REPORT_SERVICE_HOST:REPORT_SERVICE_PORT, or REPORT_SERVICE_SOCKET):
+    GET /report?company_id=ID[&from=YYYY-MM-DD&to=YYYY-MM-DD]   -> application/pdf
+    GET /health                                                 -> JSON status
+
+Usage:
+    python report_service.py [--host 127.0.0.1] [--port 8086] [--socket /run/instareview.sock]
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+from dotenv import load_dotenv
+from logger import set_log_context, reset_log_context
+import create_pdf_report as report
+from fetch_customer_data import process_customer_data, fetch_company_details
+from periods import Period, week_period
+from instrumentation import span
+from render_scheduler import RenderScheduler, default_concurrency
+
+load_dotenv()
+
+import logging
+logger = logging.getLogger('InstaReview')
+
+MAX_REQUEST_HEAD_BYTES = 16384
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               500: "Internal Server Error", 503: "Service Unavailable"}
+
+class ReportError(Exception):
+    """A request that cannot produce a report; carries the HTTP status to answer with"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ReportService:
+    """Queue, coalesce and cache on-demand report renders over a shared RenderScheduler"""
+
+    def __init__(self, workers=None, cache_size=None, cache_ttl=None, max_queue=None):
+        self.workers = workers or int(os.getenv('REPORT_SERVICE_WORKERS', '0')) or None
+        self.cache_size = cache_size or int(os.getenv('REPORT_CACHE_SIZE', '32'))
+        self.cache_ttl = cache_ttl or float(os.getenv('REPORT_CACHE_TTL', '600'))
+        self.max_queue = max_queue or int(os.getenv('REPORT_SERVICE_MAX_QUEUE', '100'))
+        self.scheduler = None
+        self._queue = None
+        self._worker_tasks = []
+        self._inflight = {}          # (company_id, from, to) -> Future of PDF bytes
+        self._cache = OrderedDict()  # (company_id, from, to) -> (rendered_at, PDF bytes)
+        self._layout_lock = asyncio.Lock()  # layout writes create_pdf_report's module-level report state
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "rendered": 0, "failed": 0}
+
+    async def __aenter__(self):
+        self.scheduler = RenderScheduler(default_concurrency())
+        await self.scheduler.__aenter__()
+        self.workers = self.workers or self.scheduler.concurrency
+        self._queue = asyncio.Queue(self.max_queue)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Report service ready with {self.workers} workers")
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        await self.scheduler.__aexit__(*exc_info)
+
+    def _cached(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        rendered_at, pdf_bytes = entry
+        if time.monotonic() - rendered_at > self.cache_ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return pdf_bytes
+
+    def _store(self, key, pdf_bytes):
+        self._cache[key] = (time.monotonic(), pdf_bytes)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def get_report(self, company_id, start_date, end_date):
+        """PDF bytes for a company and period, and how they were served: cache, coalesced or rendered"""
+        self.stats["requests"] += 1
+        key = (company_id, start_date.isoformat(), end_date.isoformat())
+        pdf_bytes = self._cached(key)
+        if pdf_bytes is not None:
+            self.stats["cache_hits"] += 1
+            return pdf_bytes, "cache"
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future), "coalesced"
+
+        if self._queue.full():
+            raise ReportError(503, "Report queue is full, retry later")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self._queue.put_nowait((key, future))
+        return await asyncio.shield(future), "rendered"
+
+    async def _worker(self):
+        while True:
+            key, future = await self._queue.get()
+            try:
+                pdf_bytes = await self._render(*key)
+                self._store(key, pdf_bytes)
+                self.stats["rendered"] += 1
+                future.set_result(pdf_bytes)
+            except Exception as e:
+                self.stats["failed"] += 1
+                future.set_exception(e if isinstance(e, ReportError) else ReportError(500, str(e)))
+            finally:
+                self._inflight.pop(key, None)
+                self._queue.task_done()
+
+    async def _render(self, company_id, start, end):
+        log_token = set_log_context(company_id=company_id)
+        try:
+            period = request_period(datetime.date.fromisoformat(start), datetime.date.fromisoformat(end))
+            # Fetching, layout and post-processing block, so they run in threads while other requests print;
+            # the period is explicit, so nothing in the render reads the clock
+            data, company_details = await asyncio.to_thread(_fetch, company_id, period)
+            if not data:
+                raise ReportError(404, f"No feedback for company {company_id} from {start} to {end}")
+            native = report.get_pdf_backend() == 'native'
+            async with self._layout_lock:
+                build = report.render_native_bytes if native else report.build_report_html
+                built = await asyncio.to_thread(build, data, company_id, period, company_details)
+            pdf_bytes = built if native else await self.scheduler.render(*built, company_id)
+            pdf_bytes = await asyncio.to_thread(report.finish_pdf, pdf_bytes, company_id)
+            logger.info(f"Rendered on-demand report for {start} to {end}: {len(pdf_bytes)} bytes")
+            return pdf_bytes
+        finally:
+            reset_log_context(log_token)
+
+    def health(self):
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "in_flight": len(self._inflight),
+            "cached": len(self._cache),
+            "render_concurrency": self.scheduler.concurrency if self.scheduler else None,
+            **self.stats,
+        }
+
+def request_period(start, end):
+    """The requested dates as a Period: a Monday-to-Sunday range is a week, anything else custom"""
+    period = week_period(start)
+    return period if (period.start, period.end) == (start, end) else Period("custom", start, end)
+
+def _fetch(company_id, period):
+    """Reviews and company details for one request, with the company and period passed explicitly"""
+    with span("fetch", company_id):
+        data = process_customer_data(period.start, period.end, company_id)
+        if not data:
+            return data, None
+        return data, fetch_company_details(company_id) or {}
+
+def _parse_period(query):
+    from_date, to_date = query.get('from', [None])[0], query.get('to', [None])[0]
+    if bool(from_date) != bool(to_date):
+        raise ReportError(400, "Pass both from and to, or neither for the current week")
+    try:
+        if from_date:
+            start, end = datetime.date.fromisoformat(from_date[:10]), datetime.date.fromisoformat(to_date[:10])
+        else:
+            today = datetime.date.today()
+            start = today - datetime.timedelta(days=today.weekday())
+            end = start + datetime.timedelta(days=6)
+    except ValueError:
+        raise ReportError(400, "from and to must be YYYY-MM-DD dates")
+    if end < start:
+        raise ReportError(400, "to is before from")
+    return start, end
+
+def _response(status, body, content_type="application/json", headers=None):
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body).encode('utf-8')
+    head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}", "Connection: close"]
+    head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    return ("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + body
+
+async def _handle(service, reader, writer):
+    try:
+        try:
+            request_head = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            return
+        method, target = request_head.split(b"\r\n", 1)[0].decode('latin-1').split(" ")[:2]
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        try:
+            if method != "GET":
+                raise ReportError(405, "Only GET is supported")
+            if url.path == "/health":
+                response = _response(200, service.health())
+            elif url.path == "/report":
+                company_id = query.get('company_id', [None])[0]
+                if not company_id:
+                    raise ReportError(400, "company_id is required")
+                start, end = _parse_period(query)
+                pdf_bytes, source = await service.get_report(company_id, start, end)
+                filename = f"Company_Analytics_{company_id}_{start.isoformat()}_{end.isoformat()}.pdf"
+                response = _response(200, pdf_bytes, "application/pdf", {
+                    "Content-Disposition": f'inline; filename="{filename}"', "X-Report-Source": source})
+            else:
+                raise ReportError(404, f"Unknown path {url.path}")
+        except ReportError as e:
+            response = _response(e.status, {"error": str(e)})
+        except Exception as e:
+            logger.error(f"Report service request failed: {e}")
+            response = _response(500, {"error": str(e)})
+        writer.write(response)
+        await writer.drain()
+    except ValueError:
+        writer.write(_response(400, {"error": "Malformed request"}))
+    finally:
+        writer.close()
+
+async def serve(host=None, port=None, socket_path=None):
+    async with ReportService() as service:
+        handler = lambda reader, writer: _handle(service, reader, writer)
+        if socket_path:
+            server = await asyncio.start_unix_server(handler, path=socket_path, limit=MAX_REQUEST_HEAD_BYTES)
+            logger.info(f"Report service listening on {socket_path}")
+        else:
+            server = await asyncio.start_server(handler, host, port, limit=MAX_REQUEST_HEAD_BYTES)
+            logger.info(f"Report service listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve on-demand InstaReview reports from a warm process")
+    parser.add_argument("--host", default=os.getenv('REPORT_SERVICE_HOST', '127.0.0.1'))
+    parser.add_argument("--port", type=int, default=int(os.getenv('REPORT_SERVICE_PORT', '8086')))
+    parser.add_argument("--socket", default=os.getenv('REPORT_SERVICE_SOCKET'), help="Listen on this Unix socket instead")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        logger.info("Report service stopped")
+
+if __name__ == "__main__":
+    main()
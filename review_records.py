@@ -0,0 +1,140 @@
+import logging
+from dataclasses import dataclass
+import codec
+
+logger = logging.getLogger('InstaReview')
+
+SENTIMENTS = ("Positive", "Neutral", "Negative")
+MAX_LOGGED_SKIPS = 10
+
+class ReviewDecodeError(ValueError):
+    """Raised when a review item does not match the expected schema"""
+
+@dataclass
+class SurveyAnswer:
+    __slots__ = ('question', 'answer', 'question_id')
+    question: str
+    answer: float
+    question_id: str
+
+@dataclass
+class FeedbackAnalysis:
+    __slots__ = ('overall_sentiment', 'tone_primary', 'positive_indicators', 'negative_indicators',
+                 'complaints_detected', 'recommendations', 'retention_risk')
+    overall_sentiment: str
+    tone_primary: str
+    positive_indicators: tuple
+    negative_indicators: tuple
+    complaints_detected: bool
+    recommendations: tuple
+    retention_risk: str
+
+@dataclass
+class Review:
+    __slots__ = ('company_id', 'user_email', 'audio_id', 'detected_language', 'audio_duration_sec',
+                 'transcript', 'answers', 'analysis')
+    company_id: str
+    user_email: str
+    audio_id: str
+    detected_language: str
+    audio_duration_sec: float
+    transcript: str
+    answers: tuple
+    analysis: FeedbackAnalysis
+
+def _text_tuple(value, field):
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    if not isinstance(value, list):
+        raise ReviewDecodeError(f"{field} must be a list")
+    return tuple(str(v) for v in value if v)
+
+def _decode_answer(raw):
+    if not isinstance(raw, dict):
+        raise ReviewDecodeError("survey answer must be an object")
+    question = raw.get("question")
+    if not isinstance(question, str) or not question:
+        raise ReviewDecodeError("survey answer is missing its question")
+    try:
+        answer = float(raw.get("answer"))
+    except (TypeError, ValueError):
+        raise ReviewDecodeError(f"survey answer for '{question}' is not numeric")
+    return SurveyAnswer(question, answer, str(raw.get("questionId", "")))
+
+def _decode_analysis(raw):
+    if not isinstance(raw, dict):
+        raise ReviewDecodeError("feedbackAnalysis must be an object")
+    sentiment = str(raw.get("overallSentiment", "")).strip().capitalize()
+    if sentiment not in SENTIMENTS:
+        raise ReviewDecodeError(f"unknown overallSentiment '{raw.get('overallSentiment')}'")
+    complaints = raw.get("complaintsDetected", False)
+    if isinstance(complaints, str):
+        complaints = complaints.strip().lower() == "true"
+    return FeedbackAnalysis(
+        sentiment,
+        str(raw.get("tonePrimary", "")),
+        _text_tuple(raw.get("positiveIndicators"), "positiveIndicators"),
+        _text_tuple(raw.get("negativeIndicators"), "negativeIndicators"),
+        bool(complaints),
+        _text_tuple(raw.get("recommendations"), "recommendations"),
+        str(raw.get("retentionRisk", "")),
+    )
+
+def decode_review(item):
+    """Decode one API review item into a Review, raising ReviewDecodeError if malformed"""
+    if not isinstance(item, dict):
+        raise ReviewDecodeError("review must be an object")
+    answers = tuple(_decode_answer(raw) for raw in (item.get("quess") or ()))
+
+    meta_data = item.get("metaData")
+    if isinstance(meta_data, (str, bytes)):
+        try:
+            meta_data = codec.loads(meta_data)
+        except Exception:
+            raise ReviewDecodeError("metaData is not valid JSON")
+    if meta_data and not isinstance(meta_data, dict):
+        raise ReviewDecodeError("metaData must be an object")
+    meta_data = meta_data or {}
+
+    analysis = None
+    if meta_data:
+        if "feedbackAnalysis" not in meta_data:
+            raise ReviewDecodeError("metaData is missing feedbackAnalysis")
+        analysis = _decode_analysis(meta_data["feedbackAnalysis"])
+
+    duration = meta_data.get("audioDurationSec")
+    try:
+        duration = float(duration) if duration is not None else None
+    except (TypeError, ValueError):
+        raise ReviewDecodeError("audioDurationSec is not numeric")
+
+    return Review(
+        str(item.get("companyId") or ""),
+        str(item.get("userEmail") or ""),
+        str(meta_data.get("audioId", "")),
+        str(meta_data.get("detectedLanguage", "")),
+        duration,
+        meta_data.get("transcript") or item.get("transcribe") or "",
+        answers,
+        analysis,
+    )
+
+def decode_reviews(items):
+    """Decode review items in one validating pass.
+
+    Malformed items are counted and skipped. Returns (reviews, skipped_count).
+    """
+    reviews = []
+    skipped = 0
+    for index, item in enumerate(items or ()):
+        try:
+            reviews.append(decode_review(item))
+        except ReviewDecodeError as e:
+            skipped += 1
+            if skipped <= MAX_LOGGED_SKIPS:
+                logger.warning(f"Skipping malformed review #{index}: {e}")
+    if skipped:
+        logger.warning(f"Skipped {skipped} of {skipped + len(reviews)} malformed review items")
+    return reviews, skipped
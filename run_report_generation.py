@@ -3,7 +3,9 @@ import os
 from dotenv import load_dotenv
 from fetch_companies_dynamodb import get_all_companies
 from fetch_customer_data import process_customer_data
-from create_pdf_report import generate_pdf
+from create_pdf_report import generate_report, get_report_format
+from render_scheduler import RenderScheduler, default_concurrency
+from logger import set_log_context
 
 # Load environment variables
 load_dotenv()
@@ -22,36 +24,42 @@ async def main():
     
     success_count = 0
     
-    # Step 2: Process each company
-    for i, company in enumerate(companies, 1):
-        company_id = company.get('id')
-        company_name = company.get('companyName', 'Unknown')
+    # One browser is shared by all reports
+    async with RenderScheduler(default_concurrency()) as scheduler:
+        # Step 2: Process each company
+        for i, company in enumerate(companies, 1):
+            company_id = company.get('id')
+            company_name = company.get('companyName', 'Unknown')
         
-        if not company_id:
-            print(f"Skipping company with no ID: {company_name}")
-            continue
+            if not company_id:
+                print(f"Skipping company with no ID: {company_name}")
+                continue
         
-        print(f"Processing {i}/{len(companies)}: {company_name} ({company_id})")
+            print(f"Processing {i}/{len(companies)}: {company_name} ({company_id})")
         
-        # Step 3: Set company ID and process data
-        os.environ['COMPANY_ID'] = company_id
+            # Step 3: Set company ID and process data
+            os.environ['COMPANY_ID'] = company_id
+            set_log_context(company_id=company_id)
         
-        try:
-            # Check if data is available
-            filtered_data = process_customer_data()
+            try:
+                # Check if data is available
+                filtered_data = process_customer_data()
             
-            if not filtered_data:
-                print(f"⚠ No data available for {company_name} - skipping")
-                continue
+                if not filtered_data:
+                    print(f"⚠ No data available for {company_name} - skipping")
+                    continue
             
-            # Step 4: Create PDF report
-            pdf_path = await generate_pdf()
-            success_count += 1
+                # Step 4: Create PDF report
+                pdf_path, s3_keys = await generate_report(filtered_data, company_id, scheduler, get_report_format(company))
+                if not s3_keys:
+                    print(f"✗ Report for {company_name} was not uploaded")
+                    continue
+                success_count += 1
             
-            print(f"✓ Report generated and uploaded for {company_name}")
+                print(f"✓ Report generated and uploaded for {company_name}")
             
-        except Exception as e:
-            print(f"✗ Error processing {company_name}: {e}")
+            except Exception as e:
+                print(f"✗ Error processing {company_name}: {e}")
     
     print(f"\nCompleted: {success_count}/{len(companies)} reports generated successfully")
 
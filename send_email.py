@@ -1,11 +1,14 @@
 import boto3
 import os
 import smtplib
+import time
 from datetime import datetime
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from dotenv import load_dotenv
 from logger import setup_logger
+from instrumentation import span
+from metrics_exporter import EMAILS
 
 # Load environment variables
 load_dotenv()
@@ -33,19 +36,41 @@ def generate_presigned_url(s3_key, expiration=604800):  # 7 days
         logger.error(f"Failed to generate presigned URL: {e}")
         return None
 
-def send_report_email(company_data, pdf_s3_key, recipient_email):
-    """Send weekly report email using SMTP"""
+def open_smtp_connection():
+    """Connect and log in to SMTP_HOST (SMTP_USE_SSL=false for plain SMTP, e.g. a local sink)"""
+    smtp_class = smtplib.SMTP_SSL if os.getenv('SMTP_USE_SSL', 'true').lower() != 'false' else smtplib.SMTP
+    server = smtp_class(os.getenv('SMTP_HOST'), int(os.getenv('SMTP_PORT')))
+    server.login(os.getenv('SMTP_USERNAME'), os.getenv('SMTP_PASSWORD'))
+    return server
+
+def send_report_email(company_data, pdf_s3_key, recipient_email, smtp_server=None):
+    """Send weekly report email using SMTP, over smtp_server when given or a new connection"""
     try:
-        # Generate presigned URL
-        report_url = generate_presigned_url(pdf_s3_key)
-        if not report_url:
+        # A plain key is a PDF; a dict maps delivered formats (pdf/html) to their keys
+        s3_keys = pdf_s3_key if isinstance(pdf_s3_key, dict) else {"pdf": pdf_s3_key}
+        
+        # Generate presigned URLs
+        report_url = generate_presigned_url(s3_keys["pdf"]) if s3_keys.get("pdf") else None
+        web_url = generate_presigned_url(s3_keys["html"]) if s3_keys.get("html") else None
+        if not report_url and not web_url:
             logger.error("Failed to generate presigned URL for report")
             return False
         
+        cta_links = []
+        text_links = []
+        if web_url:
+            cta_links.append(f'<a href="{web_url}" class="cta-button" style="color: white !important;">🌐 View Your Report Online</a>')
+            text_links.append(f"👉 View your report online: {web_url}")
+        if report_url:
+            cta_links.append(f'<a href="{report_url}" class="cta-button" style="color: white !important;">📥 Download Your Report</a>')
+            text_links.append(f"👉 Download your report here: {report_url}")
+        
         company_name = company_data.get('companyName', 'Your Company')
         
         # Email content
         subject = f"Your Weekly InstaReview Report is Ready - {company_name}"
+        if company_data.get('locations'):
+            subject = f"Your Weekly InstaReview Group Report is Ready - {company_name} ({company_data['locations']} locations)"
         
         html_body = f"""
 <!DOCTYPE html>
@@ -121,7 +146,7 @@ def send_report_email(company_data, pdf_s3_key, recipient_email):
             </div>
             
             <div class="cta-section">
-                <a href="{report_url}" class="cta-button" style="color: white !important;">📥 Download Your Report</a>
+                {'&nbsp;'.join(cta_links)}
             </div>
             
             <div class="portal-link">
@@ -162,7 +187,7 @@ Your weekly consolidated InstaReview report is now available. This report highli
 • Customer sentiment trends analysis
 • Detailed analytics and visual charts
 
-👉 Download your report here: {report_url}
+{chr(10).join(text_links)}
 
 💻 Access your dashboard anytime at: https://app.instareview.ai/
 
@@ -181,11 +206,13 @@ The InstaReview Team
         msg.attach(MIMEText(text_body, 'plain'))
         msg.attach(MIMEText(html_body, 'html'))
         
-        # Send email via SMTP
-        server = smtplib.SMTP_SSL(os.getenv('SMTP_HOST'), int(os.getenv('SMTP_PORT')))
-        server.login(os.getenv('SMTP_USERNAME'), os.getenv('SMTP_PASSWORD'))
-        server.send_message(msg)
-        server.quit()
+        # Send email via SMTP, reusing the caller's session when there is one
+        with span("email", company_data.get('id')) as email_span:
+            server = smtp_server or open_smtp_connection()
+            server.send_message(msg)
+            if smtp_server is None:
+                server.quit()
+            email_span.add_bytes_out(len(msg.as_bytes()))
         
         logger.info(f"Email sent successfully to {recipient_email}")
         return True
@@ -194,48 +221,30 @@ The InstaReview Team
         logger.error(f"Failed to send email to {recipient_email}: {e}")
         return False
 
-def send_reports_for_companies(companies_with_reports):
-    """Send emails for multiple companies with reports"""
-    success_count = 0
-    total_count = len(companies_with_reports)
-    sent_companies = []
-    failed_companies = []
-    no_email_companies = []
-    
-    logger.info(f"Starting email delivery for {total_count} companies with generated reports")
-    
-    for company_data, s3_key in companies_with_reports:
-        company_email = company_data.get('email')
-        company_name = company_data.get('companyName', 'Unknown')
-        company_id = company_data.get('id', 'Unknown')
-        
-        if not company_email:
-            no_email_companies.append(f"{company_name} (ID: {company_id})")
-            logger.warning(f"No email found for company {company_name} (ID: {company_id})")
-            continue
-            
-        if send_report_email(company_data, s3_key, company_email):
-            success_count += 1
-            sent_companies.append(f"{company_name} ({company_email})")
-            logger.info(f"Report email sent successfully to {company_name} ({company_email})")
-        else:
-            failed_companies.append(f"{company_name} ({company_email})")
-            logger.error(f"Failed to send report email to {company_name} ({company_email})")
-    
-    # Summary logging
-    logger.info(f"EMAIL DELIVERY SUMMARY:")
-    logger.info(f"Total companies with reports: {total_count}")
-    logger.info(f"Emails sent successfully: {success_count}")
-    logger.info(f"Email delivery failures: {len(failed_companies)}")
-    logger.info(f"Companies without email: {len(no_email_companies)}")
-    
-    if sent_companies:
-        logger.info(f"EMAILS SENT TO: {', '.join(sent_companies)}")
-    
-    if failed_companies:
-        logger.error(f"FAILED TO SEND EMAILS TO: {', '.join(failed_companies)}")
-    
-    if no_email_companies:
-        logger.warning(f"NO EMAIL ADDRESS FOR: {', '.join(no_email_companies)}")
-    
-    return success_count, total_count
\ No newline at end of file
+def _close_smtp(server):
+    if server is not None:
+        try:
+            server.quit()
+        except Exception:
+            pass
+    return None
+
+def send_reports_for_companies(companies_with_reports, period_start=None, period_end=None):
+    """Send emails for multiple companies with reports through the durable outbox.
+
+    Each (company_data, s3_key) is enqueued once per company and period, by
+    default the configured report week, then the outbox is drained; returns
+    (sent, total) like before. sent only counts these companies' emails, not
+    rows left due by earlier runs that the same drain delivers.
+    """
+    from email_outbox import connect, enqueue, deliver, sent_count
+    from periods import get_report_period
+
+    if period_start is None or period_end is None:
+        period_start, period_end = get_report_period()
+    outbox = connect()
+    started = time.time()
+    keys = {enqueue(outbox, company_data, s3_key, period_start, period_end)
+            for company_data, s3_key in companies_with_reports}
+    deliver(outbox)
+    return sent_count(outbox, keys, started), len(companies_with_reports)
@@ -0,0 +1,76 @@
+import datetime
+import json
+import random
+
+POSITIVE = ["good flavor", "impressive", "friendly staff", "fast service", "clean tables", "great value"]
+NEGATIVE = ["not enough cheese", "little meat", "long wait", "cold food", "noisy", "rude cashier"]
+RECOMMENDATIONS = ["Increase cheese quantity", "Improve quality", "Reduce wait times", "Train staff"]
+QUESTIONS = ["Staff attitude", "Food quality", "Cleanliness", "Value for money"]
+CITIES = ["Colombo", "Kandy", "Galle", "Jaffna", "Negombo"]
+INDUSTRIES = ["FNB", "Retail", "Hospitality", "Healthcare"]
+
+def generate_companies(count, seed=42):
+    """Generate company records in the DynamoDB companies table format"""
+    rng = random.Random(seed)
+    companies = []
+    for i in range(count):
+        industry = rng.choice(INDUSTRIES)
+        companies.append({
+            "id": f"{100000000 + i}A_{100000 + i}_01-01_{industry.upper()[:3]}",
+            "companyName": f"Synthetic Company {i + 1}",
+            "email": f"owner{i + 1}@synthetic.example",
+            "city": rng.choice(CITIES),
+            "industry": industry,
+            "dateUpdated": (datetime.datetime(2025, 1, 1) + datetime.timedelta(minutes=i)).isoformat(),
+        })
+    return companies
+
+def generate_reviews(count, company_id="123456789A_123456_01-01_FNB", start=None, end=None, seed=42, meta_as_string=True):
+    """Generate reviews in the API format from the README.
+
+    Reviews are spread evenly between start and end (datetimes, default: the
+    week of 2025-09-01). metaData is a JSON string like the live API unless
+    meta_as_string is False.
+    """
+    rng = random.Random(f"{seed}:{company_id}")
+    start = start or datetime.datetime(2025, 9, 1)
+    end = end or start + datetime.timedelta(days=7)
+    span_ms = max(1, int((end - start).total_seconds() * 1000))
+    start_ms = int(start.replace(tzinfo=datetime.timezone.utc).timestamp() * 1000)
+
+    reviews = []
+    for i in range(count):
+        created_ms = start_ms + (span_ms * i) // max(1, count)
+        meta_data = {
+            "audioId": f"{created_ms}_{company_id}",
+            "detectedLanguage": "en-US",
+            "audioDurationSec": rng.randint(10, 180),
+            "feedbackAnalysis": {
+                "overallSentiment": rng.choice(["Positive", "Neutral", "Negative"]),
+                "tonePrimary": rng.choice(["Happy", "Calm", "Frustrated"]),
+                "positiveIndicators": rng.sample(POSITIVE, 2),
+                "negativeIndicators": rng.sample(NEGATIVE, 2),
+                "complaintsDetected": rng.random() < 0.3,
+                "recommendations": rng.sample(RECOMMENDATIONS, 2),
+                "retentionRisk": rng.choice(["Low", "Medium", "High"])
+            }
+        }
+        reviews.append({
+            "companyId": company_id,
+            "quess": [
+                {"question": q, "answer": float(rng.randint(1, 5)), "questionId": f"q{n + 1}"}
+                for n, q in enumerate(QUESTIONS)
+            ],
+            "userEmail": f"customer{i}@email.com",
+            "metaData": json.dumps(meta_data) if meta_as_string else meta_data
+        })
+    return reviews
+
+def company_details(company):
+    """Company details API response for a generated company"""
+    return {
+        "companyId": company["id"],
+        "companyName": company["companyName"],
+        "city": company["city"],
+        "industry": company["industry"],
+    }
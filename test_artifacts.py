@@ -0,0 +1,37 @@
+import queue
+import artifacts
+
+def test_sampling_is_deterministic_per_company_and_run(monkeypatch):
+    monkeypatch.setenv('ARTIFACT_POLICY', 'sampled')
+    monkeypatch.setenv('ARTIFACT_SAMPLE_RATE', '0.25')
+    decisions = [artifacts.should_save_artifacts(f"company-{i}", "run-1") for i in range(2000)]
+    assert decisions == [artifacts.should_save_artifacts(f"company-{i}", "run-1") for i in range(2000)]
+    assert 0.2 < sum(decisions) / len(decisions) < 0.3
+
+def test_policy_off_full_and_unknown(monkeypatch):
+    monkeypatch.setenv('ARTIFACT_POLICY', 'full')
+    assert artifacts.should_save_artifacts("c", "r")
+    monkeypatch.setenv('ARTIFACT_POLICY', 'off')
+    assert not artifacts.should_save_artifacts("c", "r")
+    monkeypatch.setenv('ARTIFACT_POLICY', 'everything')
+    assert artifacts.get_artifact_policy() == 'off'
+
+def test_save_then_load_latest(monkeypatch, tmp_path):
+    monkeypatch.setenv('ARTIFACT_POLICY', 'full')
+    monkeypatch.setenv('ARTIFACTS_DIR', str(tmp_path))
+    path = artifacts.save_artifact("api_response", [{"id": 1}, {"id": 2}], "c1", "run-1")
+    assert path == str(tmp_path / "c1" / "api_response_run-1.jsonl.gz")
+    artifacts.save_artifact("summary", {"total": 2}, "c1", "run-1")
+    artifacts.flush_artifacts()
+    assert artifacts.load_artifact("api_response", "c1") == [{"id": 1}, {"id": 2}]
+    assert artifacts.load_artifact("summary") == [{"total": 2}]
+    assert artifacts.load_artifact("missing", "c1") is None
+
+def test_full_queue_drops_artifact(monkeypatch, tmp_path):
+    monkeypatch.setenv('ARTIFACT_POLICY', 'full')
+    monkeypatch.setenv('ARTIFACTS_DIR', str(tmp_path))
+    monkeypatch.setenv('ARTIFACT_QUEUE_TIMEOUT', '0.01')
+    monkeypatch.setattr(artifacts, '_write_queue', queue.Queue(1))
+    monkeypatch.setattr(artifacts, '_ensure_writer', lambda: None)
+    assert artifacts.save_artifact("a", [1], "c1", "run-1")
+    assert artifacts.save_artifact("b", [2], "c1", "run-1") is None
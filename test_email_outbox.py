@@ -0,0 +1,99 @@
+import datetime
+import json
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("boto3")
+import email_outbox
+import send_email
+from email_outbox import connect, enqueue, deliver, sent_count, status_counts
+
+WEEK = (datetime.date(2025, 9, 1), datetime.date(2025, 9, 7))
+COMPANY = {"id": "c1", "companyName": "Cafe", "email": "owner@example.com", "region": "not stored"}
+
+@pytest.fixture
+def outbox(tmp_path):
+    connection = connect(str(tmp_path / "outbox.sqlite3"))
+    yield connection
+    connection.close()
+
+@pytest.fixture
+def smtp(monkeypatch):
+    """Fake SMTP: send results are taken from the outcomes list (True when it runs out)"""
+    sent, outcomes = [], []
+
+    def send_report_email(company, s3_keys, recipient, smtp_server=None):
+        ok = outcomes.pop(0) if outcomes else True
+        if ok:
+            sent.append((company["id"], s3_keys, recipient))
+        return ok
+
+    monkeypatch.setattr(send_email, "open_smtp_connection", lambda: object())
+    monkeypatch.setattr(send_email, "_close_smtp", lambda server: None)
+    monkeypatch.setattr(send_email, "send_report_email", send_report_email)
+    return sent, outcomes
+
+def _row(connection, key):
+    return connection.execute("SELECT * FROM outbox WHERE idempotency_key = ?", (key,)).fetchone()
+
+def test_reenqueue_is_idempotent(outbox, smtp):
+    sent, _ = smtp
+    key = enqueue(outbox, COMPANY, {"pdf": "old.pdf"}, *WEEK)
+    assert enqueue(outbox, COMPANY, {"pdf": "new.pdf"}, *WEEK) == key
+    row = _row(outbox, key)
+    assert json.loads(row["s3_keys"]) == {"pdf": "new.pdf"}
+    assert "region" not in json.loads(row["company"])
+
+    assert deliver(outbox) == (1, 0)
+    # A rerun for the same period after delivery neither resets nor re-sends the email
+    enqueue(outbox, COMPANY, {"pdf": "rerun.pdf"}, *WEEK)
+    assert deliver(outbox) == (0, 0)
+    assert sent == [("c1", {"pdf": "new.pdf"}, "owner@example.com")]
+    assert status_counts(outbox) == {"sent": 1}
+
+def test_failures_back_off_then_give_up(outbox, smtp, monkeypatch):
+    sent, outcomes = smtp
+    monkeypatch.setenv("EMAIL_RETRY_BASE_S", "60")
+    monkeypatch.setattr(email_outbox.random, "uniform", lambda low, high: 1.0)
+    outcomes.extend([False, False, False])
+    key = enqueue(outbox, COMPANY, {"pdf": "a.pdf"}, *WEEK)
+
+    assert deliver(outbox, max_attempts=3) == (0, 0)
+    row = _row(outbox, key)
+    assert (row["status"], row["attempts"]) == ("pending", 1)
+    assert round(row["next_attempt_at"] - row["updated_at"]) == 60
+    # Not due yet, so a second pass sends nothing
+    assert deliver(outbox, max_attempts=3) == (0, 0)
+    assert _row(outbox, key)["attempts"] == 1
+
+    outbox.execute("UPDATE outbox SET next_attempt_at = 0")
+    deliver(outbox, max_attempts=3)
+    row = _row(outbox, key)
+    assert (row["attempts"], round(row["next_attempt_at"] - row["updated_at"])) == (2, 120)
+
+    outbox.execute("UPDATE outbox SET next_attempt_at = 0")
+    assert deliver(outbox, max_attempts=3) == (0, 1)
+    assert _row(outbox, key)["status"] == "failed"
+    assert sent == []
+
+def test_expired_lease_is_reclaimed(outbox, smtp):
+    sent, _ = smtp
+    key = enqueue(outbox, COMPANY, {"pdf": "a.pdf"}, *WEEK)
+    # A worker claims the row and crashes before recording the result
+    assert [row["idempotency_key"] for row in email_outbox._claim(outbox, 10, lease_s=300)] == [key]
+    assert email_outbox._claim(outbox, 10, lease_s=300) == []
+    assert deliver(outbox) == (0, 0)
+
+    outbox.execute("UPDATE outbox SET lease_until = 0 WHERE idempotency_key = ?", (key,))
+    assert deliver(outbox) == (1, 0)
+    assert len(sent) == 1
+
+def test_send_reports_counts_only_its_own_companies(tmp_path, smtp, monkeypatch):
+    monkeypatch.setenv("EMAIL_OUTBOX_PATH", str(tmp_path / "outbox.sqlite3"))
+    stale = connect()
+    enqueue(stale, dict(COMPANY, id="earlier"), {"pdf": "earlier.pdf"}, *WEEK)
+    stale.close()
+
+    sent, total = send_email.send_reports_for_companies([(COMPANY, {"pdf": "a.pdf"})], *WEEK)
+    assert (sent, total) == (1, 1)
+    assert len(smtp[0]) == 2
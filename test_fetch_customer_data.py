@@ -0,0 +1,63 @@
+import datetime
+import json
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+import fetch_customer_data
+
+START = datetime.date(2024, 1, 1)
+END = datetime.date(2024, 1, 7)
+
+class FakeResponse:
+    def __init__(self, body, status_code=200):
+        self.content = json.dumps(body).encode()
+        self.status_code = status_code
+
+def _fake_get(pages, calls):
+    """cached_get stand-in serving pages keyed by the cursor sent (None for the first request)"""
+    def cached_get(url, params=None, headers=None, **kwargs):
+        cursor = (params or {}).get("nextToken")
+        calls.append(cursor)
+        return FakeResponse(pages[cursor])
+    return cached_get
+
+def test_page_items_shapes():
+    assert fetch_customer_data._page_items([{"id": 1}]) == ([{"id": 1}], None)
+    assert fetch_customer_data._page_items({"items": [{"id": 1}], "nextToken": "t2"}) == ([{"id": 1}], "t2")
+    assert fetch_customer_data._page_items({"Items": [], "LastEvaluatedKey": {"pk": "x"}}) == ([], {"pk": "x"})
+    assert fetch_customer_data._page_items({"data": [{"id": 1}], "nextToken": ""}) == ([{"id": 1}], None)
+    assert fetch_customer_data._page_items("unexpected") == ([], None)
+
+def test_paging_follows_cursor_until_last_page(monkeypatch):
+    calls = []
+    pages = {None: {"items": [{"id": 1}], "nextToken": "t2"},
+             "t2": {"items": [{"id": 2}], "nextToken": "t3"},
+             "t3": {"items": [{"id": 3}]}}
+    monkeypatch.setattr(fetch_customer_data, "cached_get", _fake_get(pages, calls))
+    data = fetch_customer_data.fetch_api_data(START, END, "c1")
+    assert [item["id"] for item in data] == [1, 2, 3]
+    assert calls == [None, "t2", "t3"]
+
+def test_paging_stops_at_repeated_cursor(monkeypatch):
+    calls = []
+    pages = {None: {"items": [{"id": 1}], "nextToken": "t2"},
+             "t2": {"items": [{"id": 2}], "nextToken": "t2"}}
+    monkeypatch.setattr(fetch_customer_data, "cached_get", _fake_get(pages, calls))
+    data = fetch_customer_data.fetch_api_data(START, END, "c1")
+    assert [item["id"] for item in data] == [1, 2]
+    assert calls == [None, "t2"]
+
+def test_paging_stops_at_empty_page_with_cursor(monkeypatch):
+    calls = []
+    pages = {None: {"items": [{"id": 1}], "nextToken": "t2"},
+             "t2": {"items": [], "nextToken": "t3"}}
+    monkeypatch.setattr(fetch_customer_data, "cached_get", _fake_get(pages, calls))
+    data = fetch_customer_data.fetch_api_data(START, END, "c1")
+    assert [item["id"] for item in data] == [1]
+    assert calls == [None, "t2"]
+
+def test_paging_error_status_returns_nothing(monkeypatch):
+    monkeypatch.setattr(fetch_customer_data, "cached_get",
+                        lambda url, params=None, headers=None, **kwargs: FakeResponse({}, 500))
+    assert fetch_customer_data.fetch_api_data(START, END, "c1") == []
@@ -0,0 +1,49 @@
+import json
+import instrumentation
+from instrumentation import percentile, span, flush_records
+
+def test_percentile_nearest_rank():
+    """p50 is the lower middle value; p95 and p100 round up to a real sample"""
+    assert percentile([], 50) == 0.0
+    assert percentile([7], 50) == 7
+    assert percentile([2, 1], 50) == 1
+    assert percentile(list(range(1, 7)), 50) == 3
+    assert percentile(list(range(1, 11)), 50) == 5
+    assert percentile(list(range(1, 11)), 95) == 10
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([3, 1, 2], 100) == 3
+    assert percentile([3, 1, 2], 0) == 1
+
+def test_span_records_are_buffered_until_flushed(tmp_path, monkeypatch):
+    """Spans carry current RSS and its change, not the process peak, and reach disk on flush"""
+    monkeypatch.setenv('METRICS_ENABLED', 'true')
+    monkeypatch.setenv('METRICS_DIR', str(tmp_path))
+    flush_records()
+    with span("aggregate", "c1"):
+        ballast = bytearray(8 * 1024 * 1024)
+    metrics_file = tmp_path / f"metrics_{instrumentation.RUN_ID}.jsonl"
+    assert not metrics_file.exists()
+
+    flush_records()
+    record = json.loads(metrics_file.read_text().splitlines()[-1])
+    assert record["stage"] == "aggregate" and record["company_id"] == "c1"
+    assert "peak_rss_mb" not in record
+    assert record["rss_mb"] > 0
+    assert record["rss_delta_mb"] >= 7
+    del ballast
+
+def test_nested_span_of_same_stage_is_folded(monkeypatch):
+    """A fetch inside a wider fetch span is one record, with the bytes of both"""
+    records = []
+    monkeypatch.setenv('METRICS_ENABLED', 'false')
+    instrumentation.add_span_listener(records.append)
+    try:
+        with span("fetch", "c1") as outer:
+            outer.add_bytes_in(10)
+            with span("fetch", "c1") as inner:
+                inner.add_bytes_in(5)
+            with span("fetch", "c2"):
+                pass
+    finally:
+        instrumentation.remove_span_listener(records.append)
+    assert [(r["company_id"], r["bytes_in"]) for r in records] == [("c2", 0), ("c1", 15)]
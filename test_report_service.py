@@ -0,0 +1,98 @@
+import asyncio
+import datetime
+import pytest
+
+for module in ("dotenv", "requests", "boto3", "PyPDF2", "matplotlib", "playwright"):
+    pytest.importorskip(module)
+import report_service
+from report_service import ReportService, ReportError
+
+WEEK = (datetime.date(2025, 9, 1), datetime.date(2025, 9, 7))
+
+class FakeScheduler:
+    """Stands in for the browser pool; the stubbed _render never prints"""
+    concurrency = 2
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Replace the render with a stub that records each call and waits for release"""
+    calls = []
+    release = asyncio.Event()
+
+    async def fake_render(self, company_id, start, end):
+        calls.append((company_id, start, end))
+        await release.wait()
+        return f"%PDF {company_id} {start}".encode()
+
+    monkeypatch.setattr(report_service, "RenderScheduler", FakeScheduler)
+    monkeypatch.setattr(ReportService, "_render", fake_render)
+    return calls, release
+
+def test_concurrent_requests_share_one_render(renders):
+    calls, release = renders
+
+    async def scenario():
+        async with ReportService(workers=2, cache_size=4, cache_ttl=60, max_queue=10) as service:
+            first = asyncio.create_task(service.get_report("c1", *WEEK))
+            second = asyncio.create_task(service.get_report("c1", *WEEK))
+            await asyncio.sleep(0)
+            release.set()
+            results = await asyncio.gather(first, second)
+            cached = await service.get_report("c1", *WEEK)
+            return results, cached, service.stats
+
+    (first, second), cached, stats = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert first[0] == second[0] == cached[0]
+    assert sorted([first[1], second[1]]) == ["coalesced", "rendered"]
+    assert cached[1] == "cache"
+    assert stats["rendered"] == 1 and stats["coalesced"] == 1 and stats["cache_hits"] == 1
+
+def test_cache_evicts_least_recently_used_and_expires(renders, monkeypatch):
+    calls, release = renders
+    release.set()
+    clock = [1000.0]
+    monkeypatch.setattr(report_service.time, "monotonic", lambda: clock[0])
+
+    async def scenario():
+        async with ReportService(workers=1, cache_size=2, cache_ttl=60, max_queue=10) as service:
+            sources = []
+            for company_id in ("a", "b", "a", "c", "a", "b"):
+                sources.append((company_id, (await service.get_report(company_id, *WEEK))[1]))
+            clock[0] += 61
+            sources.append(("a", (await service.get_report("a", *WEEK))[1]))
+            return sources
+
+    sources = asyncio.run(scenario())
+    # "a" was used after "b", so adding "c" evicts "b"; the TTL then expires everything
+    assert sources == [("a", "rendered"), ("b", "rendered"), ("a", "cache"), ("c", "rendered"),
+                       ("a", "cache"), ("b", "rendered"), ("a", "rendered")]
+    assert len(calls) == 5
+
+def test_full_queue_answers_503(renders):
+    calls, release = renders
+
+    async def scenario():
+        async with ReportService(workers=1, cache_size=4, cache_ttl=60, max_queue=1) as service:
+            running = asyncio.create_task(service.get_report("a", *WEEK))
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            queued = asyncio.create_task(service.get_report("b", *WEEK))
+            await asyncio.sleep(0)
+            with pytest.raises(ReportError) as rejected:
+                await service.get_report("c", *WEEK)
+            release.set()
+            await asyncio.gather(running, queued)
+            return rejected.value.status
+
+    assert asyncio.run(scenario()) == 503
+    assert [company_id for company_id, _, _ in calls] == ["a", "b"]
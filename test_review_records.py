@@ -0,0 +1,42 @@
+import json
+from review_records import decode_review, decode_reviews, Review, ReviewDecodeError
+import pytest
+
+def _item(**meta):
+    analysis = {"overallSentiment": "positive", "positiveIndicators": ["great food"],
+                "negativeIndicators": "slow service", "complaintsDetected": "true"}
+    meta_data = {"audioId": "a1", "audioDurationSec": "42.5", "feedbackAnalysis": analysis, **meta}
+    return {"companyId": "c1", "quess": [{"question": "Taste", "answer": "4", "questionId": "q1"}],
+            "metaData": json.dumps(meta_data)}
+
+def test_decode_review_normalizes_fields():
+    review = decode_review(_item())
+    assert isinstance(review, Review)
+    assert review.analysis.overall_sentiment == "Positive"
+    assert review.analysis.negative_indicators == ("slow service",)
+    assert review.analysis.complaints_detected is True
+    assert review.audio_duration_sec == 42.5
+    assert review.answers[0].answer == 4.0
+    assert not hasattr(review, "__dict__")
+
+def test_decode_reviews_counts_and_skips_malformed_items():
+    items = [
+        _item(),
+        "not an object",
+        {"metaData": "{not json"},
+        _item(audioDurationSec="long"),
+        _item(feedbackAnalysis={"overallSentiment": "ecstatic"}),
+        {"quess": [{"question": "Taste", "answer": "n/a"}]},
+        {"companyId": "c2"},
+    ]
+    reviews, skipped = decode_reviews(items)
+    assert skipped == 5
+    assert [r.company_id for r in reviews] == ["c1", "c2"]
+    assert reviews[1].analysis is None and reviews[1].answers == ()
+
+def test_decode_reviews_empty_input():
+    assert decode_reviews(None) == ([], 0)
+
+def test_missing_feedback_analysis_is_malformed():
+    with pytest.raises(ReviewDecodeError):
+        decode_review({"metaData": {"audioId": "a1"}})
@@ -0,0 +1,59 @@
+import random
+from themes import ThemeCounter, SpaceSaving, normalize_phrase
+
+def _phrases():
+    phrases = ["great food"] * 500 + ["slow service"] * 300 + [f"x{i}" for i in range(2000)]
+    random.Random(7).shuffle(phrases)
+    return phrases
+
+def test_normalize_phrase_groups_spellings():
+    assert normalize_phrase("  Great   Portions! ") == normalize_phrase("great portion")
+    assert normalize_phrase("Berries") == "berry"
+    assert normalize_phrase("...") == ""
+
+def test_exact_counts_until_limit_then_sketch():
+    counter = ThemeCounter(exact_limit=50, sketch_capacity=20)
+    counter.update(["Slow service", "slow  service", "Great food"] + [f"x{i}" for i in range(48)])
+    assert counter.exact
+    assert counter.top(2) == [("Slow service", 2), ("Great food", 1)]
+
+    counter.update(_phrases())
+    assert not counter.exact
+    assert len(counter.sketch.counters) <= 20
+    assert [label.lower() for label, _ in counter.top(2)] == ["great food", "slow service"]
+
+def test_sketch_ranks_by_guaranteed_count():
+    """A one-off phrase that inherited an evicted counter must not outrank real themes"""
+    counter = ThemeCounter(exact_limit=50, sketch_capacity=20)
+    counter.update(_phrases())
+    top = counter.top(3, with_error=True)
+    assert [label for label, _, _ in top[:2]] == ["great food", "slow service"]
+    for label, count, error in top:
+        true_count = {"great food": 500, "slow service": 300}.get(label, 1)
+        assert count <= true_count <= count + error
+
+def test_space_saving_top_uses_lower_bound():
+    sketch = SpaceSaving(3)
+    sketch.counters = {"steady": [5, 0], "inherited": [9, 8], "fresh": [2, 0]}
+    assert sketch.top(3) == [("steady", 5, 0), ("fresh", 2, 0), ("inherited", 1, 8)]
+
+def test_merge_exact_and_sketched_counters():
+    daily = [ThemeCounter(exact_limit=50, sketch_capacity=20) for _ in range(3)]
+    for day, counter in enumerate(daily):
+        counter.update(["great food"] * (100 + day) + ["slow service"] * 60 + [f"d{day}-{i}" for i in range(40 * day)])
+    assert daily[0].exact and not daily[2].exact
+
+    week = daily[0].merge(daily[1]).merge(daily[2])
+    top = week.top(2, with_error=True)
+    assert [label for label, _, _ in top] == ["great food", "slow service"]
+    assert top[0][1] <= 303 <= top[0][1] + top[0][2]
+    assert top[1][1] <= 180 <= top[1][1] + top[1][2]
+
+def test_to_dict_round_trip():
+    for exact_limit in (10000, 50):
+        counter = ThemeCounter(exact_limit=exact_limit, sketch_capacity=20)
+        counter.update(_phrases())
+        restored = ThemeCounter.from_dict(counter.to_dict())
+        assert restored.exact == counter.exact
+        assert restored.top(5, with_error=True) == counter.top(5, with_error=True)
+        assert restored.to_dict() == counter.to_dict()
@@ -0,0 +1,211 @@
+import heapq
+import os
+import re
+import string
+import logging
+
+logger = logging.getLogger('InstaReview')
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = string.punctuation + "“”‘’"
+
+def _stem(word):
+    """Trivial plural stemming: 'portions' -> 'portion', 'berries' -> 'berry'"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def normalize_phrase(phrase):
+    """Counting key for a theme: lower case, single spaces, no edge punctuation, stemmed words"""
+    text = _WHITESPACE_RE.sub(" ", str(phrase)).strip().strip(_EDGE_PUNCTUATION).lower()
+    return " ".join(_stem(word) for word in text.split(" ")) if text else ""
+
+class SpaceSaving:
+    """Space-Saving heavy-hitters sketch with a fixed number of counters.
+
+    Every phrase with true frequency above total/capacity is guaranteed to be
+    tracked; counts are upper bounds, over-estimated by at most the stored error.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counters = {}   # key -> [count, error]
+        self.total = 0
+        self._heap = []      # (count, key) entries, possibly stale; rebuilt when it grows
+
+    def _push(self, key, count):
+        heapq.heappush(self._heap, (count, key))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, k) for k, (c, _) in self.counters.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if key in self.counters and self.counters[key][0] == count:
+                return key, count
+
+    def min_count(self):
+        """Count of the smallest counter when full (the bound for untracked keys), else 0"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def add(self, key, count=1):
+        self.total += count
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] += count
+        elif len(self.counters) < self.capacity:
+            counter = self.counters[key] = [count, 0]
+        else:
+            evicted, floor = self._pop_min()
+            del self.counters[evicted]
+            counter = self.counters[key] = [floor + count, floor]
+        self._push(key, counter[0])
+
+    def top(self, k):
+        """The k keys with the highest guaranteed count (count - error) as (key, guaranteed, error).
+
+        Ranking by the raw count would let a key that arrived once just after an
+        eviction outrank real heavy hitters.
+        """
+        return heapq.nsmallest(k, ((key, count - error, error) for key, (count, error) in self.counters.items()),
+                               key=lambda item: (-item[1], item[2], item[0]))
+
+    def merge(self, other):
+        """Combine two sketches; keys missing from a full sketch get that sketch's min count"""
+        self_floor, other_floor = self.min_count(), other.min_count()
+        merged = {}
+        for key in set(self.counters) | set(other.counters):
+            count_a, error_a = self.counters.get(key, (self_floor, self_floor))
+            count_b, error_b = other.counters.get(key, (other_floor, other_floor))
+            merged[key] = [count_a + count_b, error_a + error_b]
+        keep = heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1][0])
+        self.counters = {key: counter for key, counter in keep}
+        self.total += other.total
+        self._heap = [(c, k) for k, (c, _) in self.counters.items()]
+        heapq.heapify(self._heap)
+        return self
+
+class ThemeCounter:
+    """Frequency ranking of theme phrases with bounded memory.
+
+    Counts exactly with a dict until THEME_EXACT_LIMIT distinct phrases, then
+    switches to a Space-Saving sketch of THEME_SKETCH_CAPACITY counters. Counters
+    are mergeable across days or shards and serializable with to_dict/from_dict.
+    """
+
+    def __init__(self, exact_limit=None, sketch_capacity=None):
+        self.exact_limit = exact_limit or int(os.getenv('THEME_EXACT_LIMIT', '10000'))
+        self.sketch_capacity = sketch_capacity or int(os.getenv('THEME_SKETCH_CAPACITY', '1000'))
+        self.counts = {}
+        self.sketch = None
+        self.labels = {}     # key -> first original spelling, for display
+
+    @property
+    def exact(self):
+        return self.sketch is None
+
+    def _to_sketch(self):
+        logger.info(f"Theme counter exceeded {self.exact_limit} distinct phrases, switching to a "
+                    f"{self.sketch_capacity}-counter sketch")
+        sketch = SpaceSaving(self.sketch_capacity)
+        # Heaviest first, so exact counts survive and the rest only raise the error floor
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        for key, count in ranked:
+            sketch.add(key, count)
+        self.sketch, self.counts = sketch, {}
+        self._prune_labels()
+
+    def _prune_labels(self):
+        tracked = self.sketch.counters if self.sketch is not None else self.counts
+        if len(self.labels) > 2 * len(tracked):
+            self.labels = {key: label for key, label in self.labels.items() if key in tracked}
+
+    def add(self, phrase, count=1):
+        key = normalize_phrase(phrase)
+        if not key:
+            return
+        if key not in self.labels:
+            self.labels[key] = _WHITESPACE_RE.sub(" ", str(phrase)).strip()
+        if self.sketch is None:
+            self.counts[key] = self.counts.get(key, 0) + count
+            if len(self.counts) > self.exact_limit:
+                self._to_sketch()
+        else:
+            self.sketch.add(key, count)
+            if len(self.labels) > 4 * self.sketch_capacity:
+                self._prune_labels()
+
+    def update(self, phrases):
+        for phrase in phrases:
+            self.add(phrase)
+
+    def top(self, k, with_error=False):
+        """The k most frequent themes as (label, count), most frequent first; ties by label.
+
+        Once sketched, count is the guaranteed count; with_error adds the third field
+        error, so the true count lies between count and count + error (0 when exact).
+        """
+        if self.sketch is None:
+            ranked = [(key, count, 0) for key, count in
+                      heapq.nsmallest(k, self.counts.items(), key=lambda item: (-item[1], item[0]))]
+        else:
+            ranked = self.sketch.top(k)
+        if with_error:
+            return [(self.labels.get(key, key), count, error) for key, count, error in ranked]
+        return [(self.labels.get(key, key), count) for key, count, _ in ranked]
+
+    def merge(self, other):
+        """Add another counter's counts (e.g. another day or shard) into this one"""
+        for key, label in other.labels.items():
+            self.labels.setdefault(key, label)
+        if self.sketch is None and other.sketch is None:
+            for key, count in other.counts.items():
+                self.counts[key] = self.counts.get(key, 0) + count
+            if len(self.counts) > self.exact_limit:
+                self._to_sketch()
+            return self
+        if self.sketch is None:
+            self._to_sketch()
+        if other.sketch is None:
+            for key, count in other.counts.items():
+                self.sketch.add(key, count)
+        else:
+            self.sketch.merge(other.sketch)
+        self._prune_labels()
+        return self
+
+    def to_dict(self):
+        if self.sketch is None:
+            counters = {key: [count, 0] for key, count in self.counts.items()}
+        else:
+            counters = self.sketch.counters
+        return {"exact": self.sketch is None, "capacity": self.sketch_capacity,
+                "total": self.sketch.total if self.sketch else sum(self.counts.values()),
+                "counters": {key: {"count": c, "error": e, "label": self.labels.get(key, key)}
+                             for key, (c, e) in counters.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        counter = cls(sketch_capacity=data.get("capacity"))
+        for key, entry in data["counters"].items():
+            counter.labels[key] = entry.get("label", key)
+        if data.get("exact", True):
+            counter.counts = {key: entry["count"] for key, entry in data["counters"].items()}
+        else:
+            counter.sketch = SpaceSaving(counter.sketch_capacity)
+            counter.sketch.counters = {key: [entry["count"], entry["error"]] for key, entry in data["counters"].items()}
+            counter.sketch.total = data.get("total", 0)
+            counter.sketch._heap = [(c, k) for k, (c, _) in counter.sketch.counters.items()]
+            heapq.heapify(counter.sketch._heap)
+        return counter
+
+def top_themes(phrases, k):
+    """Rank an iterable of phrases and return the k most frequent labels"""
+    counter = ThemeCounter()
+    counter.update(phrases)
+    return [label for label, _ in counter.top(k)]